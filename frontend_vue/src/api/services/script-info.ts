@@ -1,4 +1,5 @@
 import http from '../http'
+import { useUserStore } from '../../stores/modules/user/user'
 
 export interface CharacterSettings {
   ai_name: string
@@ -21,7 +22,9 @@ export interface ScriptInfo {
 export const getScriptInfo = async (scriptName: string): Promise<ScriptInfo> => {
   try {
     // 拦截器已解构数据，response.data 直接就是 ScriptInfo
-    const data = await http.get(`/v1/chat/script/init_script/${scriptName}`)
+    const data = await http.get(
+      `/v1/chat/script/init_script/${scriptName}?${useUserStore().sessionQuery}`,
+    )
     console.log('Script信息:', data) // 直接输出 ScriptInfo 数据
     return data
   } catch (error: any) {
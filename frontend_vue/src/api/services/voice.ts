@@ -0,0 +1,10 @@
+import http from '../http'
+
+// 告诉后端语音已经播放完，临时文件稍后会被清理
+export const voiceAck = async (audioFile: string): Promise<void> => {
+  try {
+    await http.post(`/v1/chat/sound/ack/${encodeURIComponent(audioFile)}`)
+  } catch (error: any) {
+    console.warn('语音播放确认失败:', error.message)
+  }
+}
@@ -2,6 +2,7 @@ import type { IEventProcessor } from '../event-processor'
 import type { ScriptBackgroundEvent } from '../../../types'
 import { useGameStore } from '../../../stores/modules/game'
 import { useUIStore } from '../../../stores/modules/ui/ui'
+import { useUserStore } from '../../../stores/modules/user/user'
 
 export default class BackgroundProcessor implements IEventProcessor {
   canHandle(eventType: string): boolean {
@@ -16,7 +17,7 @@ export default class BackgroundProcessor implements IEventProcessor {
     gameStore.currentStatus = 'presenting'
 
     let url = event.imagePath
-      ? `/api/v1/chat/script/background_file/${encodeURIComponent(event.imagePath)}`
+      ? `/api/v1/chat/script/background_file/${encodeURIComponent(event.imagePath)}?${useUserStore().sessionQuery}`
       : '../pictures/background/default.png'
 
     uiStore.currentBackground = url
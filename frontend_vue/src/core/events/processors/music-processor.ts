@@ -1,6 +1,7 @@
 import type { IEventProcessor } from '../event-processor'
 import type { ScriptMusicEvent } from '../../../types'
 import { useUIStore } from '../../../stores/modules/ui/ui'
+import { useUserStore } from '../../../stores/modules/user/user'
 
 export default class MusicProcessor implements IEventProcessor {
   canHandle(eventType: string): boolean {
@@ -11,7 +12,7 @@ export default class MusicProcessor implements IEventProcessor {
     const uiStore = useUIStore()
 
     let url = event.musicPath
-      ? `/api/v1/chat/script/music_file/${encodeURIComponent(event.musicPath)}`
+      ? `/api/v1/chat/script/music_file/${encodeURIComponent(event.musicPath)}?${useUserStore().sessionQuery}`
       : 'None'
 
     uiStore.currentBackgroundMusic = url
@@ -2,6 +2,7 @@ import type { IEventProcessor } from '../event-processor'
 import type { ScriptSoundEvent } from '../../../types'
 import { useGameStore } from '../../../stores/modules/game'
 import { useUIStore } from '../../../stores/modules/ui/ui'
+import { useUserStore } from '../../../stores/modules/user/user'
 
 export default class SoundProcessor implements IEventProcessor {
   canHandle(eventType: string): boolean {
@@ -16,7 +17,7 @@ export default class SoundProcessor implements IEventProcessor {
     gameStore.currentStatus = 'presenting'
 
     let url = event.soundPath
-      ? `/api/v1/chat/script/sound_file/${encodeURIComponent(event.soundPath)}`
+      ? `/api/v1/chat/script/sound_file/${encodeURIComponent(event.soundPath)}?${useUserStore().sessionQuery}`
       : 'None'
 
     uiStore.currentSoundEffect = url
@@ -5,5 +5,10 @@ export const useUserStore = defineStore('user', {
     user_id: '1',
     client_id: '',
   }),
+  getters: {
+    // 按用户区分会话的接口（头像、剧本资源等）需要带上的查询参数
+    sessionQuery: (state) =>
+      `user_id=${encodeURIComponent(state.user_id)}&client_id=${encodeURIComponent(state.client_id)}`,
+  },
   actions: {},
 })
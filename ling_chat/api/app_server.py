@@ -9,6 +9,12 @@ from fastapi import FastAPI, Request, Response
 
 from ling_chat.api.routes_manager import RoutesManager
 from ling_chat.core.logger import logger
+from ling_chat.core.service_manager import service_manager
+from ling_chat.core.emotion.classifier import emotion_classifier
+from ling_chat.core.ai_service.translation_memory import close_translation_memory
+from ling_chat.core.TTS.audio_encoder import get_audio_encoder
+from ling_chat.core.TTS.audio_writer import audio_writer
+from ling_chat.core.TTS.voice_janitor import get_voice_janitor
 from ling_chat.database import init_db
 from ling_chat.database.character_model import CharacterModel
 from ling_chat.utils.runtime_path import user_data_path
@@ -23,8 +29,19 @@ async def lifespan(app: FastAPI):
         logger.info("正在同步游戏角色数据...")
         CharacterModel.sync_characters_from_game_data(user_data_path / "game_data")
 
+        # 后台清理临时语音，长时间运行时不会占满磁盘
+        get_voice_janitor().start()
+
         yield
 
+        logger.info("正在关闭所有AI会话...")
+        await service_manager.shutdown()
+        await get_voice_janitor().close()
+        emotion_classifier.save_cache()
+        await asyncio.to_thread(audio_writer.flush)
+        get_audio_encoder().close()
+        await asyncio.to_thread(close_translation_memory)
+
     except (ImportError, Exception) as e:
         logger.error(f"应用启动时发生严重错误: {e}", exc_info=True)
         logger.stop_loading_animation(success=False, final_message="应用加载失败，程序将退出")
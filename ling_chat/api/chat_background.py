@@ -1,4 +1,5 @@
 import os
+from typing import Optional
 from fastapi import APIRouter, HTTPException, UploadFile
 from fastapi.responses import FileResponse, JSONResponse
 from pathlib import Path
@@ -13,10 +14,10 @@ BACKGROUND_DIR = user_data_path / "game_data/backgrounds"
 ALLOWED_EXTENSIONS = {'.jpg', '.png', '.webp', '.bmp', '.svg', '.tif', '.gif'}
 
 @router.get("/background_script_file/{background_file}")
-async def get_script_background_file(background_file: str):
+async def get_script_background_file(background_file: str, user_id: Optional[int] = None, client_id: Optional[str] = None):
     try:
 
-        ai_service = service_manager.ai_service
+        ai_service = service_manager.resolve_service(user_id, client_id)
         if ai_service is None:
             raise HTTPException(status_code=404, detail="AISERVICE not found")
         else:
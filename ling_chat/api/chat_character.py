@@ -1,4 +1,5 @@
 import os
+from typing import Optional
 from pathlib import Path
 from fastapi import APIRouter, Body, HTTPException
 from fastapi.responses import FileResponse, JSONResponse
@@ -34,8 +35,8 @@ async def open_creative_web():
 
 
 @router.get("/get_avatar/{avatar_file}")
-async def get_specific_avatar(avatar_file: str):
-    ai_service = service_manager.ai_service
+async def get_specific_avatar(avatar_file: str, user_id: Optional[int] = None, client_id: Optional[str] = None):
+    ai_service = service_manager.resolve_service(user_id, client_id)
 
     if not ai_service or not ai_service.character_path:
         raise HTTPException(status_code=404, detail="AIService or character_path not found")
@@ -47,8 +48,8 @@ async def get_specific_avatar(avatar_file: str):
     return FileResponse(file_path)
 
 @router.get("/get_script_avatar/{character}/{emotion}")
-async def get_script_specific_avatar(character: str, emotion: str):
-    ai_service = service_manager.ai_service
+async def get_script_specific_avatar(character: str, emotion: str, user_id: Optional[int] = None, client_id: Optional[str] = None):
+    ai_service = service_manager.resolve_service(user_id, client_id)
 
     if ai_service:
         file_path = ai_service.scripts_manager.get_avatar_dir(character) / (emotion + ".png")
@@ -77,8 +78,9 @@ async def select_character(
         if character_settings is None: return HTTPException(status_code=500, detail="角色不存在")
 
         character_settings["character_id"] = character_id
-        service_manager.ai_service.import_settings(settings=character_settings)
-        service_manager.ai_service.reset_memory()
+        ai_service = service_manager.get_or_create_service(user_id)
+        ai_service.import_settings(settings=character_settings)
+        ai_service.reset_memory()
 
         # 2.5 更新用户的最后一次对话角色
         UserModel.update_user_character(
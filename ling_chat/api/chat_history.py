@@ -32,8 +32,9 @@ async def load_user_conversations(user_id: int, conversation_id: int):
             UserModel.update_user_character(user_id=user_id, character_id=character_id)
             settings = CharacterModel.get_character_settings_by_id(character_id=character_id)
             settings["character_id"] = character_id
-            service_manager.ai_service.import_settings(settings)
-            service_manager.ai_service.load_memory(result)
+            ai_service = service_manager.get_or_create_service(user_id)
+            ai_service.import_settings(settings)
+            ai_service.load_memory(result)
             print("成功调用记忆存储")
             return {
                 "code": 200,
@@ -68,12 +69,13 @@ async def create_user_conversations(request: Request):
             raise HTTPException(status_code=400, detail="缺少必要参数")
         
         # 获取消息记忆
-        messages = service_manager.ai_service.get_memory()
+        ai_service = service_manager.get_or_create_service(user_id)
+        messages = ai_service.get_memory()
         if not messages:  # 处理空消息情况
             print("消息记录是空的，请检查错误！！！！！！！！")
 
         # 获取这个对话的角色
-        character_id = service_manager.ai_service.character_id
+        character_id = ai_service.character_id
         
         # 创建对话
         conversation_id = ConversationModel.create_conversation(
@@ -124,7 +126,7 @@ async def save_user_conversation(request: Request):
             raise HTTPException(status_code=400, detail="缺少必要参数(user_id或conversation_id)")
         
         # 获取当前消息记忆
-        messages = service_manager.ai_service.get_memory()
+        messages = service_manager.get_or_create_service(user_id).get_memory()
         if not messages:
             print("警告: 消息记录是空的，将清空对话内容")
         
@@ -215,7 +217,7 @@ async def process_log_file(request: Request):
             raise HTTPException(status_code=400, detail="日志文件未包含有效对话")
         
         # 添加到记忆系统
-        service_manager.ai_service.load_memory(messages)
+        service_manager.get_or_create_service(user_id).load_memory(messages)
         
         # 同时创建新对话记录（可选）
         title = f"导入对话 {datetime.now().strftime('%Y-%m-%d %H:%M')}"
@@ -7,13 +7,11 @@ router = APIRouter(prefix="/api/v1/chat/info", tags=["Chat Info"])
 
 @router.get("/init")
 async def init_web_infos(client_id:str ,user_id: int):
-    ai_service = service_manager.ai_service
     try:
-        # 假如说ai_service没有被初始化，那么就为它初始化
-        if not ai_service:
-            ai_service = service_manager.init_ai_service()
+        # 每个用户有自己的ai_service，假如还没有被初始化，那么就为它初始化
+        ai_service = service_manager.get_or_create_service(user_id)
         
-        await service_manager.add_client(client_id)
+        await service_manager.add_client(client_id, user_id)
 
         result = {
             "ai_name": ai_service.ai_name,
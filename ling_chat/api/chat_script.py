@@ -1,4 +1,5 @@
 import os
+from typing import Optional
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import FileResponse
 from ling_chat.core.service_manager import service_manager
@@ -6,8 +7,8 @@ from ling_chat.core.service_manager import service_manager
 router = APIRouter(prefix="/api/v1/chat/script", tags=["Chat Script"])
 
 @router.get("/init_script/{script_name}")
-async def init_script(script_name: str):
-    ai_service = service_manager.ai_service
+async def init_script(script_name: str, user_id: Optional[int] = None, client_id: Optional[str] = None):
+    ai_service = service_manager.resolve_service(user_id, client_id)
     if not ai_service:
         raise HTTPException(status_code=404, detail="AIService not found")
     scripts_manager = ai_service.scripts_manager
@@ -36,8 +37,8 @@ async def init_script(script_name: str):
 
 
 @router.get("/get_script_avatar/{character}/{emotion}")
-async def get_script_specific_avatar(character: str, emotion: str):
-    ai_service = service_manager.ai_service
+async def get_script_specific_avatar(character: str, emotion: str, user_id: Optional[int] = None, client_id: Optional[str] = None):
+    ai_service = service_manager.resolve_service(user_id, client_id)
 
     if ai_service:
         file_path = ai_service.scripts_manager.get_avatar_dir(character) / (emotion + ".png")
@@ -50,9 +51,9 @@ async def get_script_specific_avatar(character: str, emotion: str):
     return FileResponse(file_path)
 
 @router.get("/sound_file/{soundPath}")
-async def get_script_sound(soundPath: str):
+async def get_script_sound(soundPath: str, user_id: Optional[int] = None, client_id: Optional[str] = None):
     try:
-        ai_service = service_manager.ai_service
+        ai_service = service_manager.resolve_service(user_id, client_id)
         if ai_service is None:
             raise HTTPException(status_code=404, detail="AISERVICE not found")
         else:
@@ -67,9 +68,9 @@ async def get_script_sound(soundPath: str):
         print(f"An error occurred: {e}")
 
 @router.get("/music_file/{musicPath}")
-async def get_script_music(musicPath: str):
+async def get_script_music(musicPath: str, user_id: Optional[int] = None, client_id: Optional[str] = None):
     try:
-        ai_service = service_manager.ai_service
+        ai_service = service_manager.resolve_service(user_id, client_id)
         if ai_service is None:
             raise HTTPException(status_code=404, detail="AISERVICE not found")
         else:
@@ -84,9 +85,9 @@ async def get_script_music(musicPath: str):
         print(f"An error occurred: {e}")
 
 @router.get("/background_file/{background_file}")
-async def get_script_background_file(background_file: str):
+async def get_script_background_file(background_file: str, user_id: Optional[int] = None, client_id: Optional[str] = None):
     try:
-        ai_service = service_manager.ai_service
+        ai_service = service_manager.resolve_service(user_id, client_id)
         if ai_service is None:
             raise HTTPException(status_code=404, detail="AISERVICE not found")
         else:
@@ -1,22 +1,70 @@
+import asyncio
 import os
 from pathlib import Path
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 
 from ling_chat.utils.runtime_path import temp_path
 from ling_chat.core.logger import logger
+from ling_chat.core.TTS.audio_encoder import get_audio_encoder
+from ling_chat.core.TTS.audio_writer import audio_writer
+from ling_chat.core.TTS.voice_janitor import get_voice_janitor
+from ling_chat.core.TTS.voice_stream import guess_media_type, voice_streams
 
 router = APIRouter(prefix="/api/v1/chat/sound", tags=["Chat Sound"])
 
 @router.get("/get_voice/{voice_file}")
-async def get_specific_sound(voice_file: str):
-    
+async def get_specific_sound(voice_file: str, format: str = ""):
+    """
+    获取语音文件
+
+    :param format: 传 wav 时把压缩过的语音解码成WAV返回
+    """
     voice_dir = Path(os.environ.get("TEMP_VOICE_DIR", temp_path / "audio"))
 
+    # 语音还在合成时边合成边返回（分块传输）
+    stream = voice_streams.get(voice_file)
+    if stream is not None:
+        # 等到第一块音频再决定状态码，还没有音频就失败时返回错误而不是空的语音
+        if not await stream.wait_ready():
+            logger.warning(f"语音合成失败: {voice_file} {stream.error}")
+            raise HTTPException(status_code=502, detail="Voice synthesis failed")
+        logger.debug(f"流式返回正在合成的语音: {voice_file}")
+        return StreamingResponse(stream.iter_chunks(), media_type=stream.media_type)
+
+    # 已经合成好但还在后台写入的语音直接从内存返回
+    audio_data = audio_writer.get_pending(voice_file)
     file_path = voice_dir / voice_file
 
-    logger.debug("语音寻找的路径是" + str(file_path))
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="Voice not found")
-    
+    if audio_data is None:
+        logger.debug("语音寻找的路径是" + str(file_path))
+        if not file_path.exists():
+            raise HTTPException(status_code=404, detail="Voice not found")
+
+    if format.lower() == "wav" and file_path.suffix.lower() != ".wav":
+        if audio_data is None:
+            audio_data = await asyncio.to_thread(file_path.read_bytes)
+        try:
+            wav_data = await get_audio_encoder().decode_wav(audio_data)
+        except Exception as e:
+            logger.error(f"语音解码失败: {e}")
+            raise HTTPException(status_code=500, detail="Voice decode failed")
+        return Response(content=wav_data, media_type="audio/wav")
+
+    if audio_data is not None:
+        return Response(content=audio_data, media_type=guess_media_type(voice_file))
     return FileResponse(file_path)
+
+
+@router.post("/ack/{voice_file}")
+async def acknowledge_sound(voice_file: str):
+    """前端播放完语音后调用，临时文件稍后会被清理"""
+    if not get_voice_janitor().acknowledge(voice_file):
+        raise HTTPException(status_code=404, detail="Voice not found")
+    return {"success": True}
+
+
+@router.get("/usage")
+async def get_sound_usage():
+    """临时语音目录的占用情况"""
+    return get_voice_janitor().stats()
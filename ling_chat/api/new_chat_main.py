@@ -4,7 +4,7 @@ import uuid
 from fastapi import WebSocket, WebSocketDisconnect
 from ling_chat.core.logger import logger
 from ling_chat.core.service_manager import service_manager
-from ling_chat.core.messaging.broker import message_broker
+from ling_chat.core.messaging.broker import message_broker, OverflowPolicy
 import traceback
 
 class WebSocketManager:
@@ -39,8 +39,7 @@ class WebSocketManager:
                 await send_task
             except asyncio.CancelledError:
                 pass
-            if service_manager.ai_service is not None:
-                await service_manager.ai_service.remove_client(client_id)
+            await service_manager.remove_client(client_id)
             logger.info(f"客户端 {client_id} 连接已清理")
 
     async def _receive_messages(self, websocket: WebSocket):
@@ -86,7 +85,7 @@ class WebSocketManager:
         """处理用户发送的消息"""
         logger.info(f"来自客户端 {client_id} 的消息: {message}")
         
-        ai_service = service_manager.ai_service
+        ai_service = service_manager.get_service_by_client(client_id)
         if ai_service is None:
             logger.error("AI服务未初始化")
             # 可以发送错误消息给前端
@@ -115,16 +114,22 @@ class WebSocketManager:
     async def _send_messages(self, websocket: WebSocket, client_id: str):
         """从消息队列中获取并发送消息"""
         try:
-            async for message in message_broker.subscribe(client_id):
-                if message:
-                    logger.info(f"向客户端 {client_id} 发送消息: {message}")
-                    try:
-                        await websocket.send_json(message)
-                    except (WebSocketDisconnect, RuntimeError):
-                        break
-                    except Exception as e:
-                        logger.error(f"发送消息失败: {e}")
-                        break
+            # 客户端处理不过来时丢弃最早的消息，而不是拖慢AI
+            with message_broker.subscribe(client_id, policy=OverflowPolicy.DROP_OLDEST) as subscription:
+                async for message in subscription:
+                    if message:
+                        logger.info(f"向客户端 {client_id} 发送消息: {message}")
+                        try:
+                            # 回复在发布时已经序列化成JSON文本，所有客户端共享同一份
+                            if isinstance(message, str):
+                                await websocket.send_text(message)
+                            else:
+                                await websocket.send_json(message)
+                        except (WebSocketDisconnect, RuntimeError):
+                            break
+                        except Exception as e:
+                            logger.error(f"发送消息失败: {e}")
+                            break
         except Exception as e:
             logger.error(f"消息订阅异常: {e}")
 
@@ -1,10 +1,11 @@
-import aiohttp
 import os
 from ling_chat.core.TTS.base_adapter import TTSBaseAdapter
 from ling_chat.core.logger import logger
 
 
 class AIVISAdapter(TTSBaseAdapter):
+    max_concurrency = 8  # 云端服务，可以承受比本地模型更多的并发
+
     def __init__(self, model_uuid: str, speaker_uuid: str|None = None,
                  style_id: int|None = None, style_name: str|None = None, 
                  audio_format: str = "mp3", lang: str = "ja"
@@ -82,7 +83,7 @@ class AIVISAdapter(TTSBaseAdapter):
         }
         headers["Authorization"] = f"Bearer {self.api_key}"
 
-        async with aiohttp.ClientSession() as session:
+        async with self._session() as session:
             async with session.post(
                     self.api_url + "/tts/synthesize",
                     json=params,
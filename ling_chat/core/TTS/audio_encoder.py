@@ -0,0 +1,125 @@
+import asyncio
+import multiprocessing
+import os
+import shutil
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from ling_chat.core.TTS.http_pool import LatencyHistogram
+from ling_chat.core.logger import logger
+
+# 编码格式 -> (文件扩展名, ffmpeg 参数)
+CODECS: Dict[str, tuple[str, List[str]]] = {
+    "opus": ("ogg", ["-c:a", "libopus", "-f", "ogg"]),
+    "mp3": ("mp3", ["-c:a", "libmp3lame", "-f", "mp3"]),
+}
+
+
+def _run_ffmpeg(ffmpeg: str, data: bytes, args: List[str]) -> bytes:
+    """在进程池中调用 ffmpeg，音频通过管道传入传出，不落盘"""
+    result = subprocess.run([ffmpeg, "-hide_banner", "-loglevel", "error", "-i", "pipe:0", *args, "pipe:1"],
+                            input=data, capture_output=True, check=False)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode("utf-8", errors="replace").strip() or "ffmpeg 转码失败")
+    return result.stdout
+
+
+class AudioEncoder:
+    """
+    语音压缩
+
+    合成得到的WAV在进程池中用 ffmpeg 转成 Opus(OGG) 或 MP3，体积大约只有原来的十分之一，
+    远程访问时节省带宽，临时目录和语音缓存也更小。前端需要WAV时再临时解码。
+    没有安装 ffmpeg 时自动关闭。
+    """
+    def __init__(self,
+                 codec: Optional[str] = None,
+                 bitrate: Optional[str] = None,
+                 workers: Optional[int] = None):
+        codec = (codec if codec is not None else os.environ.get("VOICE_ENCODE", "")).strip().lower()
+        self.bitrate = bitrate or os.environ.get("VOICE_ENCODE_BITRATE", "32k")
+        self.workers = workers or int(os.environ.get("VOICE_ENCODE_WORKERS", 2))
+        self.ffmpeg = shutil.which("ffmpeg") if codec else None
+
+        if codec and codec not in CODECS:
+            logger.warning(f"不支持的语音压缩格式: {codec}，可用 {', '.join(CODECS)}，语音将不压缩")
+            codec = ""
+        elif codec and self.ffmpeg is None:
+            logger.warning("没有找到 ffmpeg，语音将不压缩")
+            codec = ""
+        self.codec = codec
+
+        self.encoded = 0
+        self.failed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.encode_time = LatencyHistogram()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.codec)
+
+    @property
+    def extension(self) -> str:
+        """压缩后的文件扩展名，不含点"""
+        return CODECS[self.codec][0]
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # 主进程里有事件循环和写入线程，用 spawn 启动工作进程，不复制这些状态
+            self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    async def _transcode(self, data: bytes, args: List[str]) -> bytes:
+        if self.ffmpeg is None:
+            raise RuntimeError("没有找到 ffmpeg")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_pool(), _run_ffmpeg, self.ffmpeg, data, args)
+
+    async def encode(self, data: bytes) -> bytes:
+        """把WAV转成配置的压缩格式"""
+        start = time.perf_counter()
+        try:
+            encoded = await self._transcode(data, ["-b:a", self.bitrate, *CODECS[self.codec][1]])
+        except Exception:
+            self.failed += 1
+            raise
+        self.encode_time.observe(time.perf_counter() - start)
+        self.encoded += 1
+        self.bytes_in += len(data)
+        self.bytes_out += len(encoded)
+        return encoded
+
+    async def decode_wav(self, data: bytes) -> bytes:
+        """把压缩过的语音解码成WAV，用于只支持WAV的前端"""
+        return await self._transcode(data, ["-f", "wav"])
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "codec": self.codec or None,
+            "bitrate": self.bitrate if self.codec else None,
+            "encoded": self.encoded,
+            "failed": self.failed,
+            "ratio": round(self.bytes_out / self.bytes_in, 3) if self.bytes_in else None,
+            "time": self.encode_time.snapshot(),
+        }
+
+
+_audio_encoder: Optional[AudioEncoder] = None
+
+
+def get_audio_encoder() -> AudioEncoder:
+    """所有会话共用一个进程池"""
+    global _audio_encoder
+    if _audio_encoder is None:
+        _audio_encoder = AudioEncoder()
+    return _audio_encoder
@@ -0,0 +1,118 @@
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ling_chat.core.logger import logger
+
+WriteJob = Tuple[str, bytes, Optional[Callable[[], None]], Future]
+
+
+class AudioWriter:
+    """
+    后台写入语音文件（write-behind）
+
+    合成得到的音频交给专门的写入线程，事件循环不再被大文件写入阻塞。
+    写入完成之前音频保存在内存中，可以按文件名直接读取；
+    开启 fsync 时一批写入只在最后统一同步到磁盘。
+    """
+    MAX_BATCH = 32
+
+    def __init__(self, fsync: Optional[bool] = None):
+        self.fsync = fsync if fsync is not None \
+            else os.environ.get("TTS_AUDIO_FSYNC", "False").lower() == "true"
+        self.written = 0
+        self.batches = 0
+        self._pending: Dict[str, bytes] = {}  # 文件名 -> 还没写完的音频
+        self._lock = threading.Lock()
+        self._jobs: "queue.Queue[WriteJob]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="AudioWriter", daemon=True)
+            self._thread.start()
+
+    def submit(self, path: str, data: bytes, on_written: Optional[Callable[[], None]] = None) -> Future:
+        """
+        提交一个写入任务，立即返回
+
+        :param on_written: 文件写好后在写入线程中调用，例如把文件加入语音缓存
+        :return: 写入完成时结束的 Future，可以用 asyncio.wrap_future 等待
+        """
+        future: Future = Future()
+        with self._lock:
+            self._pending[os.path.basename(path)] = data
+        self._ensure_thread()
+        self._jobs.put((path, data, on_written, future))
+        return future
+
+    def get_pending(self, name: str) -> Optional[bytes]:
+        """按文件名取出还没写入磁盘的音频"""
+        with self._lock:
+            return self._pending.get(name)
+
+    def has_pending(self) -> bool:
+        with self._lock:
+            return bool(self._pending)
+
+    def _run(self) -> None:
+        while True:
+            # 取出当前排队的任务作为一批，一起写入、一起同步
+            batch: List[WriteJob] = [self._jobs.get()]
+            while len(batch) < self.MAX_BATCH:
+                try:
+                    batch.append(self._jobs.get_nowait())
+                except queue.Empty:
+                    break
+            self._write_batch(batch)
+            for _ in batch:
+                self._jobs.task_done()
+
+    def _write_batch(self, batch: List[WriteJob]) -> None:
+        opened = []
+        for path, data, on_written, future in batch:
+            try:
+                f = open(path, "wb")
+                f.write(data)
+                f.flush()
+                opened.append((f, path, on_written, future))
+            except Exception as e:
+                logger.error(f"写入语音文件失败: {e} 文件: {path}")
+                self._finish(path, future, e)
+
+        for f, path, on_written, future in opened:
+            error: Optional[BaseException] = None
+            try:
+                if self.fsync:
+                    os.fsync(f.fileno())
+                f.close()
+                if on_written is not None:
+                    on_written()
+            except Exception as e:
+                logger.error(f"写入语音文件失败: {e} 文件: {path}")
+                error = e
+            self._finish(path, future, error)
+        self.batches += 1
+
+    def _finish(self, path: str, future: Future, error: Optional[BaseException]) -> None:
+        with self._lock:
+            self._pending.pop(os.path.basename(path), None)
+        if error is None:
+            self.written += 1
+            future.set_result(path)
+        else:
+            future.set_exception(error)
+
+    def flush(self) -> None:
+        """等待已经提交的写入全部完成（阻塞调用）"""
+        self._jobs.join()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            pending = len(self._pending)
+        return {"written": self.written, "batches": self.batches, "pending": pending}
+
+
+audio_writer = AudioWriter()
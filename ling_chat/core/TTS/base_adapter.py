@@ -1,22 +1,59 @@
 from abc import ABC, abstractmethod
-from typing import Optional, AsyncGenerator
+from contextlib import asynccontextmanager
+from typing import Optional, AsyncGenerator, AsyncIterator
+
+import aiohttp
+
+from ling_chat.core.TTS.http_pool import HTTPSessionPool
 
 
 class TTSBaseAdapter(ABC):
     """VITS API适配器基类"""
 
+    # 后端能否边合成边返回音频
+    supports_streaming: bool = False
+
+    # 同时发给这个后端的最大请求数，为None时使用 TTS_MAX_CONCURRENCY
+    max_concurrency: Optional[int] = None
+
+    # 由TTS在初始化适配器时设置；单独使用适配器时为None，每次请求临时创建会话
+    http_pool: Optional[HTTPSessionPool] = None
+
+    @asynccontextmanager
+    async def _session(self) -> AsyncIterator[aiohttp.ClientSession]:
+        """获取发送请求用的会话，有连接池时复用池中的连接"""
+        if self.http_pool is not None:
+            yield self.http_pool.get_session()
+        else:
+            async with aiohttp.ClientSession() as session:
+                yield session
+
+    async def health_check(self) -> bool:
+        """
+        检查后端是否可达，熔断器断开期间在后台调用
+        只要服务能正常应答（即使是404）就认为可用
+        """
+        url = getattr(self, "api_url", None) or getattr(self, "base_url", None)
+        if not url:
+            return True
+        try:
+            async with self._session() as session:
+                async with session.get(url, timeout=aiohttp.ClientTimeout(total=3), ssl=False) as response:
+                    return response.status < 500
+        except Exception:
+            return False
+
     @abstractmethod
     async def generate_voice(self, text: str,) -> bytes:
         """生成语音的抽象方法"""
         pass
 
-    async def generate_voice_stream(self, text: str) -> Optional[AsyncGenerator[bytes, None]]:
+    async def generate_voice_stream(self, text: str) -> AsyncGenerator[bytes, None]:
         """
         生成流式语音的默认实现
-        对于不支持流式的引擎，可以返回None或抛出异常
+        对于不支持流式的引擎，合成完成后把整段音频作为一个块返回
         """
-        # 默认返回None表示不支持
-        return None
+        yield await self.generate_voice(text)
 
     @abstractmethod
     def get_params(self) -> dict[str, str|int|float|bool]:
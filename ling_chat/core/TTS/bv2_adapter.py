@@ -1,4 +1,3 @@
-import aiohttp
 import os
 from ling_chat.core.TTS.base_adapter import TTSBaseAdapter
 from ling_chat.core.logger import logger
@@ -26,7 +25,7 @@ class BV2Adapter(TTSBaseAdapter):
         params["text"] = text
         logger.debug(f"发送到SVA-BV2的json: {params}")
 
-        async with aiohttp.ClientSession() as session:
+        async with self._session() as session:
             async with session.post(
                 self.api_url + "/voice/bert-vits2", 
                 json=params
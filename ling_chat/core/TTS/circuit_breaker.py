@@ -0,0 +1,150 @@
+import asyncio
+import os
+import time
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from ling_chat.core.logger import logger
+
+HealthProbe = Callable[[], Awaitable[bool]]
+
+
+class BreakerState(str, Enum):
+    CLOSED = "closed"        # 正常请求
+    OPEN = "open"            # 后端不可用，请求直接失败，等待退避时间结束
+    HALF_OPEN = "half_open"  # 放行一个试探请求，成功则恢复，失败则重新断开
+
+
+class CircuitBreaker:
+    """
+    TTS后端的熔断器
+
+    连续失败达到阈值后断开，断开期间的请求立即失败，不再等待请求超时；
+    每次断开的时间按指数退避增长。断开期间可以在后台定时做健康检查，
+    后端恢复后先放行一个请求试探，成功后完全恢复。
+    """
+    def __init__(self,
+                 name: str,
+                 failure_threshold: Optional[int] = None,
+                 base_backoff: Optional[float] = None,
+                 max_backoff: Optional[float] = None):
+        self.name = name
+        self.failure_threshold = failure_threshold or int(os.environ.get("TTS_BREAKER_THRESHOLD", 3))
+        self.base_backoff = base_backoff or float(os.environ.get("TTS_BREAKER_BACKOFF", 5))
+        self.max_backoff = max_backoff or float(os.environ.get("TTS_BREAKER_MAX_BACKOFF", 300))
+
+        self.state = BreakerState.CLOSED
+        self.failures = 0            # 连续失败次数
+        self.backoff = self.base_backoff
+        self.open_until = 0.0
+        self.rejected = 0            # 断开期间被直接拒绝的请求数
+        self._trial_running = False  # 半开状态下是否已经放行了试探请求
+        self._probe_task: Optional[asyncio.Task] = None
+
+    def allow(self) -> bool:
+        """当前是否可以向后端发送请求"""
+        if self.state == BreakerState.OPEN and time.monotonic() >= self.open_until:
+            self._set_state(BreakerState.HALF_OPEN)
+        if self.state == BreakerState.CLOSED:
+            return True
+        if self.state == BreakerState.HALF_OPEN and not self._trial_running:
+            self._trial_running = True
+            return True
+        self.rejected += 1
+        return False
+
+    def available(self) -> bool:
+        """是否可能放行请求，和 allow 不同，不占用半开状态的试探机会"""
+        if self.state == BreakerState.CLOSED:
+            return True
+        if self.state == BreakerState.OPEN:
+            return time.monotonic() >= self.open_until
+        return not self._trial_running
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.backoff = self.base_backoff
+        self._trial_running = False
+        if self.state != BreakerState.CLOSED:
+            logger.info(f"TTS后端 {self.name} 已恢复")
+            self._set_state(BreakerState.CLOSED)
+
+    def record_failure(self, probe: Optional[HealthProbe] = None) -> None:
+        """
+        记录一次失败
+
+        :param probe: 后端的健康检查，断开期间在后台定时调用，成功后进入半开状态
+        """
+        self.failures += 1
+        self._trial_running = False
+        if self.state == BreakerState.HALF_OPEN:
+            # 试探失败，退避时间加倍
+            self.backoff = min(self.backoff * 2, self.max_backoff)
+            self._open(probe)
+        elif self.state == BreakerState.CLOSED and self.failures >= self.failure_threshold:
+            self._open(probe)
+
+    def abandon_trial(self) -> None:
+        """试探请求被取消、没有结果时调用，让下一个请求继续试探"""
+        self._trial_running = False
+
+    def _open(self, probe: Optional[HealthProbe]) -> None:
+        self.open_until = time.monotonic() + self.backoff
+        self._set_state(BreakerState.OPEN)
+        logger.warning(f"TTS后端 {self.name} 连续失败 {self.failures} 次，{self.backoff:.0f} 秒内暂停语音合成")
+        if probe is not None and (self._probe_task is None or self._probe_task.done()):
+            self._probe_task = asyncio.create_task(self._probe_loop(probe), name=f"TTSProbe-{self.name}")
+
+    async def _probe_loop(self, probe: HealthProbe) -> None:
+        """断开期间在每次退避结束时检查后端，恢复了就进入半开状态，否则继续退避"""
+        while self.state == BreakerState.OPEN:
+            await asyncio.sleep(max(0.0, self.open_until - time.monotonic()))
+            if self.state != BreakerState.OPEN:
+                return
+            try:
+                healthy = await probe()
+            except Exception:
+                healthy = False
+            if healthy:
+                logger.info(f"TTS后端 {self.name} 健康检查通过，尝试恢复")
+                self._set_state(BreakerState.HALF_OPEN)
+                return
+            self.backoff = min(self.backoff * 2, self.max_backoff)
+            self.open_until = time.monotonic() + self.backoff
+            logger.debug(f"TTS后端 {self.name} 健康检查失败，{self.backoff:.0f} 秒后重试")
+
+    def _set_state(self, state: BreakerState) -> None:
+        if state != BreakerState.HALF_OPEN:
+            self._trial_running = False
+        self.state = state
+
+    def close(self) -> None:
+        """停止后台健康检查"""
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            self._probe_task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state.value,
+            "failures": self.failures,
+            "backoff": self.backoff,
+            "retry_in": round(max(0.0, self.open_until - time.monotonic()), 1)
+            if self.state == BreakerState.OPEN else 0.0,
+            "rejected": self.rejected,
+        }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """同一个后端的熔断器在所有会话之间共用"""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(name)
+    return breaker
+
+
+def circuit_breaker_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: breaker.stats() for name, breaker in _breakers.items()}
@@ -1,9 +1,11 @@
-import aiohttp
 import os
+from typing import AsyncGenerator
 from ling_chat.core.TTS.base_adapter import TTSBaseAdapter
 from ling_chat.core.logger import logger
 
 class GPTSoVITSAdapter(TTSBaseAdapter):
+    supports_streaming = True
+
     def __init__(self, ref_audio_path: str, 
                  prompt_text: str="", prompt_lang: str="zh",
                  audio_format: str="wav", text_lang: str="auto",
@@ -45,7 +47,7 @@ class GPTSoVITSAdapter(TTSBaseAdapter):
         params["text"] = text
         logger.debug(f"发送到GPT-SoVITS的json: {params}")
 
-        async with aiohttp.ClientSession() as session:
+        async with self._session() as session:
             async with session.post(
                 self.api_url + "/tts",
                 json=params
@@ -54,6 +56,27 @@ class GPTSoVITSAdapter(TTSBaseAdapter):
                     raise RuntimeError(f"TTS请求失败: {await resp.text()}")
                 return await resp.read()
 
+    async def generate_voice_stream(self, text: str) -> AsyncGenerator[bytes, None]:
+        """
+        流式生成语音，GPT-SoVITS 每合成一段就返回一段
+        media_type 为 wav 时先返回WAV头再返回PCM数据，raw 为纯PCM，ogg/aac 为可以直接播放的流
+        """
+        params = self.get_params()
+        params["text"] = text
+        params["streaming_mode"] = True
+        logger.debug(f"发送到GPT-SoVITS的流式请求json: {params}")
+
+        async with self._session() as session:
+            async with session.post(
+                self.api_url + "/tts",
+                json=params
+            ) as resp:
+                if resp.status != 200:
+                    raise RuntimeError(f"TTS请求失败: {await resp.text()}")
+                async for chunk in resp.content.iter_chunked(8192):
+                    if chunk:
+                        yield chunk
+
     async def set_model(self, gpt_model_path: str, sovits_model_path: str) -> bool:
         """
         设置GPT和SoVITS模型
@@ -81,7 +104,7 @@ class GPTSoVITSAdapter(TTSBaseAdapter):
                 logger.error(f"SoVITS模型文件扩展名必须为.pth: {sovits_model_path}")
                 raise ValueError(f"SoVITS模型文件扩展名必须为.pth: {sovits_model_path}")
             
-            async with aiohttp.ClientSession() as session:
+            async with self._session() as session:
                 # 设置GPT模型
                 if gpt_model_path:
                     gpt_url = self.api_url + "/set_gpt_weights"
@@ -106,4 +129,4 @@ class GPTSoVITSAdapter(TTSBaseAdapter):
             return False
 
     def get_params(self):
-        return self.params
\ No newline at end of file
+        return self.params.copy()
\ No newline at end of file
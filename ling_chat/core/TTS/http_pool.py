@@ -0,0 +1,129 @@
+import asyncio
+import bisect
+import os
+from typing import Dict, List, Optional
+
+import aiohttp
+
+from ling_chat.core.logger import logger
+
+
+class LatencyHistogram:
+    """
+    请求耗时直方图（单位：毫秒）
+
+    按固定的桶边界计数，足够看出复用连接前后耗时分布的变化，不需要保存每一次请求。
+    """
+    DEFAULT_BUCKETS = (25, 50, 100, 200, 400, 800, 1600, 3200, 6400)
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)  # 最后一个桶记录超过最大边界的请求
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, seconds: float) -> None:
+        ms = seconds * 1000
+        self.counts[bisect.bisect_left(self.buckets, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, q: float) -> float:
+        """按桶估算分位数，返回所在桶的上边界"""
+        if self.count == 0:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return float(bound)
+        return self.max_ms
+
+    def snapshot(self) -> Dict[str, object]:
+        labels = [f"<={bound}ms" for bound in self.buckets] + [f">{self.buckets[-1]}ms"]
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class HTTPSessionPool:
+    """
+    TTS适配器共用的HTTP连接池
+
+    所有适配器共享同一个 aiohttp.ClientSession，连接在请求之间保持（keep-alive），
+    每句话不再重新进行TCP/TLS握手；同时限制对单个主机的并发连接数并缓存DNS结果。
+    会话在第一次使用时才创建，保证它属于当前运行的事件循环。
+    """
+    def __init__(self,
+                 limit: Optional[int] = None,
+                 limit_per_host: Optional[int] = None,
+                 keepalive_timeout: Optional[float] = None,
+                 dns_cache_ttl: Optional[int] = None):
+        self.limit = limit if limit is not None else int(os.environ.get("TTS_HTTP_POOL_SIZE", 32))
+        self.limit_per_host = limit_per_host if limit_per_host is not None \
+            else int(os.environ.get("TTS_HTTP_LIMIT_PER_HOST", 8))
+        self.keepalive_timeout = keepalive_timeout if keepalive_timeout is not None \
+            else float(os.environ.get("TTS_HTTP_KEEPALIVE", 60))
+        self.dns_cache_ttl = dns_cache_ttl if dns_cache_ttl is not None \
+            else int(os.environ.get("TTS_HTTP_DNS_TTL", 300))
+        # 连接超时单独设置得比较短，后端没有启动时尽快失败
+        self.timeout = aiohttp.ClientTimeout(total=float(os.environ.get("TTS_HTTP_TIMEOUT", 120)),
+                                             sock_connect=float(os.environ.get("TTS_HTTP_CONNECT_TIMEOUT", 5)))
+
+        self.connections_created = 0  # 新建的连接数（每次都要握手）
+        self.connections_reused = 0   # 复用已有连接的请求数
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(limit=self.limit,
+                                         limit_per_host=self.limit_per_host,
+                                         keepalive_timeout=self.keepalive_timeout,
+                                         use_dns_cache=True,
+                                         ttl_dns_cache=self.dns_cache_ttl)
+
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_connection_create_end(session, context, params):
+            self.connections_created += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            self.connections_reused += 1
+
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return aiohttp.ClientSession(connector=connector, timeout=self.timeout, trace_configs=[trace_config])
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """获取共享会话，会话已关闭或事件循环变化时重新创建"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._session = self._create_session()
+            self._loop = loop
+        return self._session
+
+    @property
+    def closed(self) -> bool:
+        return self._session is None or self._session.closed
+
+    def stats(self) -> Dict[str, int]:
+        return {"connections_created": self.connections_created,
+                "connections_reused": self.connections_reused}
+
+    async def close(self) -> None:
+        """关闭会话和其中的所有连接"""
+        session, self._session, self._loop = self._session, None, None
+        if session is None or session.closed:
+            return
+        try:
+            await session.close()
+        except Exception as e:
+            logger.warning(f"关闭TTS连接池时出现异常: {e}")
@@ -1,11 +1,11 @@
-import aiohttp
-
-from typing import Optional, AsyncGenerator
+from typing import AsyncGenerator
 from ling_chat.core.TTS.base_adapter import TTSBaseAdapter
 from ling_chat.core.logger import logger
 
 
 class IndexTTSAdapter(TTSBaseAdapter):
+    supports_streaming = True
+
     def __init__(self, speaker_id: int=0, model_name: str="", 
                  audio_format: str="wav", lang: str="zh"):
 
@@ -39,24 +39,30 @@ class IndexTTSAdapter(TTSBaseAdapter):
         params["stream"] = "False"  # 非流式
         logger.debug("开始调用IndexTTS生成语音...")
         
-        async with aiohttp.ClientSession() as session:
+        async with self._session() as session:
             async with session.get(self.base_url, params=params, ssl=False) as response:
                 response.raise_for_status()
                 audio_data = await response.read()
                 return audio_data
             
-    async def generate_voice_stream(self, text: str) -> Optional[AsyncGenerator[bytes, None]]:
-        """流式生成音频"""
+    async def generate_voice_stream(self, text: str, emo: str = "",
+                                    keep_header: bool = False) -> AsyncGenerator[bytes, None]:
+        """
+        流式生成音频
+
+        :param keep_header: 是否保留WAV头，保留时可以直接交给播放器播放，否则只返回PCM数据
+        """
         params = self.get_params()
         params["text"] = text
+        params["emo_id"] = emo
         params["stream"] = "True"  # 确保启用流式
         
         header_buf:bytearray = bytearray()
-        header_needed = 44  # WAV头长度
+        header_needed = 0 if keep_header else 44  # WAV头长度
         header_consumed = False
         
         try:
-            async with aiohttp.ClientSession() as session:
+            async with self._session() as session:
                 async with session.get(self.base_url, params=params, ssl=False) as response:
                     response.raise_for_status()
                     
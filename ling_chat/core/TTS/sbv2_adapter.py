@@ -1,4 +1,3 @@
-import aiohttp
 import os
 from ling_chat.core.TTS.base_adapter import TTSBaseAdapter
 from ling_chat.core.logger import logger
@@ -46,7 +45,7 @@ class SBV2Adapter(TTSBaseAdapter):
         }
         accept_header = content_types.get(self.audio_format, "audio/wav")
 
-        async with aiohttp.ClientSession() as session:
+        async with self._session() as session:
             async with session.post(
                     self.api_url + "/voice",
                     params=params,
@@ -0,0 +1,167 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Hashable, Optional
+
+from ling_chat.core.TTS.http_pool import LatencyHistogram
+
+
+class FairLimiter:
+    """
+    一个TTS后端的并发限制器
+
+    同时进行的请求数不超过 limit，其余请求排队。排队按请求方轮流放行，
+    一个会话一次提交很多句话时，不会让其他会话一直等下去。
+    """
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = max(1, limit)
+        self.active = 0
+        self.max_depth = 0
+        self.wait_time = LatencyHistogram()
+        self._queues: OrderedDict[Hashable, Deque[asyncio.Future]] = OrderedDict()  # 请求方 -> 排队中的请求
+
+    @property
+    def depth(self) -> int:
+        """正在排队的请求数"""
+        return sum(len(waiters) for waiters in self._queues.values())
+
+    async def acquire(self, owner: Hashable) -> None:
+        start = time.perf_counter()
+        if self.active < self.limit and not self._queues:
+            self.active += 1
+            self.wait_time.observe(0)
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(owner, deque()).append(waiter)
+        self.max_depth = max(self.max_depth, self.depth)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # 已经分到名额但调用方被取消了，把名额让给下一个请求
+                self.release()
+            else:
+                self._discard(owner, waiter)
+            raise
+        self.wait_time.observe(time.perf_counter() - start)
+
+    def _discard(self, owner: Hashable, waiter: asyncio.Future) -> None:
+        waiters = self._queues.get(owner)
+        if waiters is None:
+            return
+        try:
+            waiters.remove(waiter)
+        except ValueError:
+            pass
+        if not waiters:
+            del self._queues[owner]
+
+    def release(self) -> None:
+        self.active -= 1
+        # 从排在最前面的请求方取一个请求，然后把这个请求方移到队尾
+        while self._queues and self.active < self.limit:
+            owner, waiters = next(iter(self._queues.items()))
+            waiter = waiters.popleft()
+            if waiters:
+                self._queues.move_to_end(owner)
+            else:
+                del self._queues[owner]
+            if not waiter.done():
+                self.active += 1
+                waiter.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, owner: Hashable) -> AsyncIterator[None]:
+        await self.acquire(owner)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "queued": self.depth,
+            "max_queued": self.max_depth,
+            "wait": self.wait_time.snapshot(),
+        }
+
+
+class TTSScheduler:
+    """
+    所有会话共用的TTS请求调度器
+
+    每个后端一个 FairLimiter，让请求量保持在后端能承受的范围内；
+    完全相同的请求（同一个缓存键）正在进行时，后来的请求直接等待它的结果，不再重复合成。
+    """
+    def __init__(self, default_limit: Optional[int] = None):
+        self.default_limit = default_limit or int(os.environ.get("TTS_MAX_CONCURRENCY", 2))
+        self.limiters: Dict[str, FairLimiter] = {}
+        self.coalesced = 0
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[asyncio.Task, int] = {}  # 请求 -> 正在等待它的调用方数量
+
+    def limiter(self, name: str, limit: Optional[int] = None) -> FairLimiter:
+        limiter = self.limiters.get(name)
+        if limiter is None:
+            limiter = self.limiters[name] = FairLimiter(name, limit or self.default_limit)
+        return limiter
+
+    async def run(self,
+                  name: str,
+                  owner: Hashable,
+                  key: str,
+                  request: Callable[[], Awaitable[bytes]],
+                  limit: Optional[int] = None) -> bytes:
+        """
+        在后端 name 的并发限制下执行请求，相同 key 的请求合并成一次
+
+        :param owner: 请求方，用于轮流放行
+        :param request: 真正发送请求的函数
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            limiter = self.limiter(name, limit)
+
+            async def _run() -> bytes:
+                async with limiter.slot(owner):
+                    return await request()
+
+            task = asyncio.ensure_future(_run())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+
+        # 一个等待方被取消时不取消共享的请求，所有等待方都取消了才取消它
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[task] == 1 and not task.done():
+                task.cancel()
+            raise
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # 结果已经交给等待方，这里只是避免未读取异常的警告
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {name: limiter.stats() for name, limiter in self.limiters.items()}
+        stats["coalesced"] = self.coalesced
+        stats["inflight"] = len(self._inflight)
+        return stats
+
+
+tts_scheduler = TTSScheduler()
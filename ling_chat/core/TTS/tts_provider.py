@@ -1,5 +1,18 @@
+import asyncio
 import os
+import time
+from concurrent.futures import Future
 from pathlib import Path
+from typing import AsyncGenerator, TypeVar
+from ling_chat.core.TTS.base_adapter import TTSBaseAdapter
+from ling_chat.core.TTS.audio_encoder import get_audio_encoder
+from ling_chat.core.TTS.audio_writer import audio_writer
+from ling_chat.core.TTS.circuit_breaker import CircuitBreaker, circuit_breaker_stats, get_circuit_breaker
+from ling_chat.core.TTS.http_pool import HTTPSessionPool, LatencyHistogram
+from ling_chat.core.TTS.scheduler import tts_scheduler
+from ling_chat.core.TTS.voice_cache import VoiceCache, get_voice_cache
+from ling_chat.core.TTS.voice_janitor import get_voice_janitor
+from ling_chat.core.TTS.voice_stream import voice_streams
 from ling_chat.core.TTS.index_adpater import IndexTTSAdapter
 from ling_chat.core.TTS.vits_adapter import VitsAdapter
 from ling_chat.core.TTS.sbv2_adapter import SBV2Adapter
@@ -10,13 +23,17 @@ from ling_chat.core.TTS.aivis_adapter import AIVISAdapter
 from ling_chat.core.logger import logger
 from ling_chat.utils.runtime_path import temp_path
 
+AdapterT = TypeVar("AdapterT", bound=TTSBaseAdapter)
+
 
 class TTS:
     def __init__(self, 
                  default_speaker_id: int=4,
                  default_model_name: str="",
                  default_tts_type: str = "sbv2",
-                 default_language: str = "ja"
+                 default_language: str = "ja",
+                 voice_cache: VoiceCache | None = None,
+                 temp_dir: str | Path | None = None
                  ):
         """
         初始化TTS语音合成器
@@ -25,6 +42,8 @@ class TTS:
         :param default_model_name: 默认模型名称
         :param default_tts_type: 默认TTS类型
         :param default_language: 默认语言
+        :param voice_cache: 语音缓存，默认使用所有会话共用的缓存
+        :param temp_dir: 语音文件目录，默认读取 TEMP_VOICE_DIR
         """
         self.default_speaker_id = default_speaker_id
         self.default_model_name = default_model_name
@@ -34,7 +53,7 @@ class TTS:
         self.format = os.environ.get("VOICE_FORMAT", "wav")
 
         self.audio_format = self.format
-        self.temp_dir = Path(os.environ.get("TEMP_VOICE_DIR", temp_path / "data/voice"))
+        self.temp_dir = Path(temp_dir or os.environ.get("TEMP_VOICE_DIR", temp_path / "data/voice"))
         self.temp_dir.mkdir(parents=True, exist_ok=True)
         self.enable = True  # 初始化时启用
         
@@ -47,17 +66,46 @@ class TTS:
         self.aivis_adapter = None
         self.index_adapter = None
 
+        # 所有适配器共用的HTTP连接池，随AIService关闭
+        self.http_pool = HTTPSessionPool()
+        self.latency: dict[str, LatencyHistogram] = {}  # 适配器类名 -> 请求耗时直方图
+        self.voice_cache = voice_cache if voice_cache is not None else get_voice_cache()  # 按内容寻址的语音缓存，默认所有会话共用
+        self._stream_tasks: set[asyncio.Task] = set()  # 后台进行中的流式合成
+        self.audio_writer = audio_writer  # 后台写入语音文件，不阻塞事件循环
+        self.scheduler = tts_scheduler  # 所有会话共用，按后端限制并发并合并相同的请求
+
+        # 备用适配器和对冲请求，由VoiceMaker根据角色卡可用的合成器设置
+        self.fallback_types: list[str] = []
+        self.hedge = os.environ.get("TTS_HEDGE", "False").lower() == "true"
+        self.hedge_delay = float(os.environ.get("TTS_HEDGE_DELAY", 1.5))  # 主适配器耗时数据不足时的对冲等待秒数
+        self.hedged_requests = 0  # 发出对冲请求的次数
+        self.fallbacks_used = 0   # 使用备用适配器结果的次数
+
+        # 合成后压缩成 Opus/MP3 再保存，流式语音时由VoiceMaker关闭
+        self.encoder = get_audio_encoder()
+        self.encode = self.encoder.enabled
+
+    @property
+    def file_format(self) -> str:
+        """保存的语音文件的扩展名，开启压缩时是压缩后的格式"""
+        return self.encoder.extension if self.encode else self.format
+
+    def _bind(self, adapter: AdapterT) -> AdapterT:
+        """让适配器使用TTS的连接池"""
+        adapter.http_pool = self.http_pool
+        return adapter
+
     def init_sva_adapter(self,speaker_id: int):
         """
         初始化SVA适配器
 
         :param speaker_id: 说话人ID
         """
-        self.sva_adapter = VitsAdapter(
+        self.sva_adapter = self._bind(VitsAdapter(
             speaker_id = speaker_id,
             audio_format = self.format,
             lang = "ja"
-        )
+        ))
     
     def init_sbv2_adapter(self, speaker_id: int, model_name: str, language: str="ja"):
         """
@@ -67,12 +115,12 @@ class TTS:
         :param model_name: 模型名称
         :param language: 语言选择
         """
-        self.sbv2_adapter = SBV2Adapter(
+        self.sbv2_adapter = self._bind(SBV2Adapter(
             speaker_id = speaker_id,
             model_name = model_name,
             audio_format = self.format,
             lang = language
-        )
+        ))
 
     def init_sbv2api_adapter(self, model_name: str, speaker_id: int):
         """
@@ -81,11 +129,11 @@ class TTS:
         :param model_name: 模型名称
         :param speaker_id: 说话人ID
         """
-        self.sbv2api_adapter = SBV2APIAdapter(
+        self.sbv2api_adapter = self._bind(SBV2APIAdapter(
             model_name = model_name,
             speaker_id= speaker_id,
             audio_format = self.format
-        )
+        ))
         
     def init_bv2_adapter(self, speaker_id: int, language: str="zh"):
         """
@@ -94,11 +142,11 @@ class TTS:
         :param speaker_id: 说话人ID
         :param language: 语言选择
         """
-        self.bv2_adapter = BV2Adapter(
+        self.bv2_adapter = self._bind(BV2Adapter(
             speaker_id = speaker_id,
             audio_format = self.format,
             lang = language
-        )
+        ))
 
     def init_aivis_adapter(self, model_uuid: str, speaker_uuid: str|None = None, language: str="ja"):
         """
@@ -112,12 +160,12 @@ class TTS:
             logger.warning("未设置AIVIS_API_KRY环境变量，请检查是否正确设置")
             self.enable = False
             return None
-        self.aivis_adapter = AIVISAdapter(
+        self.aivis_adapter = self._bind(AIVISAdapter(
             model_uuid=model_uuid,
             speaker_uuid=speaker_uuid,
             audio_format=self.format,
             lang=language
-        )
+        ))
 
     def init_gsv_adapter(self, ref_audio_path: str, prompt_text: str, prompt_lang: str = "auto"):
         """
@@ -127,17 +175,17 @@ class TTS:
         :param prompt_text: 提示文本
         :param prompt_lang: 提示语言，默认为"auto"
         """
-        self.gsv_adapter = GPTSoVITSAdapter(
+        self.gsv_adapter = self._bind(GPTSoVITSAdapter(
             ref_audio_path = ref_audio_path,
             prompt_text = prompt_text,
             prompt_lang = prompt_lang
-        )
+        ))
 
     def init_index_adapter(self):
         """
         初始化IndexTTS适配器
         """
-        self.index_adapter = IndexTTSAdapter()
+        self.index_adapter = self._bind(IndexTTSAdapter())
 
     def _select_adapter(self, tts_type: str):
         """
@@ -191,10 +239,14 @@ class TTS:
         """
         生成语音文件
 
+        主适配器失败或熔断时按 fallback_types 的顺序使用备用适配器；
+        开启 hedge 时，主适配器超过它的p95耗时还没返回，就同时请求下一个适配器，先返回的结果胜出。
+
         :param text: 要转换为语音的文本
         :param file_name: 输出文件名
         :param tts_type: TTS类型，默认为空字符串表示自动选择
         :param lang: 语言，默认为"ja"
+        :param emo: 情绪，目前只有IndexTTS使用
         :return: 成功时返回输出文件路径，失败时返回None
         """
         if not self.enable:
@@ -207,36 +259,322 @@ class TTS:
 
         try:
             # 选择适配器
-            adapter = self._select_adapter(tts_type)
+            # 压缩后的语音和原始语音分开缓存
+            cache_name = f":{self.encoder.codec}" if self.encode else ""
+            candidates = [(adapter, VoiceCache.make_key(type(adapter).__name__ + cache_name,
+                                                        adapter.get_params(), lang, text, emo))
+                          for adapter in self._candidates(tts_type)]
+            output_file = str(file_name)
 
-            logger.debug("开始生成语音...")
-            if isinstance(adapter, IndexTTSAdapter):
-                audio_data = await adapter.generate_voice(text, emo)
+            # 同样的输入合成出的音频相同，命中缓存时直接使用缓存的文件；
+            # 主适配器不可用期间由备用适配器合成的语音也按顺序查找
+            if await self.voice_cache.aget_first([key for _, key in candidates], output_file):
+                logger.debug(f"语音缓存命中: {os.path.basename(output_file)}")
+                return output_file
+
+            if self.hedge and len(candidates) > 1:
+                result = await self._synthesize_hedged(candidates, text, emo)
             else:
-                audio_data = await adapter.generate_voice(text)
+                result = await self._synthesize_in_order(candidates, text, emo)
+            if result is None:
+                return None
+            cache_key, audio_data = result
 
-            output_file = str(file_name)
-            with open(output_file, "wb") as f:
-                f.write(audio_data)
+            if self.encode:
+                try:
+                    audio_data = await self.encoder.encode(audio_data)
+                except Exception as e:
+                    # 原始语音换回原始格式的扩展名保存，也不放进压缩语音的缓存
+                    logger.warning(f"语音压缩失败，使用原始音频: {e}")
+                    output_file = str(Path(output_file).with_suffix(f".{self.format}"))
+                    cache_key = None
+
+            # 文件在后台写入，写完之前可以从内存中读取
+            self._save(output_file, audio_data, cache_key)
 
             logger.debug(f"语音生成成功: {os.path.basename(output_file)}")
             return output_file
 
         except Exception as e:
             logger.error(f"语音生成失败: {str(e)} 文本: \"{text}\"")
-            logger.error("TTS服务不可达，已禁用语音，重新启动程序以刷新启动服务")
-            self.enable = False
             return None
-    
-    async def generate_voice_stream(self, text: str, file_name: str, 
-                             tts_type: str = "", lang: str ="ja") -> str | None:
+
+    def _candidates(self, tts_type: str) -> list[TTSBaseAdapter]:
+        """主适配器和已经初始化的备用适配器，按使用顺序排列"""
+        candidates = [self._select_adapter(tts_type)]
+        for fallback_type in self.fallback_types:
+            try:
+                adapter = self._select_adapter(fallback_type)
+            except ValueError:
+                continue
+            if all(adapter is not candidate for candidate in candidates):
+                candidates.append(adapter)
+        return candidates
+
+    async def _synthesize(self, adapter: TTSBaseAdapter, cache_key: str, text: str, emo: str) -> bytes | None:
+        """向一个适配器请求合成，后端熔断中时返回None，请求失败时抛出异常"""
+        # 后端熔断期间直接跳过，不等待请求超时
+        breaker = self._breaker(adapter)
+        if not breaker.allow():
+            logger.debug(f"TTS后端 {breaker.name} 暂时不可用，跳过语音生成")
+            return None
+
+        async def _request() -> bytes:
+            logger.debug("开始生成语音...")
+            start = time.perf_counter()
+            try:
+                if isinstance(adapter, IndexTTSAdapter):
+                    audio_data = await adapter.generate_voice(text, emo)
+                else:
+                    audio_data = await adapter.generate_voice(text)
+            except asyncio.CancelledError:
+                breaker.abandon_trial()
+                raise
+            except Exception:
+                breaker.record_failure(probe=adapter.health_check)
+                raise
+            breaker.record_success()
+            self._observe_latency(type(adapter).__name__, time.perf_counter() - start)
+            return audio_data
+
+        # 按后端限制并发，相同的请求正在进行时直接共用它的结果
+        return await self.scheduler.run(type(adapter).__name__, id(self), cache_key,
+                                        _request, adapter.max_concurrency)
+
+    async def _synthesize_in_order(self, candidates: list[tuple[TTSBaseAdapter, str]],
+                                   text: str, emo: str) -> tuple[str, bytes] | None:
+        """依次尝试每个适配器，返回第一个成功的 (缓存键, 音频)"""
+        for i, (adapter, cache_key) in enumerate(candidates):
+            try:
+                audio_data = await self._synthesize(adapter, cache_key, text, emo)
+            except Exception as e:
+                if i + 1 == len(candidates):
+                    raise
+                logger.warning(f"{type(adapter).__name__} 语音生成失败: {e}，改用备用TTS")
+                continue
+            if audio_data is not None:
+                if i > 0:
+                    self.fallbacks_used += 1
+                return cache_key, audio_data
+        return None
+
+    async def _synthesize_hedged(self, candidates: list[tuple[TTSBaseAdapter, str]],
+                                 text: str, emo: str) -> tuple[str, bytes] | None:
+        """
+        对冲请求：当前的请求超过主适配器的p95耗时还没返回时，再向下一个适配器发出请求，
+        最先成功的结果胜出，其余请求被取消。失败的请求会立即换成下一个适配器。
         """
-        生成语音文件流式
+        remaining = iter(enumerate(candidates))
+        pending: dict[asyncio.Task, tuple[int, str]] = {}
+
+        def launch_next() -> bool:
+            for i, (adapter, cache_key) in remaining:
+                task = asyncio.create_task(self._synthesize(adapter, cache_key, text, emo))
+                pending[task] = (i, cache_key)
+                return True
+            return False
+
+        hedge_delay = self._hedge_delay(candidates[0][0])
+        launch_next()
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, timeout=hedge_delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if launch_next():
+                        self.hedged_requests += 1
+                        logger.debug(f"TTS请求超过 {hedge_delay:.2f} 秒未返回，同时请求备用TTS")
+                    else:
+                        hedge_delay = None  # 没有可用的备用适配器了，等待已发出的请求
+                    continue
+                for task in done:
+                    i, cache_key = pending.pop(task)
+                    if task.cancelled():
+                        launch_next()
+                        continue
+                    error = task.exception()
+                    if error is None and task.result() is not None:
+                        if i > 0:
+                            self.fallbacks_used += 1
+                        return cache_key, task.result()
+                    if error is not None:
+                        logger.warning(f"TTS请求失败: {error}，改用备用TTS")
+                    launch_next()
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    def _hedge_delay(self, adapter: TTSBaseAdapter) -> float:
+        """主适配器的p95耗时，数据不足时使用 TTS_HEDGE_DELAY"""
+        histogram = self.latency.get(type(adapter).__name__)
+        if histogram is None or histogram.count < 20:
+            return self.hedge_delay
+        return histogram.percentile(0.95) / 1000
+
+    def _breaker(self, adapter: TTSBaseAdapter) -> CircuitBreaker:
+        """同一种后端的熔断器在所有会话之间共用"""
+        return get_circuit_breaker(type(adapter).__name__)
+
+    def _save(self, output_file: str, audio_data: bytes, cache_key: str | None) -> Future:
+        """交给写入线程保存语音文件，写好后加入语音缓存"""
+        if cache_key is None:
+            return self.audio_writer.submit(output_file, audio_data)
+        return self.audio_writer.submit(output_file, audio_data,
+                                        on_written=lambda: self.voice_cache.put(cache_key, output_file))
+
+    def _observe_latency(self, name: str, seconds: float) -> None:
+        histogram = self.latency.get(name)
+        if histogram is None:
+            histogram = self.latency[name] = LatencyHistogram()
+        histogram.observe(seconds)
+
+    def latency_stats(self) -> dict[str, dict]:
+        """每个适配器的请求耗时分布，以及连接池、缓存、写入和调度队列的统计"""
+        stats: dict[str, dict] = {name: histogram.snapshot() for name, histogram in self.latency.items()}
+        stats["http_pool"] = self.http_pool.stats()
+        stats["voice_cache"] = self.voice_cache.stats()
+        stats["audio_writer"] = self.audio_writer.stats()
+        stats["scheduler"] = self.scheduler.stats()
+        stats["circuit_breakers"] = circuit_breaker_stats()
+        stats["encoder"] = self.encoder.stats()
+        stats["temp_voice"] = get_voice_janitor().stats()
+        stats["fallback"] = {"chain": self.fallback_types, "used": self.fallbacks_used,
+                             "hedged": self.hedged_requests}
+        return stats
+
+    async def close(self) -> None:
+        """停止还在进行的流式合成，关闭连接池，释放所有保持的连接"""
+        for task in list(self._stream_tasks):
+            task.cancel()
+        if self._stream_tasks:
+            await asyncio.gather(*self._stream_tasks, return_exceptions=True)
+        await self.http_pool.close()
+
+    async def generate_voice_stream(self, text: str, file_name: str,
+                                    tts_type: str = "", lang: str ="ja", emo: str = "") -> AsyncGenerator[bytes, None]:
+        """
+        流式生成语音，边合成边返回音频块
+
+        后端支持流式时每收到一块就返回一块，否则合成完成后整段返回。
+        结束后和 generate_voice 一样把完整的音频写入 file_name 并加入缓存。
+        合成失败时只记录日志，已经返回的音频块不完整。
 
         :param text: 要转换为语音的文本
         :param file_name: 输出文件名
         :param tts_type: TTS类型，默认为空字符串表示自动选择
         :param lang: 语言，默认为"ja"
-        :return: 成功时返回输出文件路径，失败时返回None
+        :param emo: 情绪，目前只有IndexTTS使用
         """
-        return None
+        try:
+            async for chunk in self._stream_chunks(text, file_name, tts_type, lang, emo):
+                yield chunk
+        except Exception as e:
+            logger.error(f"流式语音生成失败: {str(e)} 文本: \"{text}\"")
+
+    def _stream_keys(self, candidates: list[TTSBaseAdapter], lang: str, text: str, emo: str) -> list[str]:
+        return [VoiceCache.make_key(type(adapter).__name__, adapter.get_params(), lang, text, emo)
+                for adapter in candidates]
+
+    async def _stream_chunks(self, text: str, file_name: str,
+                             tts_type: str, lang: str, emo: str) -> AsyncGenerator[bytes, None]:
+        """generate_voice_stream 的实现，合成失败时抛出异常"""
+        if not self.enable:
+            logger.warning("TTS服务未启用，跳过语音生成")
+            return
+
+        if not text or not text.strip():
+            logger.debug("提供的文本为空，跳过语音生成")
+            return
+
+        candidates = self._candidates(tts_type)
+        output_file = str(file_name)
+
+        keys = self._stream_keys(candidates, lang, text, emo)
+        if await self.voice_cache.aget_first(keys, output_file):
+            logger.debug(f"语音缓存命中: {os.path.basename(output_file)}")
+            yield await asyncio.to_thread(Path(output_file).read_bytes)
+            return
+
+        # 流式合成不能中途切换，使用第一个没有熔断的适配器
+        for adapter, cache_key in zip(candidates, keys):
+            breaker = self._breaker(adapter)
+            if breaker.allow():
+                break
+        else:
+            logger.debug("所有TTS后端暂时不可用，跳过语音生成")
+            return
+        if adapter is not candidates[0]:
+            self.fallbacks_used += 1
+
+        name = type(adapter).__name__
+        audio_data = bytearray()
+        try:
+            async with self.scheduler.limiter(name, adapter.max_concurrency).slot(id(self)):
+                logger.debug("开始流式生成语音...")
+                start = time.perf_counter()
+                if isinstance(adapter, IndexTTSAdapter):
+                    chunks = adapter.generate_voice_stream(text, emo, keep_header=True)
+                else:
+                    chunks = adapter.generate_voice_stream(text)
+
+                async for chunk in chunks:
+                    if not audio_data:
+                        self._observe_latency(name + ".first_chunk", time.perf_counter() - start)
+                    audio_data.extend(chunk)
+                    yield chunk
+                self._observe_latency(name, time.perf_counter() - start)
+        except Exception:
+            breaker.record_failure(probe=adapter.health_check)
+            raise
+        except BaseException:
+            # 被取消或读取方提前结束，没有得到结果
+            breaker.abandon_trial()
+            raise
+        breaker.record_success()
+
+        self._save(output_file, bytes(audio_data), cache_key)
+        logger.debug(f"流式语音生成成功: {os.path.basename(output_file)}")
+
+    def start_voice_stream(self, text: str, file_name: str,
+                           tts_type: str = "", lang: str = "ja", emo: str = "") -> asyncio.Task | None:
+        """
+        在后台开始流式合成，不等待合成结束
+
+        合成过程中可以通过 voice_streams 按文件名读取已经收到的音频块，
+        合成结束后文件已经写好，按原来的方式读取文件即可。
+        确定不会有语音时（没有文本、适配器未初始化、所有后端都在熔断且没有缓存）返回None；
+        否则返回的任务结束时结果表示是否得到了完整的语音，合成失败的语音在 voice_streams 中带有错误。
+        """
+        if not self.enable or not text or not text.strip():
+            return None
+        try:
+            candidates = self._candidates(tts_type)
+        except ValueError as e:
+            logger.error(f"流式语音生成失败: {str(e)} 文本: \"{text}\"")
+            return None
+        if not any(self._breaker(adapter).available() for adapter in candidates) and \
+                not any(key in self.voice_cache for key in self._stream_keys(candidates, lang, text, emo)):
+            logger.debug("所有TTS后端暂时不可用，跳过语音生成")
+            return None
+
+        stream = voice_streams.open(os.path.basename(file_name))
+
+        async def _pump() -> bool:
+            try:
+                async for chunk in self._stream_chunks(text, file_name, tts_type, lang, emo):
+                    stream.feed(chunk)
+                if not stream.chunks:
+                    stream.fail("没有生成音频")
+            except Exception as e:
+                logger.error(f"流式语音生成失败: {str(e)} 文本: \"{text}\"")
+                stream.fail(str(e))
+            finally:
+                voice_streams.close(stream)
+            return stream.error is None
+
+        task = asyncio.create_task(_pump(), name=f"VoiceStream-{stream.name}")
+        self._stream_tasks.add(task)
+        task.add_done_callback(self._stream_tasks.discard)
+        return task
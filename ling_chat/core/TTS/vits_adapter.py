@@ -1,4 +1,3 @@
-import aiohttp
 import os
 from ling_chat.core.TTS.base_adapter import TTSBaseAdapter
 from ling_chat.core.logger import logger
@@ -28,7 +27,7 @@ class VitsAdapter(TTSBaseAdapter):
         params["text"] = text
         logger.debug("发送到SVA-Vits的请求:"+ str(params))
 
-        async with aiohttp.ClientSession() as session:
+        async with self._session() as session:
             async with session.get(
                 self.api_url + "/voice/vits", 
                 params=params
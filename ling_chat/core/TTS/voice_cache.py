@@ -0,0 +1,199 @@
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
+
+from ling_chat.core.logger import logger
+from ling_chat.utils.runtime_path import user_data_path
+
+
+class VoiceCache:
+    """
+    按内容寻址的语音磁盘缓存
+
+    键是 (TTS类型, 适配器参数, 语言, 文本, 情绪) 的哈希，相同的输入一定得到相同的音频，
+    所以剧本台词和常见短句只需要合成一次。缓存按最近使用排序，
+    超出容量上限或超过保存期限的文件会被删除。
+    """
+    def __init__(self,
+                 cache_dir: Optional[Path] = None,
+                 max_bytes: Optional[int] = None,
+                 max_age: Optional[float] = None):
+        self.cache_dir = Path(cache_dir or os.environ.get("TTS_CACHE_DIR") or user_data_path / "cache/voice")
+        self.max_bytes = max_bytes if max_bytes is not None \
+            else int(float(os.environ.get("TTS_CACHE_MAX_MB", 512)) * 1024 * 1024)
+        self.max_age = max_age if max_age is not None \
+            else float(os.environ.get("TTS_CACHE_MAX_AGE_DAYS", 30)) * 86400
+        self.hits = 0
+        self.misses = 0
+        self.total_bytes = 0
+        self._entries: OrderedDict[str, Tuple[Path, int, float]] = OrderedDict()  # 键 -> (路径, 大小, 最后使用时间)
+        self._lock = threading.Lock()
+        if self.enabled:
+            self._load()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def make_key(tts_type: str, params: Dict, lang: str, text: str, emo: str = "") -> str:
+        # params 中的 text 会被适配器改写成上一次请求的文本，不能参与计算
+        params = {k: v for k, v in params.items() if k != "text"}
+        raw = json.dumps([tts_type, params, lang, text, emo], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _load(self) -> None:
+        """扫描缓存目录，按文件的修改时间（即最后使用时间）重建索引"""
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            files = []
+            for path in self.cache_dir.iterdir():
+                if path.is_file() and not path.name.endswith(".tmp"):
+                    stat = path.stat()
+                    files.append((stat.st_mtime, path, stat.st_size))
+        except OSError as e:
+            logger.warning(f"读取语音缓存目录失败: {e}")
+            return
+        for mtime, path, size in sorted(files):
+            self._entries[path.stem] = (path, size, mtime)
+            self.total_bytes += size
+        self._evict()
+        logger.debug(f"已加载 {len(self._entries)} 个语音缓存文件，共 {self.total_bytes / 1024 / 1024:.1f} MB")
+
+    def get(self, key: str, output_file: str) -> bool:
+        """缓存命中时把音频放到 output_file 并返回True"""
+        if not self.enabled:
+            return False
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[2] > self.max_age:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return False
+            path, size, _ = entry
+            self._entries[key] = (path, size, now)
+            self._entries.move_to_end(key)
+        try:
+            self._place(path, Path(output_file))
+            os.utime(path, (now, now))
+        except OSError as e:
+            logger.warning(f"读取语音缓存失败: {e}")
+            with self._lock:
+                self._remove(key)
+                self.misses += 1
+            return False
+        with self._lock:
+            self.hits += 1
+        return True
+
+    def get_first(self, keys: Sequence[str], output_file: str) -> Optional[str]:
+        """按顺序查找多个键，把第一个命中的音频放到 output_file，返回命中的键"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            present = [key for key in keys if key in self._entries]
+            if not present:
+                self.misses += 1
+                return None
+        for key in present:
+            if self.get(key, output_file):
+                return key
+        return None
+
+    async def aget(self, key: str, output_file: str) -> bool:
+        """get 的异步版本，链接或复制文件在线程池中进行，不阻塞事件循环"""
+        if not self.enabled:
+            return False
+        return await asyncio.to_thread(self.get, key, output_file)
+
+    async def aget_first(self, keys: Sequence[str], output_file: str) -> Optional[str]:
+        """get_first 的异步版本"""
+        if not self.enabled:
+            return None
+        return await asyncio.to_thread(self.get_first, keys, output_file)
+
+    def put(self, key: str, audio_file: str) -> None:
+        """把刚生成的语音文件加入缓存"""
+        if not self.enabled:
+            return
+        source = Path(audio_file)
+        path = self.cache_dir / f"{key}{source.suffix}"
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(path.name + ".tmp")
+            self._place(source, tmp_path)
+            tmp_path.replace(path)
+            size = path.stat().st_size
+        except OSError as e:
+            logger.warning(f"写入语音缓存失败: {e}")
+            return
+        with self._lock:
+            if key in self._entries:
+                self.total_bytes -= self._entries[key][1]
+            self._entries[key] = (path, size, time.time())
+            self._entries.move_to_end(key)
+            self.total_bytes += size
+            self._evict()
+
+    @staticmethod
+    def _place(source: Path, target: Path) -> None:
+        """优先使用硬链接，不需要复制数据；跨文件系统时退回到复制"""
+        if target.exists():
+            target.unlink()
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copyfile(source, target)
+
+    def _remove(self, key: str) -> None:
+        path, size, _ = self._entries.pop(key)
+        self.total_bytes -= size
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"删除语音缓存失败: {e}")
+
+    def _evict(self) -> None:
+        """删除过期的文件，以及超出容量时最近最少使用的文件"""
+        now = time.time()
+        for key, (_, _, last_used) in list(self._entries.items()):
+            if now - last_used <= self.max_age:
+                break
+            self._remove(key)
+        while self.total_bytes > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "files": len(self._entries), "bytes": self.total_bytes}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+
+_voice_cache: Optional[VoiceCache] = None
+
+
+def get_voice_cache() -> VoiceCache:
+    """所有会话共用同一个语音缓存"""
+    global _voice_cache
+    if _voice_cache is None:
+        _voice_cache = VoiceCache()
+    return _voice_cache
@@ -0,0 +1,169 @@
+import asyncio
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from ling_chat.core.TTS.audio_writer import audio_writer
+from ling_chat.core.TTS.voice_stream import voice_streams
+from ling_chat.core.logger import logger
+from ling_chat.utils.runtime_path import temp_path
+
+
+class VoiceJanitor:
+    """
+    临时语音目录的后台清理
+
+    定时扫描 TTS 的临时语音目录：超过保留时间的文件删除；前端确认播放完的文件
+    再保留 ack_ttl 秒（历史记录里还能重播）后删除；目录总大小超过上限时，
+    先删已播放的，再从最旧的开始删。还在合成或写入的语音不会被删除。
+    """
+    def __init__(self,
+                 voice_dir: Optional[Path] = None,
+                 max_bytes: Optional[int] = None,
+                 max_age: Optional[float] = None,
+                 ack_ttl: Optional[float] = None,
+                 interval: Optional[float] = None):
+        self.voice_dir = Path(voice_dir or os.environ.get("TEMP_VOICE_DIR", temp_path / "data/voice"))
+        self.max_bytes = max_bytes if max_bytes is not None \
+            else int(float(os.environ.get("TTS_TEMP_MAX_MB", 256)) * 1024 * 1024)
+        self.max_age = max_age if max_age is not None \
+            else float(os.environ.get("TTS_TEMP_MAX_AGE_MINUTES", 120)) * 60
+        self.ack_ttl = ack_ttl if ack_ttl is not None else float(os.environ.get("TTS_TEMP_ACK_TTL", 300))
+        self.interval = interval or float(os.environ.get("TTS_TEMP_GC_INTERVAL", 60))
+
+        self.files = 0
+        self.total_bytes = 0
+        self.deleted = 0
+        self.freed_bytes = 0
+        self.runs = 0
+        self.last_run = 0.0
+        self._acked: Dict[str, float] = {}  # 文件名 -> 前端确认播放完的时间
+        self._task: Optional[asyncio.Task] = None
+
+    def acknowledge(self, name: str) -> bool:
+        """前端播放完一条语音，返回文件是否存在"""
+        name = os.path.basename(name)
+        if not (self.voice_dir / name).exists() and audio_writer.get_pending(name) is None:
+            return False
+        self._acked.setdefault(name, time.time())
+        return True
+
+    def collect(self) -> int:
+        """清理一次，返回删除的文件数。会访问磁盘，在线程中调用"""
+        now = time.time()
+        files: List[Tuple[float, str, Path, int]] = []
+        try:
+            entries = list(self.voice_dir.iterdir())
+        except OSError as e:
+            logger.warning(f"读取临时语音目录失败: {e}")
+            return 0
+        for path in entries:
+            try:
+                if not path.is_file():
+                    continue
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, path.name, path, stat.st_size))
+
+        total = sum(size for _, _, _, size in files)
+        remaining = {name for _, name, _, _ in files}
+        keep: List[Tuple[bool, float, Path, int]] = []
+        removed = 0
+        for mtime, name, path, size in files:
+            acked_at = self._acked.get(name)
+            if self._busy(name):
+                continue
+            if now - mtime > self.max_age or (acked_at is not None and now - acked_at > self.ack_ttl):
+                if self._delete(path, size):
+                    total -= size
+                    removed += 1
+                    remaining.discard(name)
+            else:
+                keep.append((acked_at is None, mtime, path, size))
+
+        # 超过大小上限：先删已经播放过的，再删最旧的
+        if self.max_bytes > 0 and total > self.max_bytes:
+            for _, _, path, size in sorted(keep):
+                if total <= self.max_bytes:
+                    break
+                if self._delete(path, size):
+                    total -= size
+                    removed += 1
+                    remaining.discard(path.name)
+
+        # 文件已经不在了的确认记录也一起清掉
+        self._acked = {name: t for name, t in self._acked.items() if name in remaining}
+        self.files = len(remaining)
+        self.total_bytes = total
+        self.runs += 1
+        self.last_run = now
+        if removed:
+            logger.debug(f"已清理 {removed} 个临时语音文件，目录现有 {self.total_bytes / 1024 / 1024:.1f} MB")
+        return removed
+
+    @staticmethod
+    def _busy(name: str) -> bool:
+        """语音还在合成或写入"""
+        return voice_streams.get(name) is not None or audio_writer.get_pending(name) is not None
+
+    def _delete(self, path: Path, size: int) -> bool:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            logger.warning(f"清理临时语音失败 {path.name}: {e}")
+            return False
+        self.deleted += 1
+        self.freed_bytes += size
+        return True
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="VoiceJanitor")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.collect)
+            except Exception as e:
+                logger.error(f"清理临时语音时出错: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {
+            "dir": str(self.voice_dir),
+            "files": self.files,
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "acked": len(self._acked),
+            "deleted": self.deleted,
+            "freed_bytes": self.freed_bytes,
+            "runs": self.runs,
+            "last_run": self.last_run,
+        }
+        try:
+            stats["disk_free"] = shutil.disk_usage(self.voice_dir).free
+        except OSError:
+            stats["disk_free"] = None
+        return stats
+
+
+_voice_janitor: Optional[VoiceJanitor] = None
+
+
+def get_voice_janitor() -> VoiceJanitor:
+    """所有会话共用同一个临时语音目录"""
+    global _voice_janitor
+    if _voice_janitor is None:
+        _voice_janitor = VoiceJanitor()
+    return _voice_janitor
@@ -0,0 +1,110 @@
+import asyncio
+from collections import OrderedDict
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional
+
+MEDIA_TYPES = {
+    ".wav": "audio/wav",
+    ".ogg": "audio/ogg",
+    ".opus": "audio/ogg",
+    ".mp3": "audio/mpeg",
+    ".flac": "audio/flac",
+    ".aac": "audio/aac",
+}
+
+
+def guess_media_type(file_name: str) -> str:
+    return MEDIA_TYPES.get(Path(file_name).suffix.lower(), "application/octet-stream")
+
+
+class VoiceStreamError(Exception):
+    """语音合成失败，已经收到的音频不完整"""
+
+
+class VoiceStream:
+    """
+    一条正在合成的语音
+
+    合成任务不断写入音频块，任意数量的读者都可以从头读取已经收到的块，
+    然后等待新的块，直到合成结束。合成失败时读者在读完已有的块后收到 VoiceStreamError。
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.media_type = guess_media_type(name)
+        self.chunks: List[bytes] = []
+        self.done = False
+        self.error: Optional[str] = None
+        self._changed = asyncio.Event()
+
+    def _notify(self) -> None:
+        # 唤醒所有等待中的读者，之后的读者等待新的事件
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def feed(self, chunk: bytes) -> None:
+        if chunk and not self.done:
+            self.chunks.append(chunk)
+            self._notify()
+
+    def finish(self) -> None:
+        self.done = True
+        self._notify()
+
+    def fail(self, error: str) -> None:
+        if not self.done:
+            self.error = error
+            self.finish()
+
+    async def wait_ready(self) -> bool:
+        """等到收到第一块音频或者合成结束，返回是否有音频可读"""
+        while not self.chunks and not self.done:
+            await self._changed.wait()
+        return bool(self.chunks)
+
+    async def iter_chunks(self) -> AsyncIterator[bytes]:
+        i = 0
+        while True:
+            while i < len(self.chunks):
+                yield self.chunks[i]
+                i += 1
+            if self.done:
+                if self.error is not None:
+                    raise VoiceStreamError(self.error)
+                return
+            await self._changed.wait()
+
+
+class VoiceStreamRegistry:
+    """
+    按语音文件名登记正在合成的语音，合成结束后文件已经写好，直接读取文件即可
+
+    合成失败的语音没有文件，保留最近 MAX_FAILED 条，前端请求时可以返回错误而不是找不到。
+    """
+    MAX_FAILED = 64
+
+    def __init__(self):
+        self._streams: Dict[str, VoiceStream] = {}
+        self._failed: "OrderedDict[str, VoiceStream]" = OrderedDict()
+
+    def open(self, name: str) -> VoiceStream:
+        self._failed.pop(name, None)
+        stream = self._streams[name] = VoiceStream(name)
+        return stream
+
+    def get(self, name: str) -> Optional[VoiceStream]:
+        return self._streams.get(name) or self._failed.get(name)
+
+    def close(self, stream: VoiceStream) -> None:
+        stream.finish()
+        if self._streams.get(stream.name) is stream:
+            del self._streams[stream.name]
+            if stream.error is not None:
+                self._failed[stream.name] = stream
+                if len(self._failed) > self.MAX_FAILED:
+                    self._failed.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._streams)
+
+
+voice_streams = VoiceStreamRegistry()
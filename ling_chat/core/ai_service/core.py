@@ -9,8 +9,8 @@ from ling_chat.core.ai_service.voice_maker import VoiceMaker
 from ling_chat.core.ai_service.ai_logger import AILogger
 from ling_chat.core.ai_service.translator import Translator
 from ling_chat.core.ai_service.events_scheduler import EventsScheduler
-from ling_chat.core.llm_providers.manager import LLMManager
-from ling_chat.core.messaging.broker import message_broker
+from ling_chat.core.llm_providers.manager import get_shared_llm_manager
+from ling_chat.core.messaging.broker import message_broker, Subscription
 from ling_chat.core.ai_service.config import AIServiceConfig
 from ling_chat.core.logger import logger
 from ling_chat.core.ai_service.message_system.message_generator import MessageGenerator
@@ -19,22 +19,23 @@ from ling_chat.core.ai_service.script_engine.script_manager import ScriptManager
 import os
 
 class AIService:
-    def __init__(self, settings: dict[str, str]):
+    def __init__(self, settings: dict[str, str], user_id: str = "1"):
 
         """
         初始化AI助手实例
         
         参数:
             settings: 配置字典，包含各种设置项
+            user_id: 这个会话所属的用户，每个用户有自己独立的AIService
         """
         self.memory = []  # 存储对话历史记录的列表
-        self.user_id = "1"   # TODO: 多用户的时候这里可以改成按照初始化获取，或者直接从client_id中获取
+        self.user_id = str(user_id)
 
         self.config = AIServiceConfig(clients=set(), user_id=self.user_id)
         
         self.use_rag = os.environ.get("USE_RAG", "False").lower() == "true"
         self.rag_manager = RAGManager() if self.use_rag else None
-        self.llm_model = LLMManager()
+        self.llm_model = get_shared_llm_manager()
         self.ai_logger = AILogger()
         self.voice_maker = VoiceMaker()
         self.translator = Translator(self.voice_maker)
@@ -52,8 +53,7 @@ class AIService:
         self.input_messages: list[str] = [] 
 
         # self.output_queue_name = self.client_id             # WebSocket输出队列
-        self.client_tasks: Dict[str, asyncio.Task] = {}
-        self.processing_task = asyncio.create_task(self._process_message_loop())
+        self.client_tasks: Dict[str, asyncio.Task] = {}  # 客户端的消息处理任务，在add_client/remove_client中同步创建和取消
         self.global_task = asyncio.create_task(self._process_global_messages())
 
         self.events_scheduler = EventsScheduler(self.config)
@@ -125,103 +125,105 @@ class AIService:
     async def start_script(self):
         await self.scripts_manager.start_script()
     
-    async def _process_client_messages(self, client_id: str):
+    async def _process_client_messages(self, client_id: str, subscription: Subscription):
         """处理单个客户端的消息"""
-        input_queue_name = f"ai_input_{client_id}"
         try:
-            async for message in self.message_broker.subscribe(input_queue_name):
-                try:
-                    self.is_processing = True
+            with subscription:
+                async for message in subscription:
+                    try:
+                        self.is_processing = True
                     
-                    user_message = message.get("content", "")
-                    if user_message:
-                        self.message_generator.memory_init(self.memory)
+                        user_message = message.get("content", "")
+                        if user_message:
+                            self.message_generator.memory_init(self.memory)
                         
-                        responses = []
-                        async for response in self.message_generator.process_message_stream(user_message):
-                            await message_broker.publish(client_id, response.model_dump())
-                            responses.append(response)
+                            responses = []
+                            async for response in self.message_generator.process_message_stream(user_message):
+                                await message_broker.publish(client_id, response)
+                                responses.append(response)
                         
-                        logger.debug(f"消息处理完成，共生成 {len(responses)} 个响应片段")
+                            logger.debug(f"消息处理完成，共生成 {len(responses)} 个响应片段")
                     
-                    self.is_processing = False
+                        self.is_processing = False
                     
-                except Exception as e:
-                    logger.error(f"处理消息时发生错误: {e}")
-                    self.is_processing = False
+                    except Exception as e:
+                        logger.error(f"处理消息时发生错误: {e}")
+                        self.is_processing = False
         except asyncio.CancelledError:
             logger.info(f"客户端 {client_id} 的消息处理任务已被取消")
         except Exception as e:
             logger.error(f"客户端 {client_id} 的消息处理发生严重错误: {e}")
             raise
 
-    async def _process_message_loop(self):
-        """主消息处理循环"""
-        while True:
-            try:
-                # 检查是否有新的客户端需要添加
-                for client_id in self.config.clients:
-                    if client_id not in self.client_tasks:
-                        task = asyncio.create_task(self._process_client_messages(client_id))
-                        self.client_tasks[client_id] = task
-                        logger.info(f"已为客户端 {client_id} 创建消息处理任务")
-
-                # 检查是否有客户端任务已完成或需要移除
-                for client_id in list(self.client_tasks.keys()):
-                    if client_id not in self.config.clients:
-                        task = self.client_tasks[client_id]
-                        task.cancel()
-                        try:
-                            await task
-                        except asyncio.CancelledError:
-                            pass
-                        del self.client_tasks[client_id]
-                        logger.info(f"已移除客户端 {client_id} 的消息处理任务")
-
-                await asyncio.sleep(0.1)  # 短暂休眠以避免过度占用CPU
-
-            except Exception as e:
-                logger.error(f"消息处理循环发生错误: {e}")
-                await asyncio.sleep(1)  # 发生错误时等待较长时间再重试
-
     async def add_client(self, client_id: str):
-        """添加新客户端"""
+        """添加新客户端，并立即为它创建消息处理任务"""
         logger.info(f"添加客户端: {client_id}")
         self.config.clients.add(client_id)
-        # 消息处理循环会在下一次迭代时自动创建新任务
+        if client_id in self.client_tasks:
+            return
+
+        # 先同步订阅输入主题，保证任务开始运行之前发来的消息也不会丢失
+        subscription = self.message_broker.subscribe(f"ai_input_{client_id}")
+        task = asyncio.create_task(self._process_client_messages(client_id, subscription),
+                                   name=f"Client-{client_id}")
+        self.client_tasks[client_id] = task
+        # 任务无论以何种方式结束（包括还没开始运行就被取消）都要取消订阅并从表中移除
+        task.add_done_callback(lambda t: self._on_client_task_done(client_id, t, subscription))
+        logger.info(f"已为客户端 {client_id} 创建消息处理任务")
 
     async def remove_client(self, client_id: str):
-        """移除客户端"""
+        """移除客户端，并立即取消它的消息处理任务"""
         logger.info(f"移除客户端: {client_id}")
         self.config.clients.discard(client_id)
-        # 消息处理循环会在下一次迭代时自动取消并清理任务
+        self.message_broker.discard_pending(f"ai_input_{client_id}", f"ai_script_input_{client_id}")
+        task = self.client_tasks.pop(client_id, None)
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"客户端 {client_id} 的消息处理任务退出时发生错误: {e}")
+        logger.info(f"已移除客户端 {client_id} 的消息处理任务")
+
+    def _on_client_task_done(self, client_id: str, task: asyncio.Task, subscription: Subscription) -> None:
+        subscription.close()
+        if self.client_tasks.get(client_id) is task:
+            del self.client_tasks[client_id]
+
+    @property
+    def live_client_tasks(self) -> int:
+        """当前仍在运行的客户端消息处理任务数"""
+        return sum(1 for task in self.client_tasks.values() if not task.done())
 
     async def _process_global_messages(self):
         """处理全局消息"""
-        global_queue_name = "ai_input_global"
+        global_queue_name = f"ai_input_global_{self.user_id}"
         try:
-            async for message in self.message_broker.subscribe(global_queue_name):
-                try:
-                    self.is_processing = True
+            with self.message_broker.subscribe(global_queue_name) as subscription:
+                async for message in subscription:
+                    try:
+                        self.is_processing = True
                     
-                    user_message = message.get("content", "")
-                    if user_message:
-                        self.message_generator.memory_init(self.memory)
+                        user_message = message.get("content", "")
+                        if user_message:
+                            self.message_generator.memory_init(self.memory)
                         
-                        responses = []
-                        async for response in self.message_generator.process_message_stream(user_message):
-                            # 发送给所有客户端
-                            for client_id in self.config.clients:
-                                await message_broker.publish(client_id, response.model_dump())
-                            responses.append(response)
+                            responses = []
+                            async for response in self.message_generator.process_message_stream(user_message):
+                                # 发送给这个用户的所有客户端，回复只序列化一次
+                                await message_broker.publish_many(self.config.clients, response)
+                                responses.append(response)
                         
-                        logger.debug(f"全局消息处理完成，共生成 {len(responses)} 个响应片段")
+                            logger.debug(f"全局消息处理完成，共生成 {len(responses)} 个响应片段")
                     
-                    self.is_processing = False
+                        self.is_processing = False
                     
-                except Exception as e:
-                    logger.error(f"处理全局消息时发生错误: {e}")
-                    self.is_processing = False
+                    except Exception as e:
+                        logger.error(f"处理全局消息时发生错误: {e}")
+                        self.is_processing = False
         except asyncio.CancelledError:
             logger.info("全局消息处理任务已被取消")
         except Exception as e:
@@ -233,25 +235,21 @@ class AIService:
         logger.info("正在关闭AI服务...")
         
         # 取消所有客户端任务
-        for client_id, task in self.client_tasks.items():
-            task.cancel()
-            try:
-                await task
-            except asyncio.CancelledError:
-                pass
+        for client_id in list(self.client_tasks):
+            await self.remove_client(client_id)
         
+        await self.events_scheduler.cleanup()
+
         # 取消全局消息处理任务
         self.global_task.cancel()
         try:
             await self.global_task
         except asyncio.CancelledError:
             pass
-        
-        # 取消主处理任务
-        self.processing_task.cancel()
-        try:
-            await self.processing_task
-        except asyncio.CancelledError:
-            pass
+
+        # 等待已经发出的合并翻译结束，再关闭TTS连接池
+        if self.translator.batcher is not None:
+            await self.translator.batcher.close()
+        await self.voice_maker.close()
         
         logger.info("AI服务已关闭")
\ No newline at end of file
@@ -13,6 +13,7 @@ from ling_chat.core.ai_service.rag_manager import RAGManager
 from ling_chat.utils.function import Function
 from ling_chat.core.logger import logger
 from ling_chat.core.ai_service.ai_logger import AILogger
+from ling_chat.core.ai_service.config import AIServiceConfig
 
 from ling_chat.core.messaging.broker import message_broker
 
@@ -23,7 +24,8 @@ class MessageGenerator:
                 translator: Translator,
                 llm_model: LLMManager,
                 rag_manager: Optional[RAGManager],
-                ai_logger: AILogger):
+                ai_logger: AILogger,
+                config: Optional[AIServiceConfig] = None):
 
         self.use_rag = os.environ.get("USE_RAG", "False").lower() == "true"
         self.rag_manager = rag_manager if rag_manager else RAGManager() if self.use_rag else None
@@ -33,6 +35,7 @@ class MessageGenerator:
         self.llm_model = llm_model if llm_model else LLMManager()
         self.ai_logger = ai_logger if ai_logger else AILogger()
         self.function = Function()
+        self.config = config  # 回复推送给这个会话的客户端
 
         # 并发消费者数量设置，从env读取
         self.concurrency = int(os.environ.get("COMSUMERS", 3))
@@ -103,8 +106,8 @@ class MessageGenerator:
                 
                 # 从仓库中取出处理好的结果并发布
                 response = results_store.pop(next_index_to_publish)
-                if response:
-                    await message_broker.publish("1", response)
+                if response and self.config is not None:
+                    await message_broker.publish_many(self.config.clients, response)
                 
                 # 清理内存并准备发布下一个
                 del publish_events[next_index_to_publish] 
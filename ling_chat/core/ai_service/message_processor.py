@@ -32,7 +32,7 @@ class MessageProcessor:
             logger.warning("未在文本中找到【】格式的情绪标签，将尝试添加默认标签")
             return []
 
-        results = []
+        segments = []
         for i, (full_tag, emotion_tag, following_text) in enumerate(emotion_segments, 1):
             following_text = following_text.replace('(', '（').replace(')', '）')
 
@@ -62,30 +62,27 @@ class MessageProcessor:
             except Exception as e:
                 logger.warning(f"语言检测错误: {e}")
 
-            try:
-                predicted = emotion_classifier.predict(emotion_tag)
-                prediction_result = {
-                    "label": predicted["label"],
-                    "confidence": predicted["confidence"]
-                }
-            except Exception as e:
-                logger.error(f"情绪预测错误 '{emotion_tag}': {e}")
-                prediction_result = {
-                    "label": "normal",
-                    "confidence": 0.5
-                }
-            
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            segments.append((i, emotion_tag, cleaned_text, motion_text, japanese_text))
+
+        # 所有片段的情绪标签合并成一次模型推理
+        emotion_tags = [emotion_tag for _, emotion_tag, _, _, _ in segments]
+        try:
+            predictions = emotion_classifier.predict_batch(emotion_tags)
+        except Exception as e:
+            logger.error(f"情绪预测错误 {emotion_tags}: {e}")
+            predictions = [{"label": "normal", "confidence": 0.5}] * len(segments)
 
+        results = []
+        for (i, emotion_tag, cleaned_text, motion_text, japanese_text), predicted in zip(segments, predictions):
             results.append({
                 "index": i,
                 "original_tag": emotion_tag,
                 "following_text": cleaned_text,
                 "motion_text": motion_text,
                 "japanese_text": japanese_text,
-                "predicted": prediction_result["label"],
-                "confidence": prediction_result["confidence"],
-                "voice_file": str(self.voice_maker.tts_provider.temp_dir / f"{uuid.uuid4()}_part_{i}.{self.voice_maker.tts_provider.format}")
+                "predicted": predicted["label"],
+                "confidence": predicted["confidence"],
+                "voice_file": str(self.voice_maker.tts_provider.temp_dir / f"{uuid.uuid4()}_part_{i}.{self.voice_maker.tts_provider.file_format}")
             })
 
         return results
@@ -0,0 +1,178 @@
+import os
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+from ling_chat.core.logger import logger
+
+# 中日韩文字和全角符号，大约每个字符1个token
+_CJK_RE = re.compile(r'[぀-ヿ㐀-䶿一-鿿가-힯＀-￯]')
+MESSAGE_OVERHEAD = 4  # 每条消息的角色、分隔符等额外token
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算token数：中日文字符每个算1个，其他字符每4个算1个"""
+    cjk = len(text) - len(_CJK_RE.sub("", text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+class ContextBuilder:
+    """
+    增量组装发给LLM的上下文
+
+    记住每条消息的token数，每轮只计算新增的消息。上下文超过 budget 个token时，
+    从最早的对话轮次开始裁掉（开头的系统提示词和最新一轮始终保留），一次裁到预算的
+    low_watermark 以下，之后几轮的起点保持不变，上下文的前缀不会每轮都变化。
+    trim 为 summary 时，被裁掉的轮次用一条摘要消息代替（只保留用户说过的话的开头）。
+
+    :param tokenizer: 估算token数的函数，默认使用 estimate_tokens
+    """
+    SUMMARY_LINE_CHARS = 40  # 摘要里每句话最多保留的字数
+
+    def __init__(self,
+                 budget: Optional[int] = None,
+                 tokenizer: Optional[Callable[[str], int]] = None,
+                 trim: Optional[str] = None,
+                 discard_trimmed: Optional[bool] = None,
+                 low_watermark: float = 0.75):
+        self.budget = budget if budget is not None else int(os.environ.get("CONTEXT_TOKEN_BUDGET", 16000))
+        self.tokenizer = tokenizer or estimate_tokens
+        self.summarize = (trim or os.environ.get("CONTEXT_TRIM", "drop")).lower() == "summary"
+        self.discard_trimmed = discard_trimmed if discard_trimmed is not None \
+            else os.environ.get("CONTEXT_DISCARD_TRIMMED", "False").lower() == "true"
+        self.low_watermark = low_watermark
+
+        self.counted = 0        # 计算过token数的消息数
+        self.trimmed_turns = 0  # 裁掉的对话轮次
+        self.last_tokens = 0    # 上一次组装出的上下文的token数
+        self._messages: List[Dict] = []  # 上次组装时的消息（引用）
+        self._contents: List[Any] = []   # 上次组装时每条消息的内容，用于发现被原地修改的消息
+        self._cumulative: List[int] = [0]  # _cumulative[i] 是前 i 条消息的token数之和
+        self._start = 0  # 发送的历史消息从这里开始，之前的已经裁掉
+        self._summary: Optional[Dict] = None
+        self._summary_tokens = 0
+
+    def count(self, message: Dict) -> int:
+        content = message.get("content")
+        text = content if isinstance(content, str) else str(content or "")
+        self.counted += 1
+        return self.tokenizer(text) + MESSAGE_OVERHEAD
+
+    @property
+    def tokens(self) -> int:
+        """记住的所有消息的token数"""
+        return self._cumulative[-1]
+
+    def _unchanged(self, memory: List[Dict], length: int) -> bool:
+        """memory 的前 length 条是否还是上次的消息"""
+        if length == 0:
+            return True
+        if len(memory) < length:
+            return False
+        # 记忆只会在末尾追加；首尾两条都没变就认为前缀没变
+        return all(memory[i] is self._messages[i] and memory[i].get("content") is self._contents[i]
+                   for i in (0, length - 1))
+
+    def _sync(self, memory: List[Dict]) -> None:
+        """只计算新增消息的token数；前缀变了（读档、重置）才从头计算"""
+        if not self._unchanged(memory, len(self._messages)):
+            self._messages, self._contents, self._cumulative = [], [], [0]
+            self._start = 0
+            self._set_summary(None)
+        for message in memory[len(self._messages):]:
+            self._messages.append(message)
+            self._contents.append(message.get("content"))
+            self._cumulative.append(self._cumulative[-1] + self.count(message))
+
+    @staticmethod
+    def _head(memory: List[Dict]) -> int:
+        """开头连续的系统消息数"""
+        head = 0
+        while head < len(memory) and memory[head].get("role") == "system":
+            head += 1
+        return head
+
+    def _window_tokens(self, head: int, start: int) -> int:
+        return self._cumulative[head] + self.tokens - self._cumulative[start] + self._summary_tokens
+
+    def _set_summary(self, summary: Optional[Dict]) -> None:
+        self._summary = summary
+        self._summary_tokens = self.count(summary) if summary is not None else 0
+
+    def build(self, memory: List[Dict]) -> List[Dict]:
+        """返回这一轮要发送的上下文，是新的列表，可以直接修改"""
+        self._sync(memory)
+        head = self._head(memory)
+        self._start = max(self._start, head)
+
+        if self.budget > 0 and self._window_tokens(head, self._start) > self.budget:
+            self._trim(memory, head)
+
+        context = memory[:head]
+        if self._summary is not None:
+            context.append(self._summary)
+        context.extend(memory[self._start:])
+        self.last_tokens = self._window_tokens(head, self._start)
+        return context
+
+    def _trim(self, memory: List[Dict], head: int) -> None:
+        # 最新一轮（最后一条用户消息开始）必须保留
+        last_user = max(self._start, len(memory) - 1)
+        for i in range(len(memory) - 1, self._start - 1, -1):
+            if memory[i].get("role") == "user":
+                last_user = i
+                break
+
+        target = self.budget * self.low_watermark
+        start = self._start
+        while start < last_user and self._cumulative[head] + self.tokens - self._cumulative[start] > target:
+            # 整轮裁掉：跳到下一条用户消息
+            start += 1
+            while start < last_user and memory[start].get("role") != "user":
+                start += 1
+            self.trimmed_turns += 1
+
+        if self.summarize:
+            self._set_summary(self._build_summary(memory[self._start:start], self.budget - target))
+        logger.debug(f"上下文超过 {self.budget} tokens，裁掉第 {self._start} 到第 {start} 条消息")
+        self._start = start
+
+        if self.discard_trimmed:
+            # 裁掉的消息不再保留在记忆里，记忆不会无限增长
+            del memory[head:start]
+            del self._messages[head:start]
+            del self._contents[head:start]
+            removed = self._cumulative[start] - self._cumulative[head]
+            self._cumulative = self._cumulative[:head + 1] + [c - removed for c in self._cumulative[start + 1:]]
+            self._start = head
+
+    def _build_summary(self, messages: List[Dict], budget: float) -> Optional[Dict]:
+        """用被裁掉的用户消息的开头拼成一条摘要，只保留最近、能放进 budget 的几句"""
+        if self._summary is not None:
+            messages = [{"role": "user", "content": line[2:]}
+                        for line in self._summary["content"].splitlines()[1:]] + messages
+        lines: List[str] = []
+        used = 0
+        for message in reversed(messages):
+            if message.get("role") != "user":
+                continue
+            content = str(message.get("content") or "").strip().replace("\n", " ")
+            line = "- " + content[:self.SUMMARY_LINE_CHARS]
+            cost = self.tokenizer(line)
+            if used + cost > budget:
+                break
+            lines.append(line)
+            used += cost
+        if not lines:
+            return self._summary
+        lines.append("更早的对话已省略，用户说过：")
+        return {"role": "system", "content": "\n".join(reversed(lines))}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "budget": self.budget,
+            "messages": len(self._messages),
+            "tokens": self.tokens,
+            "context_tokens": self.last_tokens,
+            "trimmed_turns": self.trimmed_turns,
+            "counted": self.counted,
+        }
@@ -8,6 +8,7 @@ from ling_chat.core.ai_service.config import AIServiceConfig
 from ling_chat.core.ai_service.message_processor import MessageProcessor
 from ling_chat.core.ai_service.voice_maker import VoiceMaker
 from ling_chat.core.llm_providers.manager import LLMManager
+from ling_chat.core.messaging.backpressure import BackpressureQueue
 from ling_chat.core.ai_service.translator import Translator
 from ling_chat.core.ai_service.rag_manager import RAGManager
 from ling_chat.utils.function import Function
@@ -17,9 +18,12 @@ from ling_chat.core.ai_service.ai_logger import AILogger
 from ling_chat.core.schemas.responses import ReplyResponse
 from ling_chat.core.schemas.response_models import ResponseFactory
 
+from ling_chat.core.ai_service.message_system.reorder_buffer import ReorderBuffer
 from ling_chat.core.ai_service.message_system.response_publisher import ResponsePublisher
 from ling_chat.core.ai_service.message_system.sentence_comsumer import SentenceConsumer
 from ling_chat.core.ai_service.message_system.stream_producer import StreamProducer
+from ling_chat.core.ai_service.message_system.voice_speculator import VoiceSpeculator
+from ling_chat.core.ai_service.message_system.context_builder import ContextBuilder
 
 class MessageGenerator:
     def __init__(self,
@@ -40,6 +44,10 @@ class MessageGenerator:
         self.ai_logger = ai_logger if ai_logger else AILogger()
         self.function = Function()
         self.concurrency = int(os.environ.get("COMSUMERS", 3))
+        # 投机语音合成：句子的日语部分写完就开始合成，不等整个句子结束
+        self.speculative_tts = os.environ.get("TTS_SPECULATIVE", "False").lower() == "true"
+        # 上下文组装：按token预算裁掉最早的对话；RAG自己管理历史的截取，启用时不裁剪
+        self.context_builder = ContextBuilder(budget=0 if self.use_rag else None)
 
     def memory_init(self, memory: List[Dict]) -> None:
         self.memory = memory
@@ -74,12 +82,12 @@ class MessageGenerator:
         """
         rag_messages = []
         # 1. 设置和预处理
-        current_context = self.memory.copy() if not memory else memory.copy()
-
-        if not memory:
+        if memory:
+            current_context = memory.copy()
+        else:
             processed_user_message = self.message_processor.append_user_message(user_message)
             self.memory.append({"role": "user", "content": processed_user_message})
-            current_context = self.memory.copy()
+            current_context = self.context_builder.build(self.memory)
             if self.use_rag and self.rag_manager:
                 self.rag_manager.rag_append_sys_message(current_context, rag_messages, processed_user_message)
 
@@ -87,10 +95,10 @@ class MessageGenerator:
                 self.ai_logger.print_debug_message(current_context, rag_messages, self.memory) 
 
         # 2. 管道组件的共享状态
-        sentence_queue = asyncio.Queue(maxsize=self.concurrency * 2)
-        results_store: Dict[int, ReplyResponse] = {}
-        publish_events: Dict[int, asyncio.Event] = {}
-        output_queue = asyncio.Queue()
+        sentence_queue = BackpressureQueue(maxsize=self.concurrency * 2)
+        reorder_buffer = ReorderBuffer()
+        output_queue: asyncio.Queue[Optional[ReplyResponse]] = asyncio.Queue()
+        speculator = VoiceSpeculator(self.voice_maker) if self.speculative_tts else None
         
         # 用于优雅管理所有后台任务的列表
         background_tasks = []
@@ -100,7 +108,7 @@ class MessageGenerator:
             # 3. 实例化并启动所有管道组件作为后台任务
 
             # 发布者任务
-            publisher = ResponsePublisher(results_store, publish_events, output_queue)
+            publisher = ResponsePublisher(reorder_buffer, output_queue)
             publisher_task = asyncio.create_task(publisher.run(), name="Publisher")
             background_tasks.append(publisher_task)
 
@@ -108,23 +116,30 @@ class MessageGenerator:
             for i in range(self.concurrency):
                 consumer = SentenceConsumer(
                     consumer_id=i, sentence_queue=sentence_queue,
-                    results_store=results_store, publish_events=publish_events,
+                    reorder_buffer=reorder_buffer,
                     message_processor=self.message_processor, translator=self.translator,
                     voice_maker=self.voice_maker, user_message=user_message,
-                    character=character
+                    character=character, speculator=speculator
                 )
                 consumer_task = asyncio.create_task(consumer.run(), name=f"Consumer-{i}")
                 background_tasks.append(consumer_task)
 
             # 生产者任务：立即将生产者作为后台任务启动
-            ai_response_stream = self.llm_model.process_message_stream(current_context)
-            producer = StreamProducer(ai_response_stream, sentence_queue, publish_events)
+            # 句子队列写满时（消费者饱和）才暂停读取LLM输出，其余时间不做任何人为延迟
+            ai_response_stream = self.llm_model.process_message_stream(current_context,
+                                                                       backpressure=sentence_queue)
+            producer = StreamProducer(ai_response_stream, sentence_queue, reorder_buffer, speculator)
             producer_task = asyncio.create_task(producer.run(), name="Producer")
+            # 无论生产者正常结束、出错还是被取消，都告诉发布者一共有多少个句子
+            producer_task.add_done_callback(lambda _: reorder_buffer.close(producer.sentence_count))
             background_tasks.append(producer_task)
 
             # 4. 现在，主协程的工作是从管道生成结果
             while True:
                 response = await output_queue.get()
+                # None 表示发布者已经发布完所有句子（例如最后一句处理失败）
+                if response is None:
+                    break
                 yield response
                 # 当收到最终消息时循环自然结束
                 if response.isFinal:
@@ -169,5 +184,7 @@ class MessageGenerator:
                 if not task.done():
                     task.cancel()
             await asyncio.gather(*background_tasks, return_exceptions=True)
+            if speculator is not None:
+                speculator.cancel_all()
             logger.info("消息流处理完成，所有任务已清理完毕。")
             
\ No newline at end of file
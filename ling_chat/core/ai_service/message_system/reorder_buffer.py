@@ -0,0 +1,57 @@
+import asyncio
+from typing import Dict, Optional, Tuple
+
+from ling_chat.core.schemas.responses import ReplyResponse
+
+
+class ReorderBuffer:
+    """
+    Reorders out-of-order consumer results back into sentence order.
+
+    Consumers `put` results as they finish; the publisher awaits `get`, which
+    wakes exactly when the next in-order index lands. A single Event is shared
+    for the whole reply instead of one per sentence, and nothing polls.
+    """
+    def __init__(self):
+        self._results: Dict[int, Optional[ReplyResponse]] = {}
+        self._next_index = 0
+        self._total: Optional[int] = None
+        self._ready = asyncio.Event()
+
+    def put(self, index: int, response: Optional[ReplyResponse]) -> None:
+        """Stores the result for `index`. `None` marks a sentence that produced no response."""
+        self._results[index] = response
+        if index == self._next_index:
+            self._ready.set()
+
+    def close(self, total: int) -> None:
+        """Called by the producer once it knows how many sentences were emitted."""
+        self._total = total
+        if self.exhausted:
+            self._ready.set()
+
+    @property
+    def exhausted(self) -> bool:
+        return self._total is not None and self._next_index >= self._total
+
+    async def get(self) -> Tuple[int, Optional[ReplyResponse]]:
+        """
+        Waits for the next in-order result.
+        Raises StopAsyncIteration once every emitted sentence has been returned.
+        """
+        while self._next_index not in self._results:
+            if self.exhausted:
+                raise StopAsyncIteration
+            self._ready.clear()
+            await self._ready.wait()
+
+        index = self._next_index
+        response = self._results.pop(index)
+        self._next_index += 1
+        return index, response
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Tuple[int, Optional[ReplyResponse]]:
+        return await self.get()
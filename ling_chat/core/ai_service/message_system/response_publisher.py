@@ -1,53 +1,39 @@
 import asyncio
-from typing import Dict
 
 from ling_chat.core.ai_service.ai_logger import logger
 from ling_chat.core.logger import logger
 
-
-from ling_chat.core.schemas.responses import ReplyResponse
+from ling_chat.core.ai_service.message_system.reorder_buffer import ReorderBuffer
 
 
 class ResponsePublisher:
     """
     Waits for processed results in sequence and publishes them.
     """
-    def __init__(self, 
-                 results_store: Dict[int, ReplyResponse], 
-                 publish_events: Dict[int, asyncio.Event],
+    def __init__(self,
+                 reorder_buffer: ReorderBuffer,
                  output_queue: asyncio.Queue):
-        self.results_store = results_store
-        self.publish_events = publish_events
+        self.reorder_buffer = reorder_buffer
         self.output_queue = output_queue
 
     async def run(self):
         """Starts the sequential publishing loop."""
-        next_index_to_publish = 0
-        while True:
-            try:
-                if next_index_to_publish not in self.publish_events:
-                    await asyncio.sleep(0.01)
+        try:
+            async for index, response in self.reorder_buffer:
+                if response is None:
+                    logger.warning(f"Skipping message index {index}: no response was produced.")
                     continue
 
-                # Wait until the consumer signals that this result is ready
-                await self.publish_events[next_index_to_publish].wait()
-                
-                response = self.results_store.pop(next_index_to_publish, None)
-                if response:
-                    logger.info(f"Publishing message index {next_index_to_publish}")
-                    await self.output_queue.put(response)
-                    # await message_broker.publish(self.client_id, response.model_dump())
-                
-                del self.publish_events[next_index_to_publish] 
-                
-                if response and response.isFinal:
+                logger.info(f"Publishing message index {index}")
+                await self.output_queue.put(response)
+
+                if response.isFinal:
                     logger.info("Final message published. Publisher is shutting down.")
                     break
-                
-                next_index_to_publish += 1
-            except asyncio.CancelledError:
-                logger.info("Publisher was cancelled.")
-                break
-            except Exception as e:
-                logger.error(f"Error in publisher: {e}", exc_info=True)
-                break
\ No newline at end of file
+        except asyncio.CancelledError:
+            logger.info("Publisher was cancelled.")
+        except Exception as e:
+            logger.error(f"Error in publisher: {e}", exc_info=True)
+        finally:
+            # End-of-stream marker, so the orchestrator never waits on a final message that will not come
+            self.output_queue.put_nowait(None)
@@ -0,0 +1,62 @@
+from typing import List
+
+
+class SentenceSplitter:
+    """
+    增量式句子切分器
+
+    把 LLM 的流式输出按【情绪】标签切成 `【tag】text<jp>（motion）` 句子。
+    每个chunk只扫描一遍，当前句子以片段列表保存，只在句子结束时拼接一次，
+    整个回复的切分耗时与回复长度成线性关系。
+
+    一个句子在下一个句子的【出现时才算结束，因为动作和日语部分的顺序不固定；
+    第一个【之前的文本会并入第一个句子。
+    """
+    def __init__(self):
+        self._parts: List[str] = []
+        self._started = False     # 当前句子是否已经遇到【
+        self._tag_closed = False  # 当前句子的情绪标签是否已经遇到】
+
+    def feed(self, chunk: str) -> List[str]:
+        """输入一个chunk，返回因此而结束的句子（可能为空）"""
+        if "【" not in chunk:
+            # 绝大多数chunk都不含【，直接追加即可
+            self._parts.append(chunk)
+            if self._started and not self._tag_closed and "】" in chunk:
+                self._tag_closed = True
+            return []
+
+        sentences = []
+        pos = 0
+        while True:
+            start = chunk.find("【", pos)
+            piece = chunk[pos:] if start == -1 else chunk[pos:start]
+            if piece:
+                self._parts.append(piece)
+                if self._started and not self._tag_closed and "】" in piece:
+                    self._tag_closed = True
+            if start == -1:
+                break
+
+            if self._started and self._tag_closed:
+                # 新句子开始，上一个句子结束
+                sentences.append("".join(self._parts))
+                self._parts = []
+                self._tag_closed = False
+            # 否则是第一个句子的开头，或者是未闭合标签中的【，都并入当前句子
+            self._started = True
+            self._parts.append("【")
+            pos = start + 1
+        return sentences
+
+    def pending(self) -> str:
+        """当前还没结束的句子（不清空），用于在句子结束前提前处理其中已经完整的部分"""
+        return "".join(self._parts)
+
+    def flush(self) -> str:
+        """流结束时调用，返回最后一个未结束的句子（可能为空字符串）"""
+        sentence = "".join(self._parts)
+        self._parts = []
+        self._started = False
+        self._tag_closed = False
+        return sentence
@@ -0,0 +1,87 @@
+import asyncio
+import re
+import uuid
+from dataclasses import dataclass
+from typing import Dict, Optional, Set
+
+from ling_chat.core.ai_service.voice_maker import VoiceMaker
+from ling_chat.core.logger import logger
+
+
+@dataclass
+class Speculation:
+    text: str
+    voice_file: str
+    task: asyncio.Task
+
+
+class VoiceSpeculator:
+    """
+    投机语音合成
+
+    句子要等下一个【出现才算结束，但日语部分 <…> 往往比后面的动作描写先写完。
+    一个句子的 <…> 闭合后就用其中的日语开始合成，消费者处理到这个句子时，
+    如果分析出的日语文本没有变化（没有被 fix_ai_generated_text 或中日交换改写）就直接使用，
+    否则取消这次合成，按原来的流程重新生成。
+    """
+    def __init__(self, voice_maker: VoiceMaker):
+        self.voice_maker = voice_maker
+        self.started = 0
+        self.used = 0
+        self.cancelled = 0
+        self._speculations: Dict[int, Speculation] = {}  # 句子索引 -> 投机合成
+        self._seen: Set[int] = set()  # 已经开始过投机合成的句子
+
+    def observe(self, pending: str, index: int) -> None:
+        """
+        检查还没结束的第 index 个句子，日语部分已经完整时开始合成
+
+        :param pending: 句子目前收到的全部文本
+        """
+        if index in self._seen or self.voice_maker.lang != "ja":
+            return
+        tag_end = pending.find("】")
+        if pending.find("【") == -1 or tag_end == -1:
+            return
+        # 与 MessageProcessor.analyze_emotions 提取日语的方式保持一致
+        following_text = pending[tag_end + 1:].replace('(', '（').replace(')', '）')
+        japanese_match = re.search(r'<(.*?)>', following_text)
+        if japanese_match is None:
+            return
+        text = re.sub(r'（.*?）', '', japanese_match.group(1)).strip()
+        if not text:
+            return
+
+        self._seen.add(index)
+        tts_provider = self.voice_maker.tts_provider
+        voice_file = str(tts_provider.temp_dir / f"{uuid.uuid4()}_part_1.{tts_provider.file_format}")
+        task = self.voice_maker.speculate(text, voice_file)
+        if task is None:
+            return
+        self._speculations[index] = Speculation(text, voice_file, task)
+        self.started += 1
+        logger.debug(f"句子 {index} 的日语部分已完整，提前开始合成: {text[:20]}")
+
+    def take(self, index: int) -> Optional[Speculation]:
+        """取出第 index 个句子的投机合成，之后由调用方负责使用或取消"""
+        return self._speculations.pop(index, None)
+
+    def resolve(self, speculation: Speculation, text: str) -> bool:
+        """句子的最终日语文本确定后调用，文本没有变化返回True，否则取消合成"""
+        if speculation.text == text:
+            self.used += 1
+            return True
+        self.cancel(speculation)
+        logger.debug(f"句子被改写，取消投机合成: {speculation.text[:20]}")
+        return False
+
+    def cancel(self, speculation: Speculation) -> None:
+        if not speculation.task.done():
+            speculation.task.cancel()
+        self.cancelled += 1
+
+    def cancel_all(self) -> None:
+        """回复结束时取消没有被用到的投机合成"""
+        for speculation in self._speculations.values():
+            self.cancel(speculation)
+        self._speculations.clear()
@@ -22,7 +22,7 @@ class AIDialogueEvent(BaseEvent):
         ScriptFunction.memory_builder(self.game_context, memory, character, prompt)
 
         # 然后，使用 memory 信息生成对话
-        ai_service = service_manager.ai_service
+        ai_service = service_manager.get_service(self.config.user_id)
         if not ai_service:
             logger.error("AI service not found")
             return
@@ -1,5 +1,5 @@
 from ling_chat.core.ai_service.script_engine.events.base_event import BaseEvent
-from ling_chat.core.messaging.broker import message_broker
+from ling_chat.core.ai_service.script_engine.utils.script_function import ScriptFunction
 from ling_chat.core.logger import logger
 from ling_chat.core.schemas.response_models import ResponseFactory
 
@@ -13,7 +13,7 @@ class MusicEvent(BaseEvent):
         logger.info(f"背景特效: {background_effect}")
         
         event_response = ResponseFactory.create_background_effect(background_effect, duration = duration)
-        await message_broker.publish("1", 
+        await ScriptFunction.publish(self.config, 
             event_response.model_dump()
         )
     
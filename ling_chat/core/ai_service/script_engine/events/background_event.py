@@ -1,6 +1,6 @@
 from ling_chat.core.ai_service.script_engine.events.base_event import BaseEvent
+from ling_chat.core.ai_service.script_engine.utils.script_function import ScriptFunction
 from ling_chat.core.schemas.response_models import ResponseFactory
-from ling_chat.core.messaging.broker import message_broker
 from ling_chat.core.logger import logger
 
 class BackgroundEvent(BaseEvent):
@@ -16,7 +16,7 @@ class BackgroundEvent(BaseEvent):
         self.game_context.background = image
         
         event_response = ResponseFactory.create_background(image, duration = duration)
-        await message_broker.publish("1", 
+        await ScriptFunction.publish(self.config, 
             event_response.model_dump()
         )
     
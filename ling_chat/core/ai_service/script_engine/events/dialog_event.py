@@ -1,6 +1,6 @@
 from ling_chat.core.ai_service.script_engine.events.base_event import BaseEvent
+from ling_chat.core.ai_service.script_engine.utils.script_function import ScriptFunction
 from ling_chat.core.schemas.response_models import ResponseFactory
-from ling_chat.core.messaging.broker import message_broker
 from ling_chat.core.logger import logger
 
 from ling_chat.core.service_manager import service_manager
@@ -21,14 +21,14 @@ class DialogueEvent(BaseEvent):
             })
             
             seg:list[dict] = []
-            ai_service = service_manager.ai_service
+            ai_service = service_manager.get_service(self.config.user_id)
             if not ai_service: return
 
             await ai_service.message_generator.process_sentence(text, seg)
             seg[0]['character'] = character
 
             event_response = ResponseFactory.create_reply(seg[0], "", False)
-            await message_broker.publish("1", 
+            await ScriptFunction.publish(self.config, 
                 event_response.model_dump()
             )
     
@@ -1,6 +1,5 @@
 from ling_chat.core.ai_service.script_engine.events.base_event import BaseEvent
 from ling_chat.core.ai_service.script_engine.utils.script_function import ScriptFunction
-from ling_chat.core.messaging.broker import message_broker
 from ling_chat.core.logger import logger
 from ling_chat.core.schemas.response_models import ResponseFactory
 
@@ -29,10 +28,10 @@ class FreeDialogueEvent(BaseEvent):
             
             # 推送前端需要输入的事件
             event_response = ResponseFactory.create_input(hint,duration=duration)
-            await message_broker.publish("1", event_response.model_dump())
+            await ScriptFunction.publish(self.config, event_response.model_dump())
 
             # 等待来自前端的输入
-            user_input = await ScriptFunction.wait_for_user_input()
+            user_input = await ScriptFunction.wait_for_user_input(self.config)
 
             # 将用户输入存储到游戏上下文
             self.game_context.dialogue.append({
@@ -56,7 +55,7 @@ class FreeDialogueEvent(BaseEvent):
             ScriptFunction.memory_builder(self.game_context, memory, character, prompt)
 
             # 然后，使用 memory 信息生成对话
-            ai_service = service_manager.ai_service
+            ai_service = service_manager.get_service(self.config.user_id)
             if not ai_service:
                 logger.error("AI service not found")
                 return
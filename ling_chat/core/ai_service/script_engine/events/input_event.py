@@ -1,6 +1,5 @@
 from ling_chat.core.ai_service.script_engine.events.base_event import BaseEvent
 from ling_chat.core.ai_service.script_engine.utils.script_function import ScriptFunction
-from ling_chat.core.messaging.broker import message_broker
 from ling_chat.core.logger import logger
 from ling_chat.core.schemas.response_models import ResponseFactory
 
@@ -14,10 +13,10 @@ class InputEvent(BaseEvent):
 
         # 推送前端需要输入的事件
         event_response = ResponseFactory.create_input(hint, duration=duration)
-        await message_broker.publish("1", event_response.model_dump())
+        await ScriptFunction.publish(self.config, event_response.model_dump())
 
         # 等待来自前端的输入
-        user_input = await ScriptFunction.wait_for_user_input() 
+        user_input = await ScriptFunction.wait_for_user_input(self.config) 
         
         # 将用户输入存储到游戏上下文
         self.game_context.dialogue.append({
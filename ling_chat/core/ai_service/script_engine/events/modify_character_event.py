@@ -1,6 +1,6 @@
 from ling_chat.core.ai_service.script_engine.events.base_event import BaseEvent
+from ling_chat.core.ai_service.script_engine.utils.script_function import ScriptFunction
 from ling_chat.core.schemas.response_models import ResponseFactory
-from ling_chat.core.messaging.broker import message_broker
 from ling_chat.core.emotion.classifier import emotion_classifier
 
 class ModifyCharacterEvent(BaseEvent):
@@ -22,7 +22,7 @@ class ModifyCharacterEvent(BaseEvent):
 
         if emotion:
             if emotion != "AI思考" and emotion != "正常":
-                predicted = emotion_classifier.predict(emotion)
+                predicted = emotion_classifier.predict_batch([emotion])[0]
                 prediction_result = {
                     "label": predicted["label"],
                     "confidence": predicted["confidence"]
@@ -44,7 +44,7 @@ class ModifyCharacterEvent(BaseEvent):
             params['action'] = action
         
         event_response = ResponseFactory.create_modify_character(**params)
-        await message_broker.publish("1", event_response.model_dump())
+        await ScriptFunction.publish(self.config, event_response.model_dump())
     
     @classmethod
     def can_handle(cls, event_type: str) -> bool:
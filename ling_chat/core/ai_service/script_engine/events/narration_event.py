@@ -1,5 +1,5 @@
 from ling_chat.core.ai_service.script_engine.events.base_event import BaseEvent
-from ling_chat.core.messaging.broker import message_broker
+from ling_chat.core.ai_service.script_engine.utils.script_function import ScriptFunction
 from ling_chat.core.logger import logger
 from ling_chat.core.schemas.response_models import ResponseFactory
 
@@ -20,7 +20,7 @@ class NarrationEvent(BaseEvent):
             })
             
             event_response = ResponseFactory.create_narration(text)
-            await message_broker.publish("1", 
+            await ScriptFunction.publish(self.config, 
                 event_response.model_dump()
             )
     
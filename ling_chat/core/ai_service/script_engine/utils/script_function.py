@@ -1,22 +1,36 @@
 from typing import Dict, Any
+from ling_chat.core.ai_service.config import AIServiceConfig
 from ling_chat.core.logger import logger
 from ling_chat.core.messaging.broker import message_broker
+from ling_chat.core.service_manager import service_manager
 
 class ScriptFunction:
     @staticmethod
-    async def wait_for_user_input() -> str | None:
-        """等待来自前端的用户输入"""
-        # TODO: 获取客户端id
-        client_id = "1"
+    def session_clients(config: AIServiceConfig) -> set[str]:
+        """剧本所属会话当前连接的客户端"""
+        session = service_manager.get_service(config.user_id)
+        return session.config.clients if session is not None else config.clients
+
+    @staticmethod
+    async def publish(config: AIServiceConfig, message: Any) -> int:
+        """把剧本内容推送给所属会话的所有客户端"""
+        clients = ScriptFunction.session_clients(config)
+        if not clients:
+            logger.warning(f"用户 {config.user_id} 没有连接的客户端，剧本消息无法送达")
+        return await message_broker.publish_many(clients, message)
+
+    @staticmethod
+    async def wait_for_user_input(config: AIServiceConfig) -> str | None:
+        """等待来自所属会话任意一个客户端的用户输入"""
+        topics = [f"ai_script_input_{client_id}" for client_id in ScriptFunction.session_clients(config)]
         try:
-            # 订阅特定的输入频道
-            subscription = message_broker.subscribe("ai_script_input_" + client_id)
-            
-            # 使用异步for循环来消费消息
-            async for message in subscription:
-                user_input = ScriptFunction.extract_user_input(message)
-                if user_input:
-                    return user_input
+            # 订阅这些客户端的输入频道，拿到输入后退出 with 即取消订阅
+            with message_broker.subscribe(*topics) as subscription:
+                # 使用异步for循环来消费消息
+                async for message in subscription:
+                    user_input = ScriptFunction.extract_user_input(message)
+                    if user_input:
+                        return user_input
                     
         except Exception as e:
             logger.error(f"等待用户输入时发生错误: {e}")
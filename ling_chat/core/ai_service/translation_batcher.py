@@ -0,0 +1,155 @@
+import asyncio
+import os
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from ling_chat.core.logger import logger
+
+if TYPE_CHECKING:
+    from ling_chat.core.ai_service.translator import Translator
+
+
+@dataclass
+class _Batch:
+    stream: bool
+    segments: List[Dict] = field(default_factory=list)
+    futures: List[asyncio.Future] = field(default_factory=list)
+    timer: Optional[asyncio.TimerHandle] = None
+    task: Optional[asyncio.Task] = None
+    waiters: int = 0  # 正在等待这一批的调用方数量
+
+
+class TranslationBatcher:
+    """
+    合并多个句子的翻译请求
+
+    每个消费者提交自己句子的片段后等待；在 window 秒内或攒够 max_size 个片段时，
+    把这一批的中文拼成 <…><…> 一次发给翻译模型，系统提示词只发送一次。
+    返回的 <…> 按顺序分给对应的片段，每个片段拿到译文就立即开始合成语音，
+    它的语音合成完成后，提交它的消费者才继续。
+    """
+    def __init__(self,
+                 translator: "Translator",
+                 window: Optional[float] = None,
+                 max_size: Optional[int] = None):
+        self.translator = translator
+        self.window = window if window is not None else float(os.environ.get("TRANSLATE_BATCH_WINDOW", 0.05))
+        self.max_size = max_size or int(os.environ.get("TRANSLATE_BATCH_SIZE", 5))
+        self.requests = 0   # 发给翻译模型的请求数
+        self.segments = 0   # 翻译的片段数
+        self._batches: Dict[bool, _Batch] = {}  # 是否流式 -> 正在收集的批次
+        self._tasks: set[asyncio.Task] = set()
+
+    async def translate(self, segments: List[Dict], stream: bool) -> None:
+        """提交片段并等待它们翻译完、语音合成完"""
+        # 没有中文的片段不需要翻译，也不能混进请求里打乱 <…> 的对应关系
+        segments = [seg for seg in segments if seg.get("following_text")]
+        if not segments:
+            return
+        loop = asyncio.get_running_loop()
+        batch = self._batches.get(stream)
+        if batch is None:
+            batch = self._batches[stream] = _Batch(stream)
+            batch.timer = loop.call_later(self.window, self._flush, batch)
+
+        futures = []
+        for seg in segments:
+            future = loop.create_future()
+            batch.segments.append(seg)
+            batch.futures.append(future)
+            futures.append(future)
+        if len(batch.segments) >= self.max_size:
+            self._flush(batch)
+
+        # 一个等待方被取消不影响同一批的其他句子，所有等待方都取消了才取消这一批
+        batch.waiters += 1
+        try:
+            await asyncio.shield(asyncio.gather(*futures))
+        except asyncio.CancelledError:
+            if batch.waiters == 1:
+                self._cancel(batch)
+            raise
+        finally:
+            batch.waiters -= 1
+
+    def _flush(self, batch: _Batch) -> None:
+        if self._batches.get(batch.stream) is not batch:
+            return  # 已经发出
+        del self._batches[batch.stream]
+        if batch.timer is not None:
+            batch.timer.cancel()
+        task = batch.task = asyncio.create_task(self._run(batch), name="TranslationBatch")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _cancel(self, batch: _Batch) -> None:
+        """没有人再等待这一批：还在收集就直接丢弃，已经发出就取消请求和语音合成"""
+        if self._batches.get(batch.stream) is batch:
+            del self._batches[batch.stream]
+            if batch.timer is not None:
+                batch.timer.cancel()
+        elif batch.task is not None and not batch.task.done():
+            batch.task.cancel()
+        for future in batch.futures:
+            future.cancel()
+        logger.debug(f"等待方已全部取消，放弃合并翻译的 {len(batch.segments)} 个片段")
+
+    async def _run(self, batch: _Batch) -> None:
+        self.requests += 1
+        self.segments += len(batch.segments)
+        logger.debug(f"合并翻译 {len(batch.segments)} 个片段")
+        voice_tasks: List[asyncio.Task] = []
+        received = 0
+        try:
+            async for japanese_text in self.translator.iter_translations(batch.segments, batch.stream):
+                if received >= len(batch.segments):
+                    logger.warning(f"翻译结果比原文多，忽略: {japanese_text}")
+                    continue
+                seg, future = batch.segments[received], batch.futures[received]
+                seg["japanese_text"] = japanese_text
+                # 拿到译文就开始合成这一段的语音，不等整批翻译结束
+                voice_tasks.append(asyncio.create_task(self._voice(seg, future)))
+                await self.translator.remember(seg)
+                received += 1
+        except Exception as e:
+            logger.error(f"合并翻译失败: {e}")
+            for future in batch.futures[received:]:
+                if not future.done():
+                    future.set_exception(e)
+        except asyncio.CancelledError:
+            for task in voice_tasks:
+                task.cancel()
+            raise
+        else:
+            if received < len(batch.segments):
+                logger.warning(f"翻译结果只有 {received} 段，少于原文的 {len(batch.segments)} 段")
+            for future in batch.futures[received:]:
+                if not future.done():
+                    future.set_result(None)
+        finally:
+            if voice_tasks:
+                await asyncio.gather(*voice_tasks, return_exceptions=True)
+
+    async def _voice(self, seg: Dict, future: asyncio.Future) -> None:
+        try:
+            await self.translator.voice_maker.generate_voice_files([seg])
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(None)
+
+    async def close(self) -> None:
+        """发出还在收集的批次，并等待所有批次结束"""
+        for batch in list(self._batches.values()):
+            self._flush(batch)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "segments": self.segments,
+            "segments_per_request": round(self.segments / self.requests, 2) if self.requests else None,
+        }
@@ -0,0 +1,244 @@
+import asyncio
+import difflib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+from ling_chat.core.logger import logger
+from ling_chat.utils.runtime_path import user_data_path
+
+
+class TranslationMemory:
+    """
+    持久化的翻译记忆
+
+    以 (规范化后的中文, 翻译模型) 为键把译文保存在 SQLite 中，剧本台词和常见短句
+    只需要翻译一次，重启后仍然有效。可选的模糊匹配只在长度相近的记录中比较相似度，
+    相似度达到 fuzzy_threshold 时直接使用已有的译文。
+
+    读写都是阻塞的，在事件循环中使用 get_many / put_many（在线程中执行）。
+    命中次数和新译文先攒在内存里，够 COMMIT_EVERY 条或距上次提交超过 COMMIT_INTERVAL 秒
+    才一起提交，不会每次查询都写盘。
+    """
+    FUZZY_CANDIDATES = 200  # 模糊匹配时最多比较的记录数
+    COMMIT_EVERY = 32       # 攒够这么多条改动就提交
+    COMMIT_INTERVAL = 5.0   # 距上次提交超过这么多秒就提交
+
+    def __init__(self,
+                 db_path: Optional[Path] = None,
+                 fuzzy_threshold: Optional[float] = None):
+        self.db_path = Path(db_path or os.environ.get("TRANSLATION_MEMORY_PATH")
+                            or user_data_path / "cache/translation_memory.db")
+        self.fuzzy_threshold = fuzzy_threshold if fuzzy_threshold is not None \
+            else float(os.environ.get("TRANSLATION_MEMORY_FUZZY", 0))
+        self.hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pending_hits: Dict[Tuple[str, str], int] = {}  # 还没写入的命中次数
+        self._pending_puts = 0  # 还没提交的新译文数
+        self._last_commit = time.monotonic()
+        try:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            # WAL 模式下提交不需要每次都同步整个数据库文件
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS translations (
+                    source TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    target TEXT NOT NULL,
+                    length INTEGER NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (source, model)
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_translations_length ON translations (model, length)")
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"打开翻译记忆库失败，将不使用翻译记忆: {e}")
+            self._conn = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._conn is not None
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """统一全角半角和空白，只是写法不同的句子使用同一条记录"""
+        text = unicodedata.normalize("NFKC", text)
+        return re.sub(r"\s+", " ", text).strip()
+
+    def get(self, text: str, model: str) -> Optional[str]:
+        if self._conn is None:
+            return None
+        source = self.normalize(text)
+        if not source:
+            return None
+        with self._lock:
+            row = self._conn.execute("SELECT target FROM translations WHERE source = ? AND model = ?",
+                                     (source, model)).fetchone()
+            if row is not None:
+                key = (source, model)
+                self._pending_hits[key] = self._pending_hits.get(key, 0) + 1
+                self._maybe_commit()
+                self.hits += 1
+                return row[0]
+            target = self._fuzzy_get(source, model) if self.fuzzy_threshold > 0 else None
+        if target is None:
+            self.misses += 1
+        else:
+            self.fuzzy_hits += 1
+        return target
+
+    def _fuzzy_get(self, source: str, model: str) -> Optional[str]:
+        """在长度相近的记录里找最相似的一条"""
+        slack = max(1, int(len(source) * (1 - self.fuzzy_threshold)))
+        rows = self._conn.execute(
+            "SELECT source, target FROM translations WHERE model = ? AND length BETWEEN ? AND ? "
+            "ORDER BY hits DESC LIMIT ?",
+            (model, len(source) - slack, len(source) + slack, self.FUZZY_CANDIDATES)).fetchall()
+        best, best_ratio = None, self.fuzzy_threshold
+        matcher = difflib.SequenceMatcher(autojunk=False)
+        matcher.set_seq2(source)
+        for candidate, target in rows:
+            matcher.set_seq1(candidate)
+            # quick_ratio 是相似度的上界，先用它排除大部分记录
+            if matcher.quick_ratio() < best_ratio:
+                continue
+            ratio = matcher.ratio()
+            if ratio >= best_ratio:
+                best, best_ratio = target, ratio
+        return best
+
+    def put(self, text: str, model: str, target: str) -> None:
+        if self._conn is None:
+            return
+        source = self.normalize(text)
+        if not source or not target.strip():
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO translations (source, model, target, length, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (source, model) DO UPDATE SET target = excluded.target, updated_at = excluded.updated_at",
+                (source, model, target.strip(), len(source), time.time()))
+            self._pending_puts += 1
+            self._maybe_commit()
+
+    async def get_many(self, texts: List[str], model: str) -> List[Optional[str]]:
+        """在线程中依次查询，不阻塞事件循环"""
+        if self._conn is None:
+            return [None] * len(texts)
+        try:
+            return await asyncio.to_thread(lambda: [self.get(text, model) for text in texts])
+        except sqlite3.Error as e:
+            logger.warning(f"查询翻译记忆失败: {e}")
+            return [None] * len(texts)
+
+    async def put_many(self, items: List[Tuple[str, str]], model: str) -> None:
+        """在线程中保存 (原文, 译文)，不阻塞事件循环"""
+        if self._conn is None or not items:
+            return
+
+        def _put():
+            for text, target in items:
+                self.put(text, model, target)
+        try:
+            await asyncio.to_thread(_put)
+        except sqlite3.Error as e:
+            logger.warning(f"保存翻译记忆失败: {e}")
+
+    def _maybe_commit(self) -> None:
+        """持有 _lock 时调用"""
+        pending = self._pending_puts + len(self._pending_hits)
+        if pending and (pending >= self.COMMIT_EVERY
+                        or time.monotonic() - self._last_commit >= self.COMMIT_INTERVAL):
+            self._commit()
+
+    def _commit(self) -> None:
+        """持有 _lock 时调用，把攒下的命中次数和新译文一起提交"""
+        if self._pending_hits:
+            self._conn.executemany("UPDATE translations SET hits = hits + ? WHERE source = ? AND model = ?",
+                                   [(count, source, model) for (source, model), count in self._pending_hits.items()])
+            self._pending_hits.clear()
+        self._conn.commit()
+        self._pending_puts = 0
+        self._last_commit = time.monotonic()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._commit()
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> Dict[str, Any]:
+        entries = 0
+        if self._conn is not None:
+            with self._lock:
+                entries = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        return {"entries": entries, "hits": self.hits, "fuzzy_hits": self.fuzzy_hits, "misses": self.misses}
+
+
+def collect_script_texts(scripts_dir: Path) -> List[str]:
+    """
+    收集剧本目录中所有对话台词的中文部分（scripts/*/Charpters/ 下的所有yaml）
+
+    和 DialogueEvent 一样按行拆分，并去掉【情绪】和（动作）标注。
+    """
+    texts: List[str] = []
+    seen = set()
+    for chapter_file in sorted(Path(scripts_dir).glob("*/Charpters/**/*.yaml")):
+        try:
+            with open(chapter_file, "r", encoding="utf-8") as f:
+                data = yaml.safe_load(f) or {}
+        except (OSError, yaml.YAMLError) as e:
+            logger.warning(f"读取剧本失败 {chapter_file}: {e}")
+            continue
+        for event in data.get("events") or []:
+            if not isinstance(event, dict) or event.get("type") != "dialogue":
+                continue
+            for line in str(event.get("text", "")).splitlines():
+                segments = re.findall(r'【.*?】([^【】]*)', line) or [line]
+                for segment in segments:
+                    text = re.sub(r'<.*?>|[（(].*?[）)]', '', segment).strip()
+                    if text and text not in seen:
+                        seen.add(text)
+                        texts.append(text)
+    return texts
+
+
+_translation_memory: Optional[TranslationMemory] = None
+
+
+def get_translation_memory() -> Optional[TranslationMemory]:
+    """所有会话共用一个翻译记忆库，TRANSLATION_MEMORY=false 时返回None"""
+    global _translation_memory
+    if os.environ.get("TRANSLATION_MEMORY", "True").lower() != "true":
+        return None
+    if _translation_memory is None:
+        _translation_memory = TranslationMemory()
+    return _translation_memory
+
+
+def close_translation_memory() -> None:
+    """提交还没写入的改动并关闭，没有打开过时什么也不做"""
+    global _translation_memory
+    if _translation_memory is not None:
+        _translation_memory.close()
+        _translation_memory = None
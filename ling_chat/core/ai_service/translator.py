@@ -1,14 +1,73 @@
+import asyncio
 import os
 
-from typing import List, Dict
+from typing import AsyncGenerator, List, Dict, Tuple
+from ling_chat.core.ai_service.translation_batcher import TranslationBatcher
+from ling_chat.core.ai_service.translation_memory import get_translation_memory
 from ling_chat.core.logger import logger
-from ling_chat.core.llm_providers.manager import LLMManager
+from ling_chat.core.llm_providers.manager import LLMManager, get_shared_llm_manager
+
+
+class VoicePipeline:
+    """
+    边读翻译结果边合成语音
+
+    每拿到一段译文就交给后台任务合成，翻译流继续读取，不再等这一段的语音；
+    同时合成的段数不超过 depth，depth 为0时退回到逐段等待。
+    退出时按提交顺序等待所有语音完成；被取消时一起取消还没完成的合成。
+    """
+    def __init__(self, voice_maker, depth: int):
+        self.voice_maker = voice_maker
+        self.depth = depth
+        self._slots = asyncio.Semaphore(depth) if depth > 0 else None
+        self._tasks: List[Tuple[Dict, asyncio.Task]] = []
+
+    async def submit(self, seg: Dict) -> None:
+        if self._slots is None:
+            await self._generate(seg)
+        else:
+            self._tasks.append((seg, asyncio.create_task(self._generate(seg))))
+
+    async def _generate(self, seg: Dict) -> None:
+        if self._slots is None:
+            await self.voice_maker.generate_voice_files([seg])
+        else:
+            async with self._slots:
+                await self.voice_maker.generate_voice_files([seg])
+        logger.info(f"生成语音完成: {seg['japanese_text']}")
+
+    async def join(self) -> None:
+        """按提交顺序等待，一段失败不影响其他段"""
+        try:
+            for seg, task in self._tasks:
+                try:
+                    await task
+                except Exception as e:
+                    logger.error(f"语音合成失败 {seg['japanese_text']}: {e}")
+        except asyncio.CancelledError:
+            self.cancel()
+            raise
+
+    def cancel(self) -> None:
+        for _, task in self._tasks:
+            task.cancel()
+
+    async def __aenter__(self) -> "VoicePipeline":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None and issubclass(exc_type, asyncio.CancelledError):
+            self.cancel()
+            await asyncio.gather(*(task for _, task in self._tasks), return_exceptions=True)
+        else:
+            # 翻译中途超时或出错时，已经拿到译文的段仍然合成语音
+            await self.join()
 
 
 class Translator:
     def __init__(self, voice_maker):
         self.enable:bool = True
-        self.translator_llm: 'LLMManager' = LLMManager(llm_job="translator")
+        self.translator_llm: 'LLMManager' = get_shared_llm_manager("translator")
         self.messages = [{
             "role": "system",
             "content": """
@@ -24,6 +83,15 @@ class Translator:
         self.voice_maker = voice_maker
 
         self.enable_translate:bool = os.environ.get("ENABLE_TRANSLATE", "True").lower() == "true"
+        self.timeout = float(os.environ.get("TRANSLATE_TIMEOUT", 60))  # 一次翻译请求（包括流式读取）的最长秒数
+        self.pipeline_depth = int(os.environ.get("TRANSLATE_PIPELINE_DEPTH", 3))  # 翻译时同时合成语音的最大段数
+        # 合并翻译：多个句子的翻译合成一次请求
+        self.batcher = TranslationBatcher(self) \
+            if os.environ.get("TRANSLATE_BATCH", "False").lower() == "true" else None
+        # 翻译记忆：翻译过的句子直接使用保存的译文，按翻译模型区分
+        self.memory = get_translation_memory()
+        self.memory_model = f"{getattr(self.translator_llm, 'llm_provider_type', '')}:" \
+                            f"{getattr(self.translator_llm, 'model_type', '')}"
 
     def get_all_chinese_part(self, results: List[Dict]) -> str:
         result = ""
@@ -31,81 +99,141 @@ class Translator:
             result += "<" + i["following_text"] + ">"
         return result
 
+    @staticmethod
+    def split_translations(buffer: str) -> Tuple[List[str], str]:
+        """从缓冲区中取出所有完整的 <…>，返回译文列表和剩余的缓冲区"""
+        sentences = []
+        while True:
+            start = buffer.find("<")
+            if start == -1:
+                return sentences, ""
+            end = buffer.find(">", start)
+            if end == -1:
+                return sentences, buffer[start:]
+            sentences.append(buffer[start + 1:end])
+            buffer = buffer[end + 1:]
+
+    async def iter_translations(self, results: List[Dict], stream: bool) -> AsyncGenerator[str, None]:
+        """
+        把片段的中文一次发给翻译模型，按顺序逐条返回译文
+
+        等待翻译模型的时间累计超过 timeout 秒时抛出 TimeoutError；调用方被取消时请求也随之取消。
+        超时只计算等待翻译模型的时间，不包括调用方在 yield 处处理每条译文的时间。
+        """
+        send_messages = self.messages.copy()
+        send_messages.append({"role": "user", "content": self.get_all_chinese_part(results)})
+        loop = asyncio.get_running_loop()
+        remaining = self.timeout
+
+        if stream:
+            buffer = ""
+            chunks = self.translator_llm.process_message_stream(send_messages)
+            try:
+                while True:
+                    start = loop.time()
+                    try:
+                        chunk = await asyncio.wait_for(anext(chunks), max(0.0, remaining))
+                    except StopAsyncIteration:
+                        break
+                    remaining -= loop.time() - start
+                    print(chunk, end="", flush=True)
+                    sentences, buffer = self.split_translations(buffer + chunk)
+                    for sentence in sentences:
+                        yield sentence
+            finally:
+                await chunks.aclose()
+        else:
+            japanese_response = await asyncio.wait_for(
+                self.translator_llm.process_message_async(send_messages), self.timeout)
+            logger.info(f"完整日语翻译结果: {japanese_response}")
+            for sentence in self.split_translations(japanese_response)[0]:
+                yield sentence
+
+    async def recall(self, results: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """从翻译记忆中填入译文，返回 (命中的片段, 还需要翻译的片段)"""
+        if self.memory is None:
+            return [], results
+        hits, misses = [], []
+        texts = [seg["following_text"] for seg in results if seg.get("following_text")]
+        found = iter(await self.memory.get_many(texts, self.memory_model))
+        for seg in results:
+            japanese_text = next(found) if seg.get("following_text") else None
+            if japanese_text is None:
+                misses.append(seg)
+            else:
+                seg["japanese_text"] = japanese_text
+                hits.append(seg)
+        return hits, misses
+
+    async def remember(self, *segments: Dict) -> None:
+        """把模型给出的译文存入翻译记忆"""
+        if self.memory is None:
+            return
+        items = [(seg["following_text"], seg["japanese_text"]) for seg in segments
+                 if seg.get("following_text") and seg.get("japanese_text")]
+        await self.memory.put_many(items, self.memory_model)
+
+    async def pretranslate(self, texts: List[str], batch_size: int = 10) -> int:
+        """批量翻译并存入翻译记忆（不合成语音），返回新翻译的句子数"""
+        if self.memory is None:
+            logger.warning("翻译记忆未启用，无法预翻译")
+            return 0
+        pending = [{"following_text": text, "japanese_text": ""} for text in texts]
+        _, pending = await self.recall(pending)
+        translated = 0
+        for i in range(0, len(pending), batch_size):
+            batch = pending[i:i + batch_size]
+            try:
+                japanese_texts = [text async for text in self.iter_translations(batch, stream=False)]
+            except Exception as e:
+                logger.error(f"预翻译失败: {e}")
+                continue
+            if len(japanese_texts) != len(batch):
+                # 数量对不上时无法确定对应关系，这一批不保存
+                logger.warning(f"预翻译结果数量不一致（{len(japanese_texts)}/{len(batch)}），跳过这一批")
+                continue
+            for seg, japanese_text in zip(batch, japanese_texts):
+                seg["japanese_text"] = japanese_text
+            await self.remember(*batch)
+            translated += len(batch)
+            logger.info(f"预翻译进度: {min(i + batch_size, len(pending))}/{len(pending)}")
+        return translated
+
     async def translate_ai_response(self, results: List[Dict], script: bool = True):
         """将中文翻译成日文并合成语音"""
         if not self.enable_translate and not script:
             return
 
-        full_chinese_response:str = self.get_all_chinese_part(results)
+        # 翻译记忆命中的片段不需要请求翻译模型
+        hits, results = await self.recall(results)
+        if hits:
+            await self.voice_maker.generate_voice_files(hits)
+        if not results:
+            return
 
-        # 第二步：用中文回答作为输入，流式翻译成日语
-        if not full_chinese_response:
+        if not self.get_all_chinese_part(results):
             logger.warning("AI回复没有中文，跳过日语翻译")
             return
-        
-        send_messages = self.messages.copy()
-        send_messages.append({"role":"user","content":full_chinese_response})
-
-        if os.environ.get("TRANSLATE_STREAM", "true") == "true" and not script:
-
-            # 流式处理
-            buffer = ""
-            current_segment_index = 0
 
-            japanese_stream = self.translator_llm.process_message_stream(send_messages)
-
-            async for chunk in japanese_stream:
-                print(chunk, end="", flush=True)
-                buffer += chunk
-                # 检测完整句子
-                while "<" in buffer and ">" in buffer:
-                    start = buffer.index("<")
-                    end = buffer.index(">") + 1
-                    if start < end:
-                        sentence = buffer[start:end]
-                        buffer = buffer[end:]
-
-                        # 去除标记符号
-                        clean_sentence = sentence[1:-1]
-
-                        # 找到对应的segment并更新
-                        if current_segment_index < len(results):
-                            results[current_segment_index]["japanese_text"] = clean_sentence
-
-                            # 实时生成语音
-                            await self.voice_maker.generate_voice_files(
-                                [results[current_segment_index]]
-                            )
-                            logger.info("开始生成下一条语音...")
-
-                            current_segment_index += 1
-        else:
-            # 非流式处理 - 等待完整响应
-            japanese_response = self.translator_llm.process_message(send_messages)
-            logger.info(f"完整日语翻译结果: {japanese_response}")
+        stream = os.environ.get("TRANSLATE_STREAM", "true") == "true" and not script
+        try:
+            if self.batcher is not None:
+                await self.batcher.translate(results, stream)
+                return
 
-            # 解析完整响应并提取句子
-            buffer = japanese_response
+            # 用中文回答作为输入翻译成日语，每拿到一段译文就开始生成它的语音
             current_segment_index = 0
-
-            # 处理完整响应中的所有句子
-            while "<" in buffer and ">" in buffer and current_segment_index < len(results):
-                start = buffer.index("<")
-                end = buffer.index(">") + 1
-                if start < end:
-                    sentence = buffer[start:end]
-                    buffer = buffer[end:]
-
-                    # 去除标记符号
-                    clean_sentence = sentence[1:-1]
-
-                    # 找到对应的segment并更新
-                    results[current_segment_index]["japanese_text"] = clean_sentence
-
-                    # 生成语音
-                    await self.voice_maker.generate_voice_files(
-                        [results[current_segment_index]]
-                    )
-                    logger.info(f"生成语音完成: {clean_sentence}")
-
-                    current_segment_index += 1
\ No newline at end of file
+            async with VoicePipeline(self.voice_maker, self.pipeline_depth) as pipeline:
+                async for japanese_text in self.iter_translations(results, stream):
+                    if current_segment_index >= len(results):
+                        break
+                    seg = results[current_segment_index]
+                    seg["japanese_text"] = japanese_text
+                    await pipeline.submit(seg)
+                    await self.remember(seg)
+                    current_segment_index += 1
+        except TimeoutError:
+            # 翻译超时不影响文字回复，只是这几句没有语音
+            logger.warning(f"日语翻译超过 {self.timeout:g} 秒未完成，跳过这部分语音")
+        except Exception as e:
+            logger.error(f"日语翻译失败: {e}")
@@ -1,18 +1,30 @@
 import asyncio
 import os
 
-from typing import Any, List, Dict, Awaitable
+from typing import Any, List, Dict, Awaitable, Optional, TYPE_CHECKING
 from ling_chat.core.TTS.tts_provider import TTS
 from ling_chat.core.logger import logger
 
+if TYPE_CHECKING:
+    from ling_chat.core.ai_service.message_system.voice_speculator import Speculation
+
 class VoiceMaker:
-    def __init__(self) -> None:
-        self.tts_provider = TTS()
+    # TTS_FALLBACK=auto 时备用合成器的尝试顺序
+    FALLBACK_ORDER = ("sbv2", "gsv", "sva-bv2", "sva-vits", "sbv2api", "aivis")
+
+    def __init__(self, tts_provider: Optional[TTS] = None) -> None:
+        self.tts_provider = tts_provider if tts_provider is not None else TTS()
         self.model_name = ""
         self.speaker_id = 4
         self.tts_type = ""
         self.lang = "ja"  # 默认语言为日语
         self.character_path = ""  # 添加角色卡路径，以便用于gsv
+        # 流式语音：不等待合成结束就返回，前端请求语音时边合成边接收
+        self.streaming = os.environ.get("TTS_STREAMING", "False").lower() == "true"
+        if self.streaming and self.tts_provider.encode:
+            # 流式语音边合成边发送，来不及整段压缩
+            logger.info("已启用流式语音，语音压缩不生效")
+            self.tts_provider.encode = False
 
         # 初始化语音合成器可用状态
         self.sva_available = False
@@ -67,82 +79,122 @@ class VoiceMaker:
             self.check_tts_availability(tts_settings)
             
             # 根据当前设置的TTS类型进行初始化
-            if self.tts_type == "sva-vits" and self.sva_available:
-                self.tts_provider.init_sva_adapter(speaker_id=int(tts_settings["sva_speaker_id"]))
-            elif self.tts_type == "sbv2" and self.sbv2_available:
-                self.tts_provider.init_sbv2_adapter(speaker_id=int(tts_settings["sbv2_speaker_id"]), 
-                                                    model_name=tts_settings["sbv2_name"])
-            elif self.tts_type == "sva-bv2" and self.bv2_available:
-                self.tts_provider.init_bv2_adapter(speaker_id=int(tts_settings["bv2_speaker_id"]))
-            elif self.tts_type == "sbv2api" and self.sbv2api_available:
-                self.tts_provider.init_sbv2api_adapter(model_name=tts_settings["sbv2api_name"],
-                                                       speaker_id=int(tts_settings["sbv2api_speaker_id"]))
-            elif self.tts_type == "gsv" and self.gsv_available:
-                # 获取参考音频文件名
-                ref_audio_filename = tts_settings["gsv_voice_filename"]
-                ref_audio_path = ref_audio_filename
-                
-                # 检查参考音频路径是否为绝对路径，如果是则发出警告
-                if os.path.isabs(ref_audio_filename):
-                    logger.warning(f"角色 {name} 的参考音频路径为绝对路径: {ref_audio_filename}，这可能导致gsv出错")
-                
-                # 拼接角色路径
-                ref_audio_path = os.path.join(self.character_path, ref_audio_filename)
-                logger.debug(f"gsv拼接后的参考音频路径: {ref_audio_path}")
-                
-                # 优先使用环境变量定义的语音文件
-                if os.environ.get("GPT_SOVITS_REF_AUDIO", "") == "":
-                    self.tts_provider.init_gsv_adapter(ref_audio_path=ref_audio_path,
-                                                       prompt_text=tts_settings["gsv_voice_text"])
-                else:
-                    self.tts_provider.init_gsv_adapter(ref_audio_path=os.environ.get("GPT_SOVITS_REF_AUDIO", ""),
-                                                       prompt_text=os.environ.get("GPT_SOVITS_PROMPT_TEXT", ""))
-                    logger.warning("你正在使用环境变量中的GPT-SoVITS配置")
-                
-                # 处理模型设置
-                gpt_model_name = tts_settings.get("gsv_gpt_model_name", "")
-                sovits_model_name = tts_settings.get("gsv_sovits_model_name", "")
-                
-                # 检查环境变量中的模型配置
-                env_gpt_model = os.environ.get("GPT_SOVITS_GPT_MODEL", "")
-                env_sovits_model = os.environ.get("GPT_SOVITS_SOVITS_MODEL", "")
-                
-                # 异步设置模型
-                async def _set_models(gpt_model_path: str, sovits_model_path: str):
-                    # 确保gsv_adapter不为None (pylance如是说)
-                    if self.tts_provider.gsv_adapter is not None:
-                        success = await self.tts_provider.gsv_adapter.set_model(gpt_model_path, sovits_model_path)
-                        if success:
-                            logger.info(f"GSV模型设置成功: GPT={gpt_model_path}, SoVITS={sovits_model_path}")
-                        else:
-                            logger.error(f"GSV模型设置失败: GPT={gpt_model_path}, SoVITS={sovits_model_path}")
-                    else:
-                        logger.error("GSV适配器未初始化，无法设置模型")
-                
-                # 如果环境变量中有模型配置，则优先使用环境变量，否则使用setting设置
-                if env_gpt_model and env_sovits_model:
-                    # 创建异步任务
-                    asyncio.create_task(_set_models(env_gpt_model, env_sovits_model))
-                    logger.warning("你正在使用环境变量中的GSV模型配置")
-                elif gpt_model_name and sovits_model_name:
-                    # 构建模型的绝对路径
-                    models_dir = os.path.join(self.character_path, "models", "gsv")
-                    gpt_model_path = os.path.join(models_dir, gpt_model_name)
-                    sovits_model_path = os.path.join(models_dir, sovits_model_name)
-                    
-                    # 创建异步任务
-                    asyncio.create_task(_set_models(gpt_model_path, sovits_model_path))
-            elif self.tts_type == "aivis" and self.aivis_available:
-                self.tts_provider.init_aivis_adapter(model_uuid=tts_settings["aivis_model_uuid"])
-            elif self.tts_type == "indextts2":
-                self.tts_provider.init_index_adapter()
-                self.set_lang("zh")
-            else:
+            if not self._init_adapter(self.tts_type, tts_settings, name):
                 logger.warning(f"你的环境变量中TTS设置有误，此角色{name}不支持{self.tts_type}，将使用角色卡的默认语音合成器！")
                 raise ValueError
+            self._init_fallbacks(tts_settings, name)
         except KeyError as e:
             logger.error(f"当前角色卡{name}的TTS设置出错，问题是：{e}")
 
+    def _init_fallbacks(self, tts_settings: dict[str,str], name: str) -> None:
+        """
+        初始化备用的TTS适配器，主适配器不可用或太慢时按顺序使用
+        TTS_FALLBACK 为 auto 时使用角色卡中所有可用的合成器，也可以用逗号分隔指定顺序
+        """
+        fallback_setting = os.environ.get("TTS_FALLBACK", "").strip()
+        if fallback_setting.lower() == "auto":
+            candidates = list(self.FALLBACK_ORDER)
+        else:
+            candidates = [t.strip() for t in fallback_setting.split(",") if t.strip()]
+
+        fallback_types = []
+        for tts_type in candidates:
+            # IndexTTS 合成的是中文语音，不能替代日语合成器
+            if tts_type == self.tts_type or tts_type == "indextts2" or tts_type in fallback_types:
+                continue
+            # 没有API密钥时初始化AIVIS会禁用整个TTS
+            if tts_type == "aivis" and os.environ.get("AIVIS_API_KRY", "") == "":
+                continue
+            try:
+                if self._init_adapter(tts_type, tts_settings, name):
+                    fallback_types.append(tts_type)
+            except (KeyError, ValueError) as e:
+                logger.warning(f"备用TTS {tts_type} 初始化失败: {e}")
+        self.tts_provider.fallback_types = fallback_types
+        if fallback_types:
+            logger.info(f"备用TTS: {', '.join(fallback_types)}")
+
+    def _init_adapter(self, tts_type: str, tts_settings: dict[str,str], name: str) -> bool:
+        """初始化指定类型的TTS适配器，角色卡不支持这种类型时返回False"""
+        if tts_type == "sva-vits" and self.sva_available:
+            self.tts_provider.init_sva_adapter(speaker_id=int(tts_settings["sva_speaker_id"]))
+            return True
+        elif tts_type == "sbv2" and self.sbv2_available:
+            self.tts_provider.init_sbv2_adapter(speaker_id=int(tts_settings["sbv2_speaker_id"]), 
+                                                model_name=tts_settings["sbv2_name"])
+            return True
+        elif tts_type == "sva-bv2" and self.bv2_available:
+            self.tts_provider.init_bv2_adapter(speaker_id=int(tts_settings["bv2_speaker_id"]))
+            return True
+        elif tts_type == "sbv2api" and self.sbv2api_available:
+            self.tts_provider.init_sbv2api_adapter(model_name=tts_settings["sbv2api_name"],
+                                                   speaker_id=int(tts_settings["sbv2api_speaker_id"]))
+            return True
+        elif tts_type == "gsv" and self.gsv_available:
+            # 获取参考音频文件名
+            ref_audio_filename = tts_settings["gsv_voice_filename"]
+            ref_audio_path = ref_audio_filename
+            
+            # 检查参考音频路径是否为绝对路径，如果是则发出警告
+            if os.path.isabs(ref_audio_filename):
+                logger.warning(f"角色 {name} 的参考音频路径为绝对路径: {ref_audio_filename}，这可能导致gsv出错")
+            
+            # 拼接角色路径
+            ref_audio_path = os.path.join(self.character_path, ref_audio_filename)
+            logger.debug(f"gsv拼接后的参考音频路径: {ref_audio_path}")
+            
+            # 优先使用环境变量定义的语音文件
+            if os.environ.get("GPT_SOVITS_REF_AUDIO", "") == "":
+                self.tts_provider.init_gsv_adapter(ref_audio_path=ref_audio_path,
+                                                   prompt_text=tts_settings["gsv_voice_text"])
+            else:
+                self.tts_provider.init_gsv_adapter(ref_audio_path=os.environ.get("GPT_SOVITS_REF_AUDIO", ""),
+                                                   prompt_text=os.environ.get("GPT_SOVITS_PROMPT_TEXT", ""))
+                logger.warning("你正在使用环境变量中的GPT-SoVITS配置")
+            
+            # 处理模型设置
+            gpt_model_name = tts_settings.get("gsv_gpt_model_name", "")
+            sovits_model_name = tts_settings.get("gsv_sovits_model_name", "")
+            
+            # 检查环境变量中的模型配置
+            env_gpt_model = os.environ.get("GPT_SOVITS_GPT_MODEL", "")
+            env_sovits_model = os.environ.get("GPT_SOVITS_SOVITS_MODEL", "")
+            
+            # 异步设置模型
+            async def _set_models(gpt_model_path: str, sovits_model_path: str):
+                # 确保gsv_adapter不为None (pylance如是说)
+                if self.tts_provider.gsv_adapter is not None:
+                    success = await self.tts_provider.gsv_adapter.set_model(gpt_model_path, sovits_model_path)
+                    if success:
+                        logger.info(f"GSV模型设置成功: GPT={gpt_model_path}, SoVITS={sovits_model_path}")
+                    else:
+                        logger.error(f"GSV模型设置失败: GPT={gpt_model_path}, SoVITS={sovits_model_path}")
+                else:
+                    logger.error("GSV适配器未初始化，无法设置模型")
+            
+            # 如果环境变量中有模型配置，则优先使用环境变量，否则使用setting设置
+            if env_gpt_model and env_sovits_model:
+                # 创建异步任务
+                asyncio.create_task(_set_models(env_gpt_model, env_sovits_model))
+                logger.warning("你正在使用环境变量中的GSV模型配置")
+            elif gpt_model_name and sovits_model_name:
+                # 构建模型的绝对路径
+                models_dir = os.path.join(self.character_path, "models", "gsv")
+                gpt_model_path = os.path.join(models_dir, gpt_model_name)
+                sovits_model_path = os.path.join(models_dir, sovits_model_name)
+                
+                # 创建异步任务
+                asyncio.create_task(_set_models(gpt_model_path, sovits_model_path))
+            return True
+        elif tts_type == "aivis" and self.aivis_available:
+            self.tts_provider.init_aivis_adapter(model_uuid=tts_settings["aivis_model_uuid"])
+            return True
+        elif tts_type == "indextts2":
+            self.tts_provider.init_index_adapter()
+            self.set_lang("zh")
+            return True
+        return False
+
     def set_tts(self, tts_type: str, tts_settings: dict[Any,Any], name: str) -> None:
         """设置默认的TTS类型"""
         available_tts_types = ("sva-bv2", "gsv", "sbv2", "sva-vits", "sbv2api","aivis", "indextts2")
@@ -172,30 +224,68 @@ class VoiceMaker:
         """设置角色卡路径"""
         self.character_path = character_path
     
-    async def generate_voice_files(self, segments: List[Dict[str, str]]):
-        """生成语音文件"""
+    async def close(self) -> None:
+        """关闭语音合成器持有的网络连接"""
+        await self.tts_provider.close()
+
+    def speculate(self, text: str, voice_file: str) -> Optional[asyncio.Task]:
+        """在后台提前合成一段日语，句子还没结束时调用，确定不会有语音时返回None"""
+        if self.streaming:
+            return self.tts_provider.start_voice_stream(text, voice_file, tts_type=self.tts_type, lang=self.lang)
+        return asyncio.create_task(self.tts_provider.generate_voice(text, voice_file,
+                                                                    tts_type=self.tts_type, lang=self.lang))
+
+    async def generate_voice_files(self, segments: List[Dict[str, str]],
+                                   speculation: Optional["Speculation"] = None):
+        """
+        生成语音文件，开启流式语音时只启动合成，不等待结束
+
+        :param speculation: 已经提前开始的合成，文本相同的片段直接使用它的结果
+        """
         tasks: List[Awaitable[str | None]] = []
+        task_segments: List[Dict] = []
         logger.debug(f"生成语音文件: {segments}")
         for seg in segments:
             if self.lang == "ja":
                 if seg["japanese_text"]:
-                    task = self.tts_provider.generate_voice(seg["japanese_text"], 
-                                                            seg["voice_file"], 
-                                                            tts_type=self.tts_type, 
-                                                            lang="ja")
-                    tasks.append(task)
-                elif seg["following_text"] and not seg.get("japanese_text"):
-                    logger.warning(f"片段 {seg['index']} 没有日语文本，跳过语音生成")
+                    text, emo = seg["japanese_text"], ""
+                else:
+                    if seg["following_text"]:
+                        logger.warning(f"片段 {seg['index']} 没有日语文本，跳过语音生成")
+                    continue
             elif self.lang == "zh":
                 if seg["following_text"]:
-                    task = self.tts_provider.generate_voice(seg["following_text"], 
-                                                            seg["voice_file"], 
-                                                            tts_type=self.tts_type,
-                                                            emo=seg.get('predict', ''), 
-                                                            lang="zh")
-                    tasks.append(task)
+                    text, emo = seg["following_text"], seg.get('predict', '')
                 else:
                     logger.warning(f"片段 {seg['index']} 没有中文文本，跳过语音生成\n"
                                    f"Tips：要真出现这情况，你应该检查LLM是否正常输出。")
+                    continue
+            else:
+                continue
+
+            if speculation is not None and speculation.text == text:
+                seg["voice_file"] = speculation.voice_file
+                if self.streaming:
+                    # 合成已经结束时按结果判断；还在合成时，失败由语音接口返回错误
+                    task = speculation.task
+                    seg["has_voice"] = not task.done() or (not task.cancelled() and task.result())
+                else:
+                    tasks.append(speculation.task)
+                    task_segments.append(seg)
+                speculation = None
+            elif self.streaming:
+                task = self.tts_provider.start_voice_stream(text, seg["voice_file"],
+                                                            tts_type=self.tts_type, lang=self.lang, emo=emo)
+                seg["has_voice"] = task is not None
+            else:
+                tasks.append(self.tts_provider.generate_voice(text, seg["voice_file"],
+                                                              tts_type=self.tts_type, lang=self.lang, emo=emo))
+                task_segments.append(seg)
+
         if tasks:
-            await asyncio.gather(*tasks)
+            results = await asyncio.gather(*tasks)
+            # 文件可能还在后台写入，生成成功就可以告诉前端语音文件名
+            for seg, result in zip(task_segments, results):
+                seg["has_voice"] = result is not None
+                if result is not None:
+                    seg["voice_file"] = result  # 压缩失败时保存的扩展名会变
@@ -1,7 +1,9 @@
 import os
 import json
+import threading
 from pathlib import Path
 from ling_chat.core.logger import logger, TermColors
+from ling_chat.core.emotion.prediction_cache import PredictionCache
 from ling_chat.utils.runtime_path import third_party_path
 import onnxruntime as ort
 import numpy as np
@@ -10,6 +12,10 @@ class EmotionClassifier:
     def __init__(self, model_path=None):
         """加载情绪分类模型 (ONNX版本)"""
 
+        cache_path = os.environ.get("EMOTION_CACHE_PATH", "")
+        self.cache = PredictionCache(maxsize=int(os.environ.get("EMOTION_CACHE_SIZE", 1024)),
+                                     path=Path(cache_path) if cache_path else None)
+
         # 检查是否启用了情感分类器
         if os.environ.get("ENABLE_EMOTION_CLASSIFIER", "True").lower() == "false":
             self._log_emotion_model_status(False, "情绪分类器已通过 ENABLE_EMOTION_CLASSIFIER 环境变量禁用，将直接传递情感标签")
@@ -17,6 +23,7 @@ class EmotionClassifier:
             self.label2id = {}
             self.session = None # 使用 self.session 替代 self.model
             self.vocab = {}
+            self.fixed_seq_length = None
             return
 
         try:
@@ -43,13 +50,20 @@ class EmotionClassifier:
             
             # 加载词汇表以进行手动分词
             self.vocab = self._load_vocab(vocab_path)
+            self._init_tokenizer()
             
             # 创建ONNX Runtime会话，并指定使用CPU
             providers = ['CPUExecutionProvider']
             self.session = ort.InferenceSession(str(onnx_model_file), providers=providers)
+            self.fixed_seq_length = self._get_fixed_seq_length()
             
             self._log_label_mapping()
             self._log_emotion_model_status(True, f"已成功加载情绪分类ONNX模型: {model_path.name}")
+
+            # 加载磁盘缓存，并用已知的情绪标签预热，LLM输出的标签绝大多数都在其中
+            self.cache.model_id = str(onnx_model_file)
+            self.cache.load()
+            self.prewarm()
             
         except Exception as e:
             self._log_emotion_model_status(False, f"加载情绪分类ONNX模型失败: {e}")
@@ -57,6 +71,28 @@ class EmotionClassifier:
             self.label2id = {}
             self.session = None
             self.vocab = {}
+            self.fixed_seq_length = None
+
+    def prewarm(self, texts=None):
+        """预先计算并缓存一批文本（默认是所有情绪标签）的预测结果"""
+        texts = [text for text in (texts if texts is not None else self.label2id) if text]
+        if not texts or self.session is None:
+            return
+        self.predict_batch(texts)
+        self.cache.save()
+        logger.debug(f"情绪预测缓存已预热: {self.cache.stats()}")
+
+    def save_cache(self):
+        self.cache.save()
+
+    def cache_stats(self):
+        """缓存命中/未命中次数，以及当前缓存的条目数"""
+        return self.cache.stats()
+
+    def _get_fixed_seq_length(self):
+        """模型导出时如果固定了序列长度，就只能填充到这个长度；动态长度时返回None"""
+        seq_dim = self.session.get_inputs()[0].shape[1]
+        return seq_dim if isinstance(seq_dim, int) else None
 
     def _load_vocab(self, vocab_path):
         """从 vocab.txt 加载词汇表"""
@@ -87,33 +123,78 @@ class EmotionClassifier:
             else:
                 logger.error(f"{status_color}{status_symbol}{TermColors.RESET} {status}")
 
-    def _tokenize(self, text, max_length=128):
-        """手动实现分词、ID转换和填充"""
-        tokens = list(text) # 基础的按字分词
-        
-        # 转换为ID
-        token_ids = [self.vocab.get(token, self.vocab.get("[UNK]")) for token in tokens]
-        
-        # 截断
-        if len(token_ids) > max_length - 2:
-            token_ids = token_ids[:max_length - 2]
-        
-        # 添加特殊标记 [CLS] 和 [SEP]
-        input_ids = [self.vocab["[CLS]"]] + token_ids + [self.vocab["[SEP]"]]
-        attention_mask = [1] * len(input_ids)
-        
-        # 填充
-        padding_length = max_length - len(input_ids)
-        input_ids += [self.vocab["[PAD]"]] * padding_length
-        attention_mask += [0] * padding_length
-        
-        # 创建 token_type_ids
-        token_type_ids = [0] * max_length
-        
+    def _init_tokenizer(self):
+        """
+        预先构建BMP范围内“字符 -> ID”的查找表和可复用的输入缓冲区。
+        分词时整批文本一次性转换成码点数组，通过查表得到ID，不再逐字查字典。
+        BMP以外的单字词（👍🔥等表情）很少，单独放在一个小字典里。
+        """
+        self.unk_id = self.vocab.get("[UNK]", 0)
+        self.cls_id, self.sep_id, self.pad_id = self.vocab["[CLS]"], self.vocab["[SEP]"], self.vocab["[PAD]"]
+
+        self.char_table = np.full(0x10000, self.unk_id, dtype=np.int64)
+        self.astral_chars = {}  # BMP以外的码点 -> ID
+        for token, idx in self.vocab.items():
+            if len(token) != 1:
+                continue
+            if ord(token) < 0x10000:
+                self.char_table[ord(token)] = idx
+            else:
+                self.astral_chars[ord(token)] = idx
+
+        self._buffers = {}
+        self._buffer_lock = threading.Lock()  # 缓冲区在推理完成前不能被其他调用覆盖
+
+    def _get_buffer(self, name, batch_size, seq_length):
+        """取出一块可复用的int64缓冲区，整理成连续的 (batch_size, seq_length) 形状"""
+        size = batch_size * seq_length
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.size < size:
+            buffer = np.zeros(max(size, 16 * 128), dtype=np.int64)
+            self._buffers[name] = buffer
+        return buffer[:size].reshape(batch_size, seq_length)
+
+    def _tokenize_batch(self, texts, max_length=128):
+        """
+        手动实现一批文本的分词、ID转换和填充，只填充到这一批中最长的文本
+        返回的数组是复用的缓冲区，需要在 _buffer_lock 内使用
+        """
+        if self.fixed_seq_length:
+            max_length = min(max_length, self.fixed_seq_length)
+
+        # 基础的按字分词，截断后两端添加特殊标记 [CLS] 和 [SEP]
+        texts = [text[:max_length - 2] for text in texts]
+        lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+        batch_size = len(texts)
+        seq_length = self.fixed_seq_length or int(lengths.max()) + 2
+
+        input_ids = self._get_buffer("input_ids", batch_size, seq_length)
+        attention_mask = self._get_buffer("attention_mask", batch_size, seq_length)
+        token_type_ids = self._get_buffer("token_type_ids", batch_size, seq_length)
+        input_ids.fill(self.pad_id)
+        token_type_ids.fill(0)
+        np.less(np.arange(seq_length), (lengths + 2)[:, None], out=attention_mask, casting="unsafe")
+
+        # 整批文本转换成码点，查表得到ID；BMP以外的字符查 astral_chars，不在词表中的视为 [UNK]
+        codepoints = np.frombuffer("".join(texts).encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+        token_ids = self.char_table[np.minimum(codepoints, 0xFFFF)]
+        astral = codepoints > 0xFFFF
+        if astral.any():
+            token_ids[astral] = [self.astral_chars.get(int(cp), self.unk_id) for cp in codepoints[astral]]
+
+        # 计算每个字符在输出中的位置：行首 + 1（跳过[CLS]）+ 在本行中的序号
+        row_starts = np.arange(batch_size) * seq_length
+        starts = np.cumsum(lengths) - lengths
+        positions = np.repeat(row_starts + 1 - starts, lengths) + np.arange(len(codepoints))
+        flat_ids = input_ids.reshape(-1)
+        flat_ids[positions] = token_ids
+        flat_ids[row_starts] = self.cls_id
+        flat_ids[row_starts + lengths + 1] = self.sep_id
+
         return {
-            "input_ids": np.array([input_ids], dtype=np.int64),
-            "attention_mask": np.array([attention_mask], dtype=np.int64),
-            "token_type_ids": np.array([token_type_ids], dtype=np.int64)
+            "input_ids": input_ids,
+            "attention_mask": attention_mask,
+            "token_type_ids": token_type_ids
         }
         
     def _softmax(self, x):
@@ -121,84 +202,94 @@ class EmotionClassifier:
         exp_x = np.exp(x - np.max(x, axis=-1, keepdims=True))
         return exp_x / np.sum(exp_x, axis=-1, keepdims=True)
 
+    @staticmethod
+    def _passthrough(text, **extra):
+        """不经过模型，直接把传入的文本作为情感标签"""
+        return {
+            "label": text,
+            "confidence": 1.0,
+            "top3": [{"label": text, "probability": 1.0}],
+            **extra
+        }
+
     def predict(self, text, confidence_threshold=0.08):
         """预测文本情绪（带置信度阈值过滤）- ONNX版本"""
+        return self.predict_batch([text], confidence_threshold)[0]
+
+    def predict_batch(self, texts, confidence_threshold=0.08):
+        """
+        一次预测多个文本的情绪，所有需要模型的文本合并成一次ONNX推理
+        返回与 texts 顺序一致的结果列表，每个结果的格式与 predict 相同
+        """
         # 如果模型未加载（可能被环境变量禁用），直接返回传入的文本作为情感标签
         if not hasattr(self, 'session') or self.session is None:
-            return {
-                "label": text,
-                "confidence": 1.0,
-                "top3": [{"label": text, "probability": 1.0}],
-                "disabled": True
-            }
-
-        # 如果传入的文本已经是有效的情感标签，直接返回而不进行预测
-        if text in self.label2id and os.environ.get("ENABLE_DIRECT_EMOTION_CLASSIFIER", "false").lower() == "true":
-            logger.debug(f"输入文本 '{text}' 已是有效情感标签，直接返回")
-            return {
-                "label": text,
-                "confidence": 1.0,
-                "top3": [{"label": text, "probability": 1.0}]
-            }
+            return [self._passthrough(text, disabled=True) for text in texts]
+
+        results = [None] * len(texts)
+        pending = []  # 需要经过模型的 (位置, 文本)
+
+        direct = os.environ.get("ENABLE_DIRECT_EMOTION_CLASSIFIER", "false").lower() == "true"
+        for i, text in enumerate(texts):
+            # 如果传入的文本已经是有效的情感标签，直接返回而不进行预测
+            if direct and text in self.label2id:
+                logger.debug(f"输入文本 '{text}' 已是有效情感标签，直接返回")
+                results[i] = self._passthrough(text)
+                continue
+            cached = self.cache.get(text, confidence_threshold)
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending.append((i, text))
+
+        if not pending:
+            return results
 
+        pending_texts = [text for _, text in pending]
         try:
-            # 手动分词和编码
-            inputs = self._tokenize(text, max_length=128)
-            
-            # 准备ONNX模型的输入
-            ort_inputs = {
-                'input_ids': inputs['input_ids'],
-                'attention_mask': inputs['attention_mask'],
-                'token_type_ids': inputs['token_type_ids']
-            }
-            
-            # 执行ONNX推理
-            ort_outputs = self.session.run(None, ort_inputs)
-            logits = ort_outputs[0]
-            
-            # 计算概率
-            probs = self._softmax(logits)[0] # 获取第一个（也是唯一一个）结果的概率分布
-            
-            pred_id = np.argmax(probs)
-            pred_prob = probs[pred_id]
+            # 手动分词和编码，执行一次ONNX推理
+            with self._buffer_lock:
+                ort_inputs = self._tokenize_batch(pending_texts, max_length=128)
+                logits = self.session.run(None, ort_inputs)[0]
+
+            # 计算概率，一次得到整批的预测结果和前三名
+            probs = self._softmax(logits)
+            pred_ids = np.argmax(probs, axis=-1)
+            pred_probs = probs[np.arange(len(pending_texts)), pred_ids]
+            top3_ids = np.argsort(probs, axis=-1)[:, ::-1][:, :3]
+        except Exception as e:
+            logger.error(f"情绪预测错误: {e}")
+            for i, text in pending:
+                results[i] = self._passthrough(text, error=str(e))
+            return results
+
+        for row, (i, text) in enumerate(pending):
+            pred_prob = float(pred_probs[row])
+            top3 = [
+                {
+                    "label": self.id2label.get(str(idx), ""),
+                    "probability": float(probs[row, idx])
+                }
+                for idx in top3_ids[row]
+            ]
 
-            top3 = self._get_top3(probs)
-            
             if pred_prob < confidence_threshold:
                 logger.debug(f"情绪识别置信度低: {text} -> 不确定 ({pred_prob:.2%})")
-                return {
+                results[i] = {
                     "label": "不确定",
-                    "confidence": float(pred_prob),
+                    "confidence": pred_prob,
                     "top3": top3,
                     "warning": f"置信度低于阈值({confidence_threshold:.0%})"
                 }
-            
-            label = self.id2label.get(str(pred_id), "")
-            logger.debug(f"情绪识别: {text} -> {label} ({pred_prob:.2%})")
-            return {
-                "label": label,
-                "confidence": float(pred_prob),
-                "top3": top3
-            }
-        except Exception as e:
-            logger.error(f"情绪预测错误: {e}")
-            return {
-                "label": text,
-                "confidence": 1.0,
-                "top3": [{"label": text, "probability": 1.0}],
-                "error": str(e)
-            }
-
-    def _get_top3(self, probs):
-        """获取概率最高的3个结果 - Numpy版本"""
-        top3_ids = np.argsort(probs)[-3:][::-1] # 获取概率最高的3个索引
-        return [
-            {
-                "label": self.id2label.get(str(idx), ""),
-                "probability": float(probs[idx])
-            }
-            for idx in top3_ids
-        ]
+            else:
+                label = self.id2label.get(str(pred_ids[row]), "")
+                logger.debug(f"情绪识别: {text} -> {label} ({pred_prob:.2%})")
+                results[i] = {
+                    "label": label,
+                    "confidence": pred_prob,
+                    "top3": top3
+                }
+            self.cache.put(text, confidence_threshold, results[i])
+        return results
 
 # 实例化部分保持不变，可以直接使用新的 EmotionClassifier 类
 emotion_classifier = EmotionClassifier()
\ No newline at end of file
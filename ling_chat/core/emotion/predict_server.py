@@ -5,7 +5,7 @@ from typing import List, Optional
 import uvicorn
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from ling_chat.core.emotion.classifier import EmotionClassifier
+from ling_chat.core.emotion.classifier import emotion_classifier
 from ling_chat.utils.function import Function
 
 
@@ -16,7 +16,7 @@ classifier = None  # 初始化分类器
 async def lifespan(app: FastAPI):
     global classifier
     try:
-        classifier = EmotionClassifier.get_instance()
+        classifier = emotion_classifier
     except Exception as e:
         raise Exception(f"Failed to initialize classifier: {str(e)}")
     yield
@@ -35,6 +35,11 @@ class PredictionRequest(BaseModel):
     confidence_threshold: Optional[float] = 0.08
 
 
+class BatchPredictionRequest(BaseModel):
+    texts: List[str]
+    confidence_threshold: Optional[float] = 0.08
+
+
 class EmotionResult(BaseModel):
     label: str
     probability: float
@@ -57,8 +62,17 @@ async def predict_emotion(request: PredictionRequest):
     if classifier is None:
         raise HTTPException(status_code=500, detail="Classifier not initialized")
     try:
-        result = classifier.predict(request.text, request.confidence_threshold)
-        return result
+        return classifier.predict_batch([request.text], request.confidence_threshold)[0]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/predict_batch", response_model=List[PredictionResponse])
+async def predict_emotion_batch(request: BatchPredictionRequest):
+    if classifier is None:
+        raise HTTPException(status_code=500, detail="Classifier not initialized")
+    try:
+        return classifier.predict_batch(request.texts, request.confidence_threshold)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
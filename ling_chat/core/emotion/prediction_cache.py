@@ -0,0 +1,83 @@
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from ling_chat.core.logger import logger
+
+CacheKey = Tuple[str, float]
+
+
+class PredictionCache:
+    """
+    情绪预测结果的LRU缓存（线程安全）
+
+    LLM输出的情绪标签种类很少，同一个 (文本, 置信度阈值) 的预测结果总是一样的，
+    缓存命中时就不需要再跑一遍模型。可以选择把缓存保存到磁盘，下次启动直接加载。
+    """
+    def __init__(self, maxsize: int = 1024, path: Optional[Path] = None, model_id: str = ""):
+        self.maxsize = maxsize
+        self.path = path
+        self.model_id = model_id  # 用于判断磁盘上的缓存是不是同一个模型生成的
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[CacheKey, Dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, text: str, confidence_threshold: float) -> Optional[Dict]:
+        key = (text, confidence_threshold)
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return dict(result)
+
+    def put(self, text: str, confidence_threshold: float, result: Dict) -> None:
+        key = (text, confidence_threshold)
+        with self._lock:
+            self._entries[key] = dict(result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def load(self) -> None:
+        """从磁盘加载缓存，模型不一致或文件损坏时忽略"""
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("model") != self.model_id:
+                logger.info("情绪预测缓存来自其他模型，已忽略")
+                return
+            for text, confidence_threshold, result in data.get("entries", []):
+                self.put(text, confidence_threshold, result)
+            logger.debug(f"已加载 {len(self)} 条情绪预测缓存")
+        except Exception as e:
+            logger.warning(f"加载情绪预测缓存失败: {e}")
+
+    def save(self) -> None:
+        """把缓存保存到磁盘"""
+        if self.path is None:
+            return
+        with self._lock:
+            entries = [[text, threshold, result] for (text, threshold), result in self._entries.items()]
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"model": self.model_id, "entries": entries}, f, ensure_ascii=False)
+            tmp_path.replace(self.path)
+        except Exception as e:
+            logger.warning(f"保存情绪预测缓存失败: {e}")
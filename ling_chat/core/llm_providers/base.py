@@ -1,15 +1,19 @@
+import asyncio
+import os
+import threading
 from abc import ABC, abstractmethod
-from typing import Dict, List, AsyncGenerator
+from typing import Any, AsyncGenerator, Callable, Dict, Iterator, List
 
 class BaseLLMProvider(ABC):
     def __init__(self):
-        pass
-    
+        # 为 true 时所有请求都走线程池，适用于异步客户端在某些代理/网关下表现异常的情况
+        self.thread_offload = os.environ.get("LLM_THREAD_OFFLOAD", "false").lower() == "true"
+
     @abstractmethod
     def initialize_client(self):
         """初始化客户端连接"""
         pass
-    
+
     @abstractmethod
     def generate_response(self, messages: List[Dict]) -> str:
         """生成模型响应"""
@@ -19,3 +23,56 @@ class BaseLLMProvider(ABC):
     async def generate_stream_response(self, messages: List[Dict]) -> AsyncGenerator[str, None]:
         """生成模型流式响应"""
         yield ""  # hack return type for async generator
+
+    async def generate_response_async(self, messages: List[Dict]) -> str:
+        """
+        异步生成模型响应
+        默认实现把同步的 generate_response 放到线程池中执行，避免阻塞事件循环
+        """
+        return await asyncio.to_thread(self.generate_response, messages)
+
+    async def stream_in_thread(self, sync_stream: Callable[[List[Dict]], Iterator[str]],
+                               messages: List[Dict]) -> AsyncGenerator[str, None]:
+        """
+        在后台线程中迭代同步的流式生成器，并把每个chunk转交回事件循环
+        这是异步客户端不可用时的兜底方案，保证慢请求不会卡住整个服务
+
+        :param sync_stream: 同步的流式生成函数
+        :param messages: 消息列表
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue[tuple[str, Any]] = asyncio.Queue()
+        stop_event = threading.Event()
+
+        def _put(item: tuple[str, Any]):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                # 事件循环已经关闭，没有人再需要这些数据了
+                stop_event.set()
+
+        def _worker():
+            try:
+                for chunk in sync_stream(messages):
+                    if stop_event.is_set():
+                        break
+                    _put(("chunk", chunk))
+            except Exception as e:
+                _put(("error", e))
+            else:
+                _put(("done", None))
+
+        worker = threading.Thread(target=_worker, name=f"{type(self).__name__}-stream", daemon=True)
+        worker.start()
+        try:
+            while True:
+                kind, payload = await queue.get()
+                if kind == "chunk":
+                    yield payload
+                elif kind == "error":
+                    raise payload
+                else:
+                    break
+        finally:
+            # 消费方被取消或提前退出时，通知后台线程尽快停止读取
+            stop_event.set()
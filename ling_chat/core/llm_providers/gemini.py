@@ -1,5 +1,5 @@
 import os
-from typing import Dict, List, AsyncGenerator
+from typing import Dict, List, AsyncGenerator, Iterator
 import google.generativeai as genai
 from ling_chat.core.llm_providers.base import BaseLLMProvider
 from ling_chat.core.logger import logger
@@ -11,42 +11,71 @@ class GeminiProvider(BaseLLMProvider):
         self.client = None
         self.model_type = None
         self.initialize_client()
-    
+
     def initialize_client(self):
         """初始化Gemini客户端"""
         api_key = os.environ.get("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
-        
+
         if not api_key:
             raise ValueError("Gemini API key is required! Please set GEMINI_API_KEY environment variable.")
-            
+
         genai.configure(api_key=api_key)
         self.model_type = os.environ.get("GEMINI_MODEL_TYPE", "gemini-pro")
         self.client = genai.GenerativeModel(self.model_type)
-        
+
         logger.info("Gemini provider initialized successfully!")
-    
+
+    @staticmethod
+    def _format_history(messages: List[Dict]) -> List[Dict]:
+        """转换消息格式"""
+        formatted_history = []
+        for msg in messages:
+            role = "user" if msg["role"] in ["user", "human"] else "model"
+            formatted_history.append({
+                "role": role,
+                "parts": [msg["content"]]
+            })
+        return formatted_history
+
     def generate_response(self, messages: List[Dict]) -> str:
         """处理完整对话历史的版本"""
         try:
             logger.debug(f"Sending request with history to Gemini model: {self.model_type}")
-            
-            # 转换消息格式
-            formatted_history = []
-            for msg in messages:
-                role = "user" if msg["role"] in ["user", "human"] else "model"
-                formatted_history.append({
-                    "role": role,
-                    "parts": [msg["content"]]
-                })
-            
+
+            formatted_history = self._format_history(messages)
             chat = self.client.start_chat(history=formatted_history[:-1])
             response = chat.send_message(messages[-1]["content"])
             return response.text
-            
+
+        except Exception as e:
+            logger.error(f"Gemini request with history failed: {str(e)}")
+            raise
+
+    async def generate_response_async(self, messages: List[Dict]) -> str:
+        """异步生成Gemini响应"""
+        if self.thread_offload:
+            return await super().generate_response_async(messages)
+
+        try:
+            logger.debug(f"Sending async request with history to Gemini model: {self.model_type}")
+
+            formatted_history = self._format_history(messages)
+            chat = self.client.start_chat(history=formatted_history[:-1])
+            response = await chat.send_message_async(messages[-1]["content"])
+            return response.text
+
         except Exception as e:
             logger.error(f"Gemini request with history failed: {str(e)}")
             raise
 
+    def _sync_stream(self, messages: List[Dict]) -> Iterator[str]:
+        """同步流式请求，仅在线程兜底模式下使用"""
+        formatted_history = self._format_history(messages)
+        chat = self.client.start_chat(history=formatted_history[:-1])
+        response = chat.send_message(messages[-1]["content"], stream=True)
+        for chunk in response:
+            yield chunk.text
+
     async def generate_stream_response(self, messages: List[Dict]) -> AsyncGenerator[str, None]:
         """生成Gemini流式响应
         :param messages: 消息列表
@@ -54,27 +83,23 @@ class GeminiProvider(BaseLLMProvider):
         """
         try:
             logger.debug(f"向Gemini模型发送流式请求: {self.model_type}")
-
-            # 转换消息格式
-            formatted_history = []
-            for msg in messages:
-                role = "user" if msg["role"] in ["user", "human"] else "model"
-                formatted_history.append({
-                    "role": role,
-                    "parts": [msg["content"]]
-                })
+            if self.thread_offload:
+                async for content in self.stream_in_thread(self._sync_stream, messages):
+                    yield content
+                return
 
             # 初始化聊天会话
+            formatted_history = self._format_history(messages)
             chat = self.client.start_chat(history=formatted_history[:-1])
 
             # 发送流式请求
-            response = chat.send_message(
+            response = await chat.send_message_async(
                 messages[-1]["content"],
                 stream=True
             )
 
             # 逐个返回响应块
-            for chunk in response:
+            async for chunk in response:
                 yield chunk.text
 
         except Exception as genai_error:
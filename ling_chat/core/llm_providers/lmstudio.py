@@ -1,6 +1,6 @@
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from .base import BaseLLMProvider
-from typing import Dict, List, AsyncGenerator
+from typing import Dict, List, AsyncGenerator, Iterator
 from ling_chat.core.logger import logger
 import os
 
@@ -8,6 +8,7 @@ class LMStudioProvider(BaseLLMProvider):
     def __init__(self):
         super().__init__()
         self.client = None
+        self.async_client = None
         self.model_type = os.environ.get("LMSTUDIO_MODEL_TYPE", "")
         self.base_url = os.environ.get("LMSTUDIO_BASE_URL", "http://localhost:1234/v1")
         self.initialize_client()
@@ -19,6 +20,10 @@ class LMStudioProvider(BaseLLMProvider):
                 base_url=self.base_url,
                 api_key="lm-studio"  # LM Studio通常不需要真实API key
             )
+            self.async_client = AsyncOpenAI(
+                base_url=self.base_url,
+                api_key="lm-studio"
+            )
             logger.info("LM Studio client initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize LM Studio client: {str(e)}")
@@ -42,21 +47,51 @@ class LMStudioProvider(BaseLLMProvider):
                 **self._create_api_request(messages, stream=False)
             )
             return response.choices[0].message.content
-            
+
         except Exception as e:
             logger.error(f"LM Studio API request failed: {str(e)}")
             raise
 
+    async def generate_response_async(self, messages: List[Dict]) -> str:
+        """异步生成LM Studio模型响应"""
+        if self.async_client is None or self.thread_offload:
+            return await super().generate_response_async(messages)
+
+        try:
+            logger.debug("Sending async request to LM Studio model")
+            response = await self.async_client.chat.completions.create(
+                **self._create_api_request(messages, stream=False)
+            )
+            return response.choices[0].message.content
+
+        except Exception as e:
+            logger.error(f"LM Studio API request failed: {str(e)}")
+            raise
+
+    def _sync_stream(self, messages: List[Dict]) -> Iterator[str]:
+        """同步流式请求，仅在线程兜底模式下使用"""
+        stream = self.client.chat.completions.create(
+            **self._create_api_request(messages, stream=True)
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content is not None:
+                yield chunk.choices[0].delta.content
+
     async def generate_stream_response(self, messages: List[Dict]) -> AsyncGenerator[str, None]:
         """生成LM Studio流式响应"""
         try:
             logger.debug("Sending streaming request to LM Studio model")
-            stream = self.client.chat.completions.create(
+            if self.async_client is None or self.thread_offload:
+                async for content in self.stream_in_thread(self._sync_stream, messages):
+                    yield content
+                return
+
+            stream = await self.async_client.chat.completions.create(
                 **self._create_api_request(messages, stream=True)
             )
 
-            for chunk in stream:
-                if chunk.choices[0].delta.content is not None:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content is not None:
                     yield chunk.choices[0].delta.content
 
         except Exception as e:
@@ -1,8 +1,8 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
 from ling_chat.core.llm_providers.provider_factory import LLMProviderFactory
 from ling_chat.core.llm_providers.base import BaseLLMProvider
+from ling_chat.core.messaging.backpressure import BackpressureQueue
 from ling_chat.core.logger import logger
-import asyncio
 import os
 
 class LLMManager:
@@ -49,7 +49,29 @@ class LLMManager:
     def process_message(self, messages: List[Dict]):
         return self.provider.generate_response(messages)
 
-    async def process_message_stream(self, messages: List[Dict]):
+    async def process_message_async(self, messages: List[Dict]) -> str:
+        """非流式请求的异步版本，不会阻塞事件循环"""
+        return await self.provider.generate_response_async(messages)
+
+    async def process_message_stream(self, messages: List[Dict],
+                                     backpressure: Optional[BackpressureQueue] = None):
+        """
+        流式生成模型回复
+
+        :param messages: 消息列表
+        :param backpressure: 可选，下游的句子队列。只有当下游消费者饱和时才暂停读取模型输出
+        """
         async for chunk in self.provider.generate_stream_response(messages):
             yield chunk
-            await asyncio.sleep(0.05)  # 关键：在每个chunk后让出控制权
+            if backpressure is not None and backpressure.is_saturated():
+                await backpressure.wait_until_writable()
+
+
+
+# 同一种用途的LLM客户端在所有用户会话之间共享，避免每个会话都建立一套连接
+_shared_managers: Dict[str, LLMManager] = {}
+
+def get_shared_llm_manager(llm_job: str = "main") -> LLMManager:
+    if llm_job not in _shared_managers:
+        _shared_managers[llm_job] = LLMManager(llm_job=llm_job)
+    return _shared_managers[llm_job]
@@ -1,6 +1,9 @@
+import os
+import json
+import aiohttp
 import requests
 from ling_chat.core.llm_providers.base import BaseLLMProvider
-from typing import Dict, List, AsyncGenerator
+from typing import Dict, List, AsyncGenerator, Iterator
 from ling_chat.core.logger import logger
 
 class OllamaProvider(BaseLLMProvider):
@@ -8,38 +11,94 @@ class OllamaProvider(BaseLLMProvider):
         super().__init__()
         self.base_url = os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
         self.model_type = os.environ.get("OLLAMA_MODEL", "llama3")
-    
+
     def initialize_client(self):
         pass
-    
+
+    def _create_payload(self, messages: List[Dict], stream: bool) -> Dict:
+        return {
+            "model": self.model_type,
+            "messages": messages,
+            "stream": stream
+        }
+
+    @staticmethod
+    def _parse_stream_line(line: bytes) -> str:
+        """解析Ollama流式返回的一行JSON，返回其中的内容"""
+        decoded_chunk = line.decode('utf-8').strip()
+        if not decoded_chunk:  # 确保不是空行
+            return ""
+        try:
+            chunk_json = json.loads(decoded_chunk)
+            return chunk_json.get("message", {}).get("content", "")
+        except json.JSONDecodeError:
+            logger.warning(f"无法解析的响应块: {decoded_chunk}")
+            return ""
+
     def generate_response(self, messages: List[Dict]) -> str:
         """生成Ollama模型响应"""
         try:
             logger.debug(f"Sending request to Ollama API: {self.base_url}/api/chat")
-            
-            payload = {
-                "model": self.model_type,
-                "messages": messages,
-                "stream": False
-            }
-            
+
             response = requests.post(
                 f"{self.base_url}/api/chat",
-                json=payload
+                json=self._create_payload(messages, stream=False)
             )
-            
+
             if response.status_code != 200:
                 error_msg = f"Ollama API returned error: {response.status_code} - {response.text}"
                 logger.error(error_msg)
                 raise Exception(error_msg)
-                
+
             response_json = response.json()
             return response_json.get("message", {}).get("content", "")
-            
+
         except Exception as e:
             logger.error(f"Ollama API call failed: {str(e)}")
             raise
 
+    async def generate_response_async(self, messages: List[Dict]) -> str:
+        """异步生成Ollama模型响应"""
+        if self.thread_offload:
+            return await super().generate_response_async(messages)
+
+        try:
+            logger.debug(f"Sending async request to Ollama API: {self.base_url}/api/chat")
+            async with aiohttp.ClientSession() as session:
+                async with session.post(
+                        f"{self.base_url}/api/chat",
+                        json=self._create_payload(messages, stream=False)
+                ) as response:
+                    if response.status != 200:
+                        error_msg = f"Ollama API returned error: {response.status} - {await response.text()}"
+                        logger.error(error_msg)
+                        raise Exception(error_msg)
+
+                    response_json = await response.json(content_type=None)
+                    return response_json.get("message", {}).get("content", "")
+
+        except Exception as e:
+            logger.error(f"Ollama API call failed: {str(e)}")
+            raise
+
+    def _sync_stream(self, messages: List[Dict]) -> Iterator[str]:
+        """同步流式请求，仅在线程兜底模式下使用"""
+        with requests.post(
+                f"{self.base_url}/api/chat",
+                json=self._create_payload(messages, stream=True),
+                stream=True
+        ) as response:
+            if response.status_code != 200:
+                error_msg = f"Ollama 流式返回了错误: {response.status_code} - {response.text}"
+                logger.error(error_msg)
+                raise Exception(error_msg)
+
+            for chunk in response.iter_lines():
+                if chunk:
+                    content = self._parse_stream_line(chunk)
+                    if content:
+                        yield content
+
     async def generate_stream_response(self, messages: List[Dict]) -> AsyncGenerator[str, None]:
         """生成Ollama流式响应
         :param messages: 消息列表
@@ -47,36 +106,27 @@ class OllamaProvider(BaseLLMProvider):
         """
         try:
             logger.debug(f"正在给 Ollama 发送流式请求: {self.base_url}/api/chat")
+            if self.thread_offload:
+                async for content in self.stream_in_thread(self._sync_stream, messages):
+                    yield content
+                return
+
+            async with aiohttp.ClientSession() as session:
+                async with session.post(
+                        f"{self.base_url}/api/chat",
+                        json=self._create_payload(messages, stream=True)
+                ) as response:
+                    if response.status != 200:
+                        error_msg = f"Ollama 流式返回了错误: {response.status} - {await response.text()}"
+                        logger.error(error_msg)
+                        raise Exception(error_msg)
 
-            payload = {
-                "model": self.model_type,
-                "messages": messages,
-                "stream": True
-            }
-
-            with requests.post(
-                    f"{self.base_url}/api/chat",
-                    json=payload,
-                    stream=True
-            ) as response:
-                if response.status_code != 200:
-                    error_msg = f"Ollama 流式返回了错误: {response.status_code} - {response.text}"
-                    logger.error(error_msg)
-                    raise Exception(error_msg)
-
-                for chunk in response.iter_lines():
-                    if chunk:
-                        decoded_chunk = chunk.decode('utf-8')
-                        if decoded_chunk.strip():  # 确保不是空行
-                            try:
-                                chunk_json = json.loads(decoded_chunk)
-                                content = chunk_json.get("message", {}).get("content", "")
-                                if content:
-                                    yield content
-                            except json.JSONDecodeError:
-                                logger.warning(f"无法解析的响应块: {decoded_chunk}")
-                                continue
+                    # Ollama 以换行分隔的JSON返回每个片段
+                    async for line in response.content:
+                        content = self._parse_stream_line(line)
+                        if content:
+                            yield content
 
         except Exception as e:
             logger.error(f"Ollama 流式调用失败: {str(e)}")
-            raise
\ No newline at end of file
+            raise
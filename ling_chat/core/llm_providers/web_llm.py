@@ -1,6 +1,6 @@
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from ling_chat.core.llm_providers.base import BaseLLMProvider
-from typing import Dict, List, AsyncGenerator
+from typing import Dict, List, AsyncGenerator, Iterator
 from ling_chat.core.logger import logger
 
 class WebLLMProvider(BaseLLMProvider):
@@ -11,16 +11,18 @@ class WebLLMProvider(BaseLLMProvider):
             logger.warning(error_message)
             # 不再抛出异常，而是设置client为None表示不可用
             self.client = None
+            self.async_client = None
             return
         self.api_key = api_key
         self.base_url = base_url
         self.client = OpenAI(api_key=api_key, base_url=base_url)
+        self.async_client = AsyncOpenAI(api_key=api_key, base_url=base_url)
         self.model_type = model_type
         logger.info("通用网络大模型初始化完毕！" )
-    
+
     def initialize_client(self):
         return super().initialize_client()
-    
+
     def generate_response(self, messages: List[Dict]) -> str:
         """生成模型响应"""
         if self.client is None:
@@ -36,11 +38,40 @@ class WebLLMProvider(BaseLLMProvider):
                 stream=False
             )
             return response.choices[0].message.content
-            
+
         except Exception as e:
             logger.error(f"通用网络大模型请求失败: {str(e)}")
             raise
 
+    async def generate_response_async(self, messages: List[Dict]) -> str:
+        """异步生成模型响应"""
+        if self.async_client is None or self.thread_offload:
+            return await super().generate_response_async(messages)
+
+        try:
+            logger.debug(f"正在对通用网络大模型发送异步请求: {self.model_type}")
+            response = await self.async_client.chat.completions.create(
+                model=self.model_type,
+                messages=messages,
+                stream=False
+            )
+            return response.choices[0].message.content
+
+        except Exception as e:
+            logger.error(f"通用网络大模型请求失败: {str(e)}")
+            raise
+
+    def _sync_stream(self, messages: List[Dict]) -> Iterator[str]:
+        """同步流式请求，仅在线程兜底模式下使用"""
+        stream = self.client.chat.completions.create(
+            model=self.model_type,
+            messages=messages,
+            stream=True
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content is not None:
+                yield chunk.choices[0].delta.content
+
     async def generate_stream_response(self, messages: List[Dict]) -> AsyncGenerator[str, None]:
         """
         生成流式响应
@@ -55,14 +86,19 @@ class WebLLMProvider(BaseLLMProvider):
 
         try:
             logger.debug(f"正在对通用网络大模型发送流式请求: {self.model_type}")
-            stream = self.client.chat.completions.create(
+            if self.async_client is None or self.thread_offload:
+                async for content in self.stream_in_thread(self._sync_stream, messages):
+                    yield content
+                return
+
+            stream = await self.async_client.chat.completions.create(
                 model=self.model_type,
                 messages=messages,
                 stream=True
             )
 
-            for chunk in stream:
-                if chunk.choices[0].delta.content is not None:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content is not None:
                     yield chunk.choices[0].delta.content
 
         except Exception as e:
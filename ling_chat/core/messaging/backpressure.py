@@ -0,0 +1,37 @@
+import asyncio
+
+
+class BackpressureQueue(asyncio.Queue):
+    """
+    带背压信号的有界队列
+
+    生产者可以在队列写满时调用 wait_until_writable 挂起，
+    直到消费者把队列消化到低水位线以下才会被唤醒，而不是固定地sleep。
+    """
+    def __init__(self, maxsize: int = 0, low_watermark: int | None = None):
+        super().__init__(maxsize=maxsize)
+        # 低水位线：队列长度降到此值（含）以下时唤醒等待的生产者，避免在满/不满之间来回抖动
+        self.low_watermark = low_watermark if low_watermark is not None else maxsize // 2
+        self._writable = asyncio.Event()
+        self._writable.set()
+
+    def _get(self):
+        item = super()._get()
+        if self.qsize() <= self.low_watermark:
+            self._writable.set()
+        return item
+
+    def _put(self, item):
+        super()._put(item)
+        if self.full():
+            self._writable.clear()
+
+    def is_saturated(self) -> bool:
+        """消费者是否已经跟不上生产速度"""
+        return self.full()
+
+    async def wait_until_writable(self) -> None:
+        """队列已满时挂起，直到消费者将队列消化到低水位线"""
+        if self.qsize() <= self.low_watermark:
+            return
+        await self._writable.wait()
@@ -1,34 +1,235 @@
 import asyncio
-from typing import Dict, AsyncGenerator
+import os
+from collections import OrderedDict, deque
+from enum import Enum
+from typing import Any, Callable, Deque, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+from pydantic import BaseModel
+
+from ling_chat.core.logger import logger
+
+
+class OverflowPolicy(str, Enum):
+    """订阅者队列写满时的处理方式"""
+    BLOCK = "block"              # 发布者等待订阅者消费，不丢消息
+    DROP_OLDEST = "drop_oldest"  # 丢弃最早的一条，保留最新消息
+    DROP_NEWEST = "drop_newest"  # 丢弃正在发布的这条
+    COALESCE = "coalesce"        # 用新消息替换队列中同 key 的旧消息，找不到时丢弃最早的一条
+
+
+class Subscription:
+    """
+    一个订阅者的有界消息队列
+
+    通过 MessageBroker.subscribe 创建，可以订阅多个主题。
+    使用 `with` 或者在结束时调用 close() 取消订阅，取消后主题不再持有它。
+    """
+    def __init__(self,
+                 broker: "MessageBroker",
+                 topics: Tuple[str, ...],
+                 maxsize: int,
+                 policy: OverflowPolicy,
+                 coalesce_key: Optional[Callable[[Any], Hashable]] = None):
+        self.broker = broker
+        self.topics = topics
+        self.maxsize = maxsize
+        self.policy = policy
+        self.coalesce_key = coalesce_key
+        self.dropped = 0  # 因队列写满而被丢弃或合并的消息数
+        self.closed = False
+        self._messages: Deque[Any] = deque()
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+
+    def full(self) -> bool:
+        return len(self._messages) >= self.maxsize
+
+    def _append(self, message: Any) -> None:
+        self._messages.append(message)
+        self._not_empty.set()
+        if self.full():
+            self._not_full.clear()
+
+    def _make_room(self, message: Any) -> bool:
+        """队列已满时按策略腾出位置，返回新消息是否还需要入队"""
+        self.dropped += 1
+        if self.policy == OverflowPolicy.DROP_NEWEST:
+            return False
+        if self.policy == OverflowPolicy.COALESCE and self.coalesce_key is not None:
+            key = self.coalesce_key(message)
+            for i, pending in enumerate(self._messages):
+                if self.coalesce_key(pending) == key:
+                    self._messages[i] = message
+                    return False
+        self._messages.popleft()
+        return True
+
+    async def put(self, message: Any) -> None:
+        if self.closed:
+            return
+        if self.full():
+            if self.policy == OverflowPolicy.BLOCK:
+                while self.full() and not self.closed:
+                    await self._not_full.wait()
+                if self.closed:
+                    return
+            elif not self._make_room(message):
+                return
+        self._append(message)
+
+    async def get(self) -> Any:
+        """取出下一条消息，订阅已关闭且队列为空时抛出 StopAsyncIteration"""
+        while not self._messages:
+            if self.closed:
+                raise StopAsyncIteration
+            self._not_empty.clear()
+            await self._not_empty.wait()
+
+        message = self._messages.popleft()
+        if not self._messages:
+            self._not_empty.clear()
+        self._not_full.set()
+        return message
+
+    def qsize(self) -> int:
+        return len(self._messages)
+
+    def close(self) -> None:
+        """取消订阅，唤醒正在等待的发布者和消费者"""
+        if self.closed:
+            return
+        self.closed = True
+        self.broker.unsubscribe(self)
+        self._not_empty.set()
+        self._not_full.set()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Any:
+        return await self.get()
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
 
 class MessageBroker:
-    def __init__(self):
-        self.queues: Dict[str, asyncio.Queue] = {}
-
-    async def publish(self, client_id: str, message: dict):
-        if client_id not in self.queues:
-            self.queues[client_id] = asyncio.Queue()
-        await self.queues[client_id].put(message)
-
-    async def subscribe(self, client_id: str) -> AsyncGenerator[dict, None]:
-        if client_id not in self.queues:
-            self.queues[client_id] = asyncio.Queue()
-        while True:
-            yield await self.queues[client_id].get()
-    
+    """
+    推送式消息代理
+
+    每个订阅者拥有自己的有界队列，发布时直接推送给主题下的所有订阅者，
+    最后一个订阅者离开时主题即被删除。没有订阅者的输出主题不会保存任何消息；
+    ai_ 开头的输入主题的消费者可能稍后才订阅，最多暂存 pending_size 条消息，
+    交给第一个订阅者。
+    """
+    PENDING_PREFIX = "ai_"
+    MAX_PENDING_TOPICS = 64  # 最多为多少个没有订阅者的输入主题暂存消息
+
+    def __init__(self, default_maxsize: Optional[int] = None, pending_size: Optional[int] = None):
+        self.default_maxsize = default_maxsize or int(os.environ.get("BROKER_QUEUE_SIZE", 256))
+        self.pending_size = pending_size if pending_size is not None \
+            else int(os.environ.get("BROKER_PENDING_SIZE", 16))
+        self.topics: Dict[str, Set[Subscription]] = {}
+        self.pending: "OrderedDict[str, Deque[Any]]" = OrderedDict()  # 输入主题 -> 等待订阅者的消息
+
+    def subscribe(self,
+                  *topics: str,
+                  maxsize: Optional[int] = None,
+                  policy: OverflowPolicy = OverflowPolicy.BLOCK,
+                  coalesce_key: Optional[Callable[[Any], Hashable]] = None) -> Subscription:
+        """订阅一个或多个主题，返回的订阅对象既是异步迭代器也是上下文管理器"""
+        subscription = Subscription(self, topics, maxsize or self.default_maxsize, policy, coalesce_key)
+        for topic in topics:
+            self.topics.setdefault(topic, set()).add(subscription)
+            for message in self.pending.pop(topic, ()):
+                subscription._append(message)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        for topic in subscription.topics:
+            subscribers = self.topics.get(topic)
+            if subscribers is None:
+                continue
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self.topics[topic]
+        if not subscription.closed:
+            subscription.close()
+
+    def has_subscribers(self, topic: str) -> bool:
+        return topic in self.topics
+
+    async def publish(self, topic: str, message: Any) -> int:
+        """向主题的所有订阅者推送消息，返回送达的订阅者数量"""
+        return await self.publish_many((topic,), message)
+
+    async def publish_many(self, topics: Iterable[str], message: Any) -> int:
+        """
+        向多个主题的订阅者推送同一条消息，每个订阅者只收到一次。
+        pydantic 模型只序列化一次成 JSON 文本，所有订阅者共享同一个字符串。
+        """
+        # 先收集订阅者再推送，推送过程中可能有订阅者取消订阅
+        targets: Dict[Subscription, None] = {}
+        for topic in topics:
+            subscribers = self.topics.get(topic)
+            if not subscribers:
+                if topic.startswith(self.PENDING_PREFIX):
+                    self._hold(topic, message)
+                else:
+                    logger.debug(f"主题 {topic} 没有订阅者，消息已丢弃")
+                continue
+            targets.update(dict.fromkeys(subscribers))
+        if not targets:
+            return 0
+
+        if isinstance(message, BaseModel):
+            message = message.model_dump_json()
+
+        if len(targets) == 1:
+            await next(iter(targets)).put(message)
+        else:
+            await asyncio.gather(*(subscription.put(message) for subscription in targets))
+        return len(targets)
+
+    def _hold(self, topic: str, message: Any) -> None:
+        """暂存发往还没有订阅者的输入主题的消息，超出上限时丢弃最早的并警告"""
+        if self.pending_size <= 0:
+            logger.warning(f"主题 {topic} 没有订阅者，消息已丢弃")
+            return
+        if isinstance(message, BaseModel):
+            message = message.model_dump_json()
+        backlog = self.pending.get(topic)
+        if backlog is None:
+            if len(self.pending) >= self.MAX_PENDING_TOPICS:
+                dropped, messages = self.pending.popitem(last=False)
+                logger.warning(f"等待订阅的主题过多，丢弃主题 {dropped} 的 {len(messages)} 条消息")
+            backlog = self.pending[topic] = deque(maxlen=self.pending_size)
+        elif len(backlog) == backlog.maxlen:
+            logger.warning(f"主题 {topic} 一直没有订阅者，丢弃最早的一条消息")
+        backlog.append(message)
+
+    def discard_pending(self, *topics: str) -> None:
+        """客户端断开后丢弃还没送达的输入消息"""
+        for topic in topics:
+            self.pending.pop(topic, None)
+
     async def enqueue_ai_message(self, client_id: str, message: str):
         """专门用于将消息加入到AI处理队列"""
         await self.publish(f"ai_input_{client_id}", {
-            "type": "user_message", 
+            "type": "user_message",
             "content": message
         })
-    
+
     async def enqueue_ai_script_message(self, client_id: str, message: str):
         """专门用于将消息加入到AI剧本处理队列"""
         await self.publish(f"ai_script_input_{client_id}", {
-            "type": "user_message", 
+            "type": "user_message",
             "content": message
         })
 
 # 单例模式
-message_broker = MessageBroker()
\ No newline at end of file
+message_broker = MessageBroker()
@@ -12,7 +12,8 @@ class ResponseFactory:
             originalTag=seg['original_tag'],
             message=seg['following_text'],
             motionText=seg['motion_text'],
-            audioFile=os.path.basename(seg['voice_file']) if os.path.exists(seg['voice_file']) else None,
+            audioFile=os.path.basename(seg['voice_file'])
+                if seg.get('has_voice') or os.path.exists(seg['voice_file']) else None,
             originalMessage=user_message,
             isFinal=is_final
         )
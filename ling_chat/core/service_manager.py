@@ -1,30 +1,88 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
 from ling_chat.core.ai_service.core import AIService
+from ling_chat.core.logger import logger
 from ling_chat.database.user_model import UserModel
 from ling_chat.database.character_model import CharacterModel
 from ling_chat.utils.runtime_path import user_data_path
 from ling_chat.utils.function import Function
 from pathlib import Path
 
+DEFAULT_USER_ID = "1"
+
 class ServiceManager:
+    """
+    按用户管理 AIService 会话
+
+    每个用户第一次使用时才创建自己的 AIService，记忆和角色互不干扰；
+    LLM客户端和情绪分类模型等重量级对象在会话之间共享。
+    没有客户端连接的会话在空闲超时或超出会话上限时按最近最少使用的顺序被回收。
+    """
     _instance = None
-    
+
     def __init__(self):
-        self.ai_service = None
-
-        self.user_services:dict[str, AIService] = {}  # user_id -> AIService
-        self.client_mapping:dict[str, str] = {}  # client_id -> user_id
-    
-    def init_ai_service(self) -> AIService:
-        self.ai_service = AIService(self.get_user_settings("1"))
-        return self.ai_service
-    
+        self.user_services: OrderedDict[str, AIService] = OrderedDict()  # user_id -> AIService，按最近使用排序
+        self.client_mapping: dict[str, str] = {}  # client_id -> user_id
+        self.last_active: dict[str, float] = {}  # user_id -> 最后一次使用的时间
+
+        self.max_sessions = int(os.environ.get("AI_SESSION_MAX_USERS", 32))
+        self.idle_ttl = float(os.environ.get("AI_SESSION_IDLE_TTL", 1800))
+        self._closing_tasks: set[asyncio.Task] = set()
+
+    def init_ai_service(self, user_id=DEFAULT_USER_ID) -> AIService:
+        return self.get_or_create_service(user_id)
+
+    def get_service(self, user_id) -> Optional[AIService]:
+        """获取已经存在的会话，不会创建新会话"""
+        user_id = str(user_id)
+        service = self.user_services.get(user_id)
+        if service is not None:
+            self._touch(user_id)
+        return service
+
+    def get_or_create_service(self, user_id) -> AIService:
+        """获取用户的会话，不存在时创建"""
+        user_id = str(user_id)
+        service = self.get_service(user_id)
+        if service is None:
+            logger.info(f"为用户 {user_id} 创建AI会话")
+            service = AIService(self.get_user_settings(user_id), user_id=user_id)
+            self.user_services[user_id] = service
+            self._touch(user_id)
+            self._evict_sessions(keep=user_id)
+        return service
+
+    def get_service_by_client(self, client_id: str) -> Optional[AIService]:
+        user_id = self.client_mapping.get(client_id)
+        if user_id is None:
+            return None
+        return self.get_service(user_id)
+
+    def resolve_service(self, user_id=None, client_id: Optional[str] = None) -> Optional[AIService]:
+        """
+        找到请求所属用户的会话
+
+        优先按 client_id 找（和聊天的 WebSocket 一致），否则按 user_id 获取或创建；
+        两者都没有时返回 None，不会退回到默认用户的会话。
+        """
+        if client_id:
+            service = self.get_service_by_client(client_id)
+            if service is not None:
+                return service
+        if user_id is not None and str(user_id):
+            return self.get_or_create_service(user_id)
+        return None
+
     def get_user_settings(self, user_id):
-        user_id = "1" # TODO: 多用户之前的临时做法
         user_info = UserModel.get_user_by_id(user_id=user_id)
-        if user_info is None:
+        if user_info is None and str(user_id) == DEFAULT_USER_ID:
             UserModel.create_user(username="admin", password="114514")
             user_info = UserModel.get_user_by_id(user_id=user_id)
-        last_character_id = user_info.get("last_chat_character")
+        last_character_id = user_info.get("last_chat_character") if user_info else None
         character = CharacterModel.get_character_by_id(last_character_id)
         if character is not None and "resource_path" in character:
             resource_path = Path(character["resource_path"])
@@ -34,15 +92,63 @@ class ServiceManager:
         settings = Function.parse_enhanced_txt(str(resource_path / "settings.txt"))
         settings["character_id"] = last_character_id
         return settings
-    
-    async def add_client(self, client_id):
-        if self.ai_service is not None:
-            await self.ai_service.add_client(client_id)
-            
+
+    async def add_client(self, client_id, user_id=DEFAULT_USER_ID):
+        user_id = str(user_id)
+        previous_user = self.client_mapping.get(client_id)
+        if previous_user is not None and previous_user != user_id:
+            await self.remove_client(client_id)
+
+        service = self.get_or_create_service(user_id)
+        self.client_mapping[client_id] = user_id
+        await service.add_client(client_id)
+
+    async def remove_client(self, client_id):
+        user_id = self.client_mapping.pop(client_id, None)
+        if user_id is None:
+            return
+        service = self.user_services.get(user_id)
+        if service is not None:
+            await service.remove_client(client_id)
+            self._touch(user_id)
+        self._evict_sessions()
+
+    def _touch(self, user_id: str) -> None:
+        self.user_services.move_to_end(user_id)
+        self.last_active[user_id] = time.monotonic()
+
+    def _evict_sessions(self, keep: Optional[str] = None) -> None:
+        """回收空闲超时的会话，以及超出上限时最近最少使用的会话；有客户端连接的会话不会被回收"""
+        now = time.monotonic()
+        overflow = len(self.user_services) - self.max_sessions
+        for user_id, service in list(self.user_services.items()):
+            if user_id == keep or service.config.clients:
+                continue
+            idle = now - self.last_active.get(user_id, now)
+            if overflow > 0 or idle >= self.idle_ttl:
+                overflow -= 1
+                self._close_session(user_id)
+
+    def _close_session(self, user_id: str) -> None:
+        service = self.user_services.pop(user_id)
+        self.last_active.pop(user_id, None)
+        logger.info(f"回收用户 {user_id} 的AI会话")
+        task = asyncio.create_task(service.shutdown())
+        self._closing_tasks.add(task)
+        task.add_done_callback(self._closing_tasks.discard)
+
+    async def shutdown(self):
+        """关闭所有会话"""
+        for user_id in list(self.user_services):
+            self._close_session(user_id)
+        if self._closing_tasks:
+            await asyncio.gather(*self._closing_tasks, return_exceptions=True)
+        self.client_mapping.clear()
+
     @classmethod
     def get_instance(cls):
         if cls._instance is None:
             cls._instance = cls()
         return cls._instance
 
-service_manager = ServiceManager.get_instance()
\ No newline at end of file
+service_manager = ServiceManager.get_instance()
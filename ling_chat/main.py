@@ -71,11 +71,28 @@ def handle_run(run_modules_list: Collection[str]):
             logger.error(f"未知的运行模块: {module}")
 
 
+def handle_pretranslate(scripts_dir: str | None):
+    """预翻译剧本中的所有台词，播放剧本时不需要再实时翻译"""
+    import asyncio
+    from pathlib import Path
+    from ling_chat.core.ai_service.translation_memory import collect_script_texts, close_translation_memory
+    from ling_chat.core.ai_service.translator import Translator
+
+    scripts_path = Path(scripts_dir) if scripts_dir else user_data_path / "game_data" / "scripts"
+    texts = collect_script_texts(scripts_path)
+    logger.info(f"在 {scripts_path} 中找到 {len(texts)} 句台词")
+    translated = asyncio.run(Translator(voice_maker=None).pretranslate(texts))
+    close_translation_memory()
+    logger.info(f"预翻译完成，新翻译 {translated} 句")
+
+
 def run_cli_command(args):
     """运行CLI命令，不启动主程序"""
     if args.command == "install":
         handle_install(args.modules, use_mirror=args.mirror)
         logger.info("安装完成")
+    elif args.command == "pretranslate":
+        handle_pretranslate(args.scripts_dir)
     else:
         logger.error(f"未知的CLI命令: {args.command}")
 
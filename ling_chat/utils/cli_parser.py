@@ -18,6 +18,14 @@ def get_parser():
         help="Use mirror site for downloading models (especially for RAG model)"
     )
 
+    # pretranslate 子命令
+    pretranslate_parser = subparsers.add_parser("pretranslate", help="把剧本台词预先翻译并存入翻译记忆")
+    pretranslate_parser.add_argument(
+        "scripts_dir",
+        nargs="?",
+        help="剧本目录，默认为用户数据目录下的 game_data/scripts"
+    )
+
     # run 主程序启动选项
     parser.add_argument(
         "--run",
@@ -413,8 +413,12 @@ class Function:
         """
         temp_dir = Path(os.environ.get("TEMP_VOICE_DIR", temp_path / "data/voice"))
         self.format = os.environ.get("VOICE_FORMAT", "wav")
-        
-        for file in temp_dir.glob(f"*.{self.format}"):
+        # 开启语音压缩时临时目录中是压缩后的文件
+        from ling_chat.core.TTS.audio_encoder import CODECS
+        codec = CODECS.get(os.environ.get("VOICE_ENCODE", "").strip().lower())
+        formats = {self.format} | ({codec[0]} if codec else set())
+
+        for file in (file for fmt in formats for file in temp_dir.glob(f"*.{fmt}")):
             try:
                 file.unlink()
             except Exception as e:
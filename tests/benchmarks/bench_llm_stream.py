@@ -0,0 +1,126 @@
+"""
+LLM流式管道的端到端延迟基准测试
+
+用一个会吐出 1000 个chunk的模拟提供商驱动完整的 MessageGenerator 管道
+（生产者 -> 消费者 -> 发布者），分别统计首句延迟和总耗时。
+
+运行方式：
+    python -m tests.benchmarks.bench_llm_stream
+    python -m tests.benchmarks.bench_llm_stream --legacy   # 同时跑旧的每chunk固定sleep 50ms的版本（约需50秒）
+"""
+import argparse
+import asyncio
+import os
+import time
+from typing import Dict, List
+
+os.environ.setdefault("ENABLE_EMOTION_CLASSIFIER", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from ling_chat.core.ai_service.config import AIServiceConfig
+from ling_chat.core.ai_service.message_processor import MessageProcessor
+from ling_chat.core.ai_service.message_system.message_generator import MessageGenerator
+from ling_chat.core.ai_service.voice_maker import VoiceMaker
+from ling_chat.core.llm_providers.base import BaseLLMProvider
+from ling_chat.core.llm_providers.manager import LLMManager
+
+
+CHUNK_COUNT = 1000
+SENTENCE_CHARS = 200     # 每个【】句子的字数
+SENTENCE_COUNT = 5       # 回复的句子数
+TTS_LATENCY = 0.05       # 模拟每句语音合成的耗时
+
+
+
+def build_reply(chunk_count: int) -> List[str]:
+    """构造一段完整的回复并均匀切成 chunk_count 个chunk"""
+    text = ("【高兴】" + "好" * SENTENCE_CHARS + "<よし>") * SENTENCE_COUNT
+    bounds = [len(text) * i // chunk_count for i in range(chunk_count + 1)]
+    return [text[bounds[i]:bounds[i + 1]] for i in range(chunk_count)]
+
+
+class MockProvider(BaseLLMProvider):
+    def __init__(self, chunks: List[str]):
+        super().__init__()
+        self.chunks = chunks
+
+    def initialize_client(self):
+        pass
+
+    def generate_response(self, messages: List[Dict]) -> str:
+        return "".join(self.chunks)
+
+    async def generate_stream_response(self, messages: List[Dict]):
+        for chunk in self.chunks:
+            # 模拟网络读取：大多数chunk已经在缓冲区中，不需要真正等待
+            await asyncio.sleep(0)
+            yield chunk
+
+
+class MockLLMManager(LLMManager):
+    def __init__(self, provider: BaseLLMProvider):
+        self.provider = provider
+
+
+class LegacyLLMManager(MockLLMManager):
+    """旧实现：每个chunk之后固定sleep 50ms"""
+    async def process_message_stream(self, messages: List[Dict], backpressure=None):
+        async for chunk in self.provider.generate_stream_response(messages):
+            yield chunk
+            await asyncio.sleep(0.05)
+
+
+class MockVoiceMaker(VoiceMaker):
+    async def generate_voice_files(self, segments: List[Dict[str, str]]):
+        await asyncio.sleep(TTS_LATENCY)
+
+
+class MockAILogger:
+    def log_conversation(self, speaker: str, message: str):
+        pass
+
+    def print_debug_message(self, *args):
+        pass
+
+
+async def run_once(llm_model: LLMManager) -> Dict[str, float]:
+    voice_maker = MockVoiceMaker()
+    generator = MessageGenerator(
+        config=AIServiceConfig(clients=set(), user_id="bench"),
+        voice_maker=voice_maker,
+        message_processor=MessageProcessor(voice_maker),
+        translator=object(),  # type: ignore[arg-type]  # 回复中自带日语，不会走翻译
+        llm_model=llm_model,
+        rag_manager=None,
+        ai_logger=MockAILogger(),  # type: ignore[arg-type]
+    )
+    generator.memory_init([{"role": "system", "content": "bench"}])
+
+    start = time.perf_counter()
+    first_sentence = None
+    count = 0
+    async for _ in generator.process_message_stream("你好"):
+        if first_sentence is None:
+            first_sentence = time.perf_counter() - start
+        count += 1
+    total = time.perf_counter() - start
+    return {"first_sentence": first_sentence or total, "total": total, "responses": count}
+
+
+def report(name: str, result: Dict[str, float]):
+    print(f"{name:<10} 首句延迟 {result['first_sentence'] * 1000:8.1f} ms   "
+          f"总耗时 {result['total'] * 1000:9.1f} ms   响应数 {int(result['responses'])}")
+
+
+async def main(legacy: bool):
+    chunks = build_reply(CHUNK_COUNT)
+    report("背压控制", await run_once(MockLLMManager(MockProvider(chunks))))
+    if legacy:
+        report("固定sleep", await run_once(LegacyLLMManager(MockProvider(chunks))))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--legacy", action="store_true", help="同时运行旧的固定sleep实现作为对照")
+    args = parser.parse_args()
+    asyncio.run(main(args.legacy))
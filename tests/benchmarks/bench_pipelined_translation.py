@@ -0,0 +1,77 @@
+"""
+流式翻译时边读译文边合成语音的基准测试
+
+模拟一个逐段输出译文的翻译模型和一个固定耗时的TTS后端，翻译一条5段的回复，
+比较拿到一段译文后等它的语音合成完再继续读取（TRANSLATE_PIPELINE_DEPTH=0），
+和交给后台合成、翻译流继续读取（TRANSLATE_PIPELINE_DEPTH=3）的总耗时。
+前者接近 翻译+合成 的总和，后者接近两者中较大的一个。
+
+运行方式：
+    python -m tests.benchmarks.bench_pipelined_translation
+"""
+import asyncio
+import contextlib
+import io
+import os
+import time
+from typing import Dict, List
+from unittest import mock
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ["TRANSLATE_BATCH"] = "false"
+os.environ["TRANSLATE_STREAM"] = "true"
+os.environ["TRANSLATION_MEMORY"] = "false"
+
+from ling_chat.core.ai_service.translator import Translator
+
+
+SEGMENT_COUNT = 5
+TRANSLATE_LATENCY = 0.1  # 模拟翻译模型输出每段译文的耗时
+TTS_LATENCY = 0.25       # 模拟每段语音合成的耗时
+TTS_CONCURRENCY = 2      # 模拟TTS后端能同时处理的请求数
+ROUNDS = 3
+
+
+class PacedTranslatorLLM:
+    async def process_message_stream(self, messages: List[Dict], backpressure=None):
+        chinese, _ = Translator.split_translations(messages[-1]["content"])
+        for text in chinese:
+            await asyncio.sleep(TRANSLATE_LATENCY)
+            yield f"<ja:{text}>"
+
+
+class FixedLatencyVoiceMaker:
+    def __init__(self):
+        self.backend = asyncio.Semaphore(TTS_CONCURRENCY)
+
+    async def generate_voice_files(self, segments: List[Dict]):
+        async with self.backend:
+            await asyncio.sleep(TTS_LATENCY)
+
+
+async def run_once(depth: int) -> float:
+    with mock.patch("ling_chat.core.ai_service.translator.get_shared_llm_manager",
+                    return_value=PacedTranslatorLLM()):
+        translator = Translator(FixedLatencyVoiceMaker())
+    translator.pipeline_depth = depth
+    segments = [{"following_text": f"第{i}句", "japanese_text": ""} for i in range(SEGMENT_COUNT)]
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # 翻译时会打印每个chunk
+        await translator.translate_ai_response(segments, script=False)
+    return time.perf_counter() - start
+
+
+async def main():
+    translate_total = SEGMENT_COUNT * TRANSLATE_LATENCY
+    tts_total = SEGMENT_COUNT * TTS_LATENCY / TTS_CONCURRENCY
+    print(f"{SEGMENT_COUNT} 段，翻译每段 {TRANSLATE_LATENCY * 1000:.0f} ms，合成每段 {TTS_LATENCY * 1000:.0f} ms"
+          f"（后端并发 {TTS_CONCURRENCY}）")
+    print(f"翻译总计 {translate_total * 1000:.0f} ms，合成总计约 {tts_total * 1000:.0f} ms")
+    for name, depth in (("逐段等待", 0), ("边读边合成", 3)):
+        elapsed = sorted([await run_once(depth) for _ in range(ROUNDS)])[ROUNDS // 2]
+        print(f"{name:<8} 总耗时 {elapsed * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
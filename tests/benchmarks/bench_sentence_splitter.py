@@ -0,0 +1,105 @@
+"""
+句子切分的微基准测试
+
+比较增量切分器 SentenceSplitter 和旧版 StreamProducer.run 的切分方式
+（每个chunk都在整个缓冲区上重新查找和切片），并检查两者切出的句子是否一致。
+最后一组 100k 字的单句回复用来观察旧实现的二次方增长。
+终端显示和最终的文本修复两种实现都有，不计入耗时。
+
+运行方式：
+    python -m tests.benchmarks.bench_sentence_splitter
+"""
+import time
+from typing import Callable, List, Tuple
+
+from ling_chat.core.ai_service.message_system.sentence_splitter import SentenceSplitter
+
+
+REPLY_CHARS = 10_000
+CASES = [                # (回复字数, 每句正文字数)
+    (REPLY_CHARS, 50),
+    (REPLY_CHARS, 500),
+    (REPLY_CHARS, REPLY_CHARS),
+    (REPLY_CHARS * 10, REPLY_CHARS * 10),
+]
+CHUNK_CHARS = 3          # 每个chunk的字数，接近常见LLM的token粒度
+ROUNDS = 5
+
+
+def build_reply(reply_chars: int, sentence_chars: int) -> str:
+    """构造约 reply_chars 字的回复，每句正文 sentence_chars 字"""
+    sentence = "【高兴】" + "好" * sentence_chars + "<よし>（摇尾巴）"
+    count = max(1, reply_chars // len(sentence))
+    return sentence * count
+
+
+def split_chunks(text: str) -> List[str]:
+    return [text[i:i + CHUNK_CHARS] for i in range(0, len(text), CHUNK_CHARS)]
+
+
+def legacy_split(chunks: List[str]) -> List[str]:
+    """旧版 StreamProducer.run 的切分循环，去掉了显示和入队"""
+    sentences = []
+    buffer = sentence = ""
+    for chunk in chunks:
+        buffer += chunk
+        while "【" in buffer:
+            if sentence and "】" in buffer:
+                end_index = buffer.index("】")
+                sentence += buffer[:end_index + 1]
+                buffer = buffer[end_index + 1:]
+                next_start = buffer.find("【")
+                if next_start != -1:
+                    sentence += buffer[:next_start]
+                    buffer = buffer[next_start:]
+                else:
+                    sentence += buffer
+                    buffer = ""
+                sentences.append(sentence)
+                sentence = ""
+            else:
+                # 找到句子的开始，等标签闭合
+                start_index = buffer.index("【")
+                sentence = buffer[:start_index + 1]
+                buffer = buffer[start_index + 1:]
+                break
+    if sentence + buffer:
+        sentences.append(sentence + buffer)
+    return sentences
+
+
+def incremental_split(chunks: List[str]) -> List[str]:
+    splitter = SentenceSplitter()
+    sentences = []
+    for chunk in chunks:
+        sentences.extend(splitter.feed(chunk))
+    final = splitter.flush()
+    if final:
+        sentences.append(final)
+    return sentences
+
+
+def best_of(split: Callable[[List[str]], List[str]], chunks: List[str]) -> Tuple[float, List[str]]:
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        sentences = split(chunks)
+        best = min(best, time.perf_counter() - start)
+    return best, sentences
+
+
+def main():
+    for reply_chars, sentence_chars in CASES:
+        reply = build_reply(reply_chars, sentence_chars)
+        chunks = split_chunks(reply)
+        print(f"\n回复 {len(reply)} 字 / {len(chunks)} 个chunk / 每句约 {sentence_chars} 字")
+
+        new_time, baseline = best_of(incremental_split, chunks)
+        old_time, sentences = best_of(legacy_split, chunks)
+        same = "一致" if sentences == baseline else "不一致"
+        print(f"  增量切分 {new_time * 1000:8.2f} ms   句子数 {len(baseline):4d}")
+        print(f"  旧版切分 {old_time * 1000:8.2f} ms   句子数 {len(sentences):4d}   结果与增量切分{same}")
+
+
+if __name__ == "__main__":
+    main()
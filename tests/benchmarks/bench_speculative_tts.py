@@ -0,0 +1,128 @@
+"""
+投机语音合成的首个语音延迟基准测试
+
+模拟一个按固定速度输出的LLM和一个固定耗时的TTS后端，驱动完整的 MessageGenerator 管道，
+比较句子结束后才合成（默认）和日语部分完整后就开始合成（TTS_SPECULATIVE）时，
+第一条带语音的回复到达的时间。每句的日语后面跟着一段较长的动作描写，
+动作描写输出的这段时间就是投机合成能省下的时间。
+
+运行方式：
+    python -m tests.benchmarks.bench_speculative_tts
+"""
+import asyncio
+import os
+import tempfile
+import time
+from typing import Dict, List
+
+os.environ.setdefault("ENABLE_EMOTION_CLASSIFIER", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ["TTS_CACHE_MAX_MB"] = "0"  # 每次都真正合成，不命中缓存
+os.environ["TEMP_VOICE_DIR"] = tempfile.mkdtemp(prefix="bench_speculative_tts")
+
+from ling_chat.core.ai_service.config import AIServiceConfig
+from ling_chat.core.ai_service.message_processor import MessageProcessor
+from ling_chat.core.ai_service.message_system.message_generator import MessageGenerator
+from ling_chat.core.ai_service.voice_maker import VoiceMaker
+from ling_chat.core.llm_providers.base import BaseLLMProvider
+from ling_chat.core.llm_providers.manager import LLMManager
+from ling_chat.core.TTS.base_adapter import TTSBaseAdapter
+
+
+CHUNK_CHARS = 4          # 每个chunk的字数
+CHUNK_INTERVAL = 0.01    # 模拟LLM输出速度：每个chunk间隔10ms
+TTS_LATENCY = 0.3        # 模拟每句语音合成的耗时
+SENTENCE_COUNT = 3
+ROUNDS = 3
+
+
+def build_reply() -> List[str]:
+    sentence = "【高兴】" + "今天天气真好" * 3 + "<今日はいい天気ですね>" + "（" + "伸了个懒腰" * 12 + "）"
+    text = sentence * SENTENCE_COUNT
+    return [text[i:i + CHUNK_CHARS] for i in range(0, len(text), CHUNK_CHARS)]
+
+
+class PacedProvider(BaseLLMProvider):
+    def __init__(self, chunks: List[str]):
+        super().__init__()
+        self.chunks = chunks
+
+    def initialize_client(self):
+        pass
+
+    def generate_response(self, messages: List[Dict]) -> str:
+        return "".join(self.chunks)
+
+    async def generate_stream_response(self, messages: List[Dict]):
+        for chunk in self.chunks:
+            await asyncio.sleep(CHUNK_INTERVAL)
+            yield chunk
+
+
+class MockLLMManager(LLMManager):
+    def __init__(self, provider: BaseLLMProvider):
+        self.provider = provider
+
+
+class FixedLatencyAdapter(TTSBaseAdapter):
+    def __init__(self):
+        self.params = {"speaker_id": 0}
+
+    async def generate_voice(self, text: str) -> bytes:
+        await asyncio.sleep(TTS_LATENCY)
+        return b"RIFF" + text.encode()
+
+    def get_params(self):
+        return self.params.copy()
+
+
+class MockAILogger:
+    def log_conversation(self, speaker: str, message: str):
+        pass
+
+    def print_debug_message(self, *args):
+        pass
+
+
+async def run_once(speculative: bool) -> Dict[str, float]:
+    voice_maker = VoiceMaker()
+    voice_maker.tts_type = "sbv2"
+    voice_maker.tts_provider.sbv2_adapter = FixedLatencyAdapter()
+    generator = MessageGenerator(
+        config=AIServiceConfig(clients=set(), user_id="bench"),
+        voice_maker=voice_maker,
+        message_processor=MessageProcessor(voice_maker),
+        translator=object(),  # type: ignore[arg-type]  # 回复中自带日语，不会走翻译
+        llm_model=MockLLMManager(PacedProvider(build_reply())),
+        rag_manager=None,
+        ai_logger=MockAILogger(),  # type: ignore[arg-type]
+    )
+    generator.speculative_tts = speculative
+    generator.memory_init([{"role": "system", "content": "bench"}])
+
+    start = time.perf_counter()
+    first_audio = None
+    async for response in generator.process_message_stream("你好"):
+        if first_audio is None and response.audioFile:
+            first_audio = time.perf_counter() - start
+    total = time.perf_counter() - start
+    await asyncio.to_thread(voice_maker.tts_provider.audio_writer.flush)
+    await voice_maker.close()
+    return {"first_audio": first_audio or total, "total": total}
+
+
+def report(name: str, results: List[Dict[str, float]]):
+    first_audio = sorted(r["first_audio"] for r in results)[len(results) // 2]
+    total = sorted(r["total"] for r in results)[len(results) // 2]
+    print(f"{name:<10} 首个语音 {first_audio * 1000:8.1f} ms   总耗时 {total * 1000:8.1f} ms")
+
+
+async def main():
+    chunks = build_reply()
+    print(f"{len(chunks)} 个chunk，每个间隔 {CHUNK_INTERVAL * 1000:.0f} ms，每句合成耗时 {TTS_LATENCY * 1000:.0f} ms")
+    report("句子结束后", [await run_once(False) for _ in range(ROUNDS)])
+    report("投机合成", [await run_once(True) for _ in range(ROUNDS)])
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,153 @@
+"""
+测试共用的假对象和构造函数：TTS适配器、翻译模型和语音合成器
+"""
+import asyncio
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from ling_chat.core.ai_service.translator import Translator
+from ling_chat.core.TTS.base_adapter import TTSBaseAdapter
+from ling_chat.core.TTS.tts_provider import TTS
+from ling_chat.core.TTS.voice_cache import VoiceCache
+
+
+class FakeAdapter(TTSBaseAdapter):
+    """
+    记录调用的假TTS适配器，默认返回文本本身
+
+    熔断器和缓存按适配器类名区分，各个测试文件用子类起不同的名字，互不影响。
+
+    :param delay: 每次合成的耗时
+    :param fail: 为True时合成失败，健康检查也失败
+    :param audio: 固定返回的音频
+    :param gated: 为True时合成一直等到 release 被设置
+    """
+    def __init__(self, delay: float = 0, fail: bool = False,
+                 audio: Optional[bytes] = None, gated: bool = False):
+        self.params = {"speaker_id": 0, "text": ""}
+        self.delay = delay
+        self.fail = fail
+        self.audio = audio
+        self.release = asyncio.Event()
+        if not gated:
+            self.release.set()
+        self.texts: List[str] = []
+        self.calls = 0
+        self.cancelled = 0
+
+    async def generate_voice(self, text: str) -> bytes:
+        self.calls += 1
+        self.texts.append(text)
+        # 和真正的适配器一样把文本写进参数，缓存键不能受它影响
+        self.params["text"] = text
+        try:
+            await self.release.wait()
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise ConnectionError("backend down")
+        return self.audio if self.audio is not None else text.encode()
+
+    async def health_check(self) -> bool:
+        return not self.fail
+
+    def get_params(self):
+        return self.params.copy()
+
+
+def make_tts(temp_dir, cache_bytes: int = 0, **kwargs) -> TTS:
+    """在 temp_dir 下创建TTS，语音缓存放在 temp_dir/cache，默认不缓存"""
+    root = Path(temp_dir)
+    voice_cache = VoiceCache(cache_dir=root / "cache", max_bytes=cache_bytes, max_age=3600)
+    return TTS(voice_cache=voice_cache, temp_dir=root, **kwargs)
+
+
+class FakeTranslatorLLM:
+    """流式返回译文，每段分成两个chunk，记录每次请求的内容"""
+    def __init__(self):
+        self.requests: List[str] = []
+
+    async def process_message_stream(self, messages: List[Dict], backpressure=None):
+        content = messages[-1]["content"]
+        self.requests.append(content)
+        chinese, _ = Translator.split_translations(content)
+        for text in chinese:
+            translated = f"<ja:{text}>"
+            yield translated[:3]
+            await asyncio.sleep(0.01)
+            yield translated[3:]
+
+    async def process_message_async(self, messages: List[Dict]) -> str:
+        return "".join([chunk async for chunk in self.process_message_stream(messages)])
+
+
+class SlowTranslatorLLM:
+    """每次请求都要等 delay 秒才返回"""
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.started = 0
+        self.cancelled = 0
+
+    async def _wait(self):
+        self.started += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+    async def process_message_async(self, messages: List[Dict]) -> str:
+        await self._wait()
+        chinese, _ = Translator.split_translations(messages[-1]["content"])
+        return "".join(f"<ja:{text}>" for text in chinese)
+
+    async def process_message_stream(self, messages: List[Dict], backpressure=None):
+        yield "<ja:"
+        await self._wait()
+        yield "x>"
+
+    def process_message(self, messages: List[Dict]) -> str:
+        raise AssertionError("不应该在事件循环上调用同步接口")
+
+
+class StreamingTranslatorLLM:
+    """逐段流式返回译文，每段之间让出一次事件循环"""
+    async def process_message_stream(self, messages: List[Dict], backpressure=None):
+        chinese, _ = Translator.split_translations(messages[-1]["content"])
+        for text in chinese:
+            await asyncio.sleep(0)
+            yield f"<ja:{text}>"
+
+
+class ChunkedTranslatorLLM:
+    """原样返回给定的chunk"""
+    def __init__(self, chunks: List[str]):
+        self.chunks = chunks
+
+    async def process_message_stream(self, messages: List[Dict], backpressure=None):
+        for chunk in self.chunks:
+            yield chunk
+
+
+class RecordingVoiceMaker:
+    """只记录要合成的日语文本"""
+    def __init__(self):
+        self.started: List[str] = []
+
+    async def generate_voice_files(self, segments: List[Dict]):
+        self.started.extend(seg["japanese_text"] for seg in segments)
+
+
+class BlockedVoiceMaker(RecordingVoiceMaker):
+    """语音合成一直等到 release 被设置"""
+    def __init__(self):
+        super().__init__()
+        self.release = asyncio.Event()
+        self.finished: List[str] = []
+
+    async def generate_voice_files(self, segments: List[Dict]):
+        await super().generate_voice_files(segments)
+        await self.release.wait()
+        self.finished.extend(seg["japanese_text"] for seg in segments)
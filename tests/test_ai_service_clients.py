@@ -0,0 +1,45 @@
+import asyncio
+import unittest
+
+from ling_chat.core.ai_service.config import AIServiceConfig
+from ling_chat.core.ai_service.core import AIService
+from ling_chat.core.messaging.broker import MessageBroker
+
+
+def make_service() -> AIService:
+    # 只初始化客户端管理需要的属性，不加载模型和角色
+    service = AIService.__new__(AIService)
+    service.config = AIServiceConfig(clients=set(), user_id="1")
+    service.message_broker = MessageBroker()
+    service.client_tasks = {}
+    return service
+
+
+class TestAIServiceClients(unittest.IsolatedAsyncioTestCase):
+    async def test_add_and_remove_client_are_synchronous(self):
+        service = make_service()
+        await service.add_client("client_a")
+        # 任务和输入订阅在 add_client 返回时就已经存在
+        self.assertEqual(service.live_client_tasks, 1)
+        self.assertTrue(service.message_broker.has_subscribers("ai_input_client_a"))
+
+        await service.add_client("client_a")
+        self.assertEqual(service.live_client_tasks, 1)
+
+        await service.remove_client("client_a")
+        self.assertEqual(service.live_client_tasks, 0)
+        self.assertEqual(service.client_tasks, {})
+        self.assertEqual(service.message_broker.topics, {})
+
+    async def test_connect_disconnect_cycles_leave_nothing_behind(self):
+        service = make_service()
+        for i in range(1000):
+            await service.add_client(f"client_{i}")
+            await service.remove_client(f"client_{i}")
+        await asyncio.sleep(0)
+        self.assertEqual(service.live_client_tasks, 0)
+        self.assertEqual(service.message_broker.topics, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import asyncio
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import wave
+from unittest import mock
+
+from ling_chat.core.TTS.audio_encoder import AudioEncoder
+from tests.fakes import FakeAdapter, make_tts
+
+
+def make_wav(seconds: float = 0.5) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(16000)
+        f.writeframes(b"\x00\x10" * int(16000 * seconds))
+    return buffer.getvalue()
+
+
+class WavAdapter(FakeAdapter):
+    def __init__(self):
+        super().__init__(audio=make_wav())
+
+
+class TestAudioEncoder(unittest.IsolatedAsyncioTestCase):
+    def test_disabled_without_ffmpeg_or_unknown_codec(self):
+        with mock.patch("ling_chat.core.TTS.audio_encoder.shutil.which", return_value=None):
+            self.assertFalse(AudioEncoder(codec="opus").enabled)
+        with mock.patch("ling_chat.core.TTS.audio_encoder.shutil.which", return_value="/usr/bin/ffmpeg"):
+            self.assertFalse(AudioEncoder(codec="flac").enabled)
+            self.assertEqual(AudioEncoder(codec="opus").extension, "ogg")
+
+    async def test_tts_saves_encoded_voice(self):
+        with mock.patch("ling_chat.core.TTS.audio_encoder.shutil.which", return_value="/usr/bin/ffmpeg"):
+            encoder = AudioEncoder(codec="mp3")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with mock.patch("ling_chat.core.TTS.tts_provider.get_audio_encoder", return_value=encoder), \
+                    mock.patch.object(encoder, "encode", return_value=b"mp3"):
+                tts = make_tts(temp_dir, cache_bytes=1024 * 1024)
+                tts.sbv2_adapter = WavAdapter()
+                self.assertEqual(tts.file_format, "mp3")
+                output_file = f"{temp_dir}/a.{tts.file_format}"
+                self.assertEqual(await tts.generate_voice("encode", output_file, tts_type="sbv2"), output_file)
+                await asyncio.to_thread(tts.audio_writer.flush)
+                with open(output_file, "rb") as f:
+                    self.assertEqual(f.read(), b"mp3")
+
+                # 不压缩时不会命中压缩语音的缓存
+                tts.encode = False
+                wav_file = f"{temp_dir}/b.{tts.file_format}"
+                await tts.generate_voice("encode", wav_file, tts_type="sbv2")
+                await asyncio.to_thread(tts.audio_writer.flush)
+                with open(wav_file, "rb") as f:
+                    self.assertEqual(f.read()[:4], b"RIFF")
+                await tts.close()
+
+    async def test_encode_failure_saves_wav_name(self):
+        with mock.patch("ling_chat.core.TTS.audio_encoder.shutil.which", return_value="/usr/bin/ffmpeg"):
+            encoder = AudioEncoder(codec="opus")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with mock.patch("ling_chat.core.TTS.tts_provider.get_audio_encoder", return_value=encoder), \
+                    mock.patch.object(encoder, "encode", side_effect=RuntimeError("ffmpeg failed")):
+                tts = make_tts(temp_dir, cache_bytes=1024 * 1024)
+                tts.sbv2_adapter = WavAdapter()
+                # 压缩失败时原始音频用 .wav 保存，返回实际的文件名
+                result = await tts.generate_voice("encode", f"{temp_dir}/a.ogg", tts_type="sbv2")
+                self.assertEqual(result, f"{temp_dir}/a.wav")
+                await asyncio.to_thread(tts.audio_writer.flush)
+                with open(result, "rb") as f:
+                    self.assertEqual(f.read()[:4], b"RIFF")
+                self.assertFalse(os.path.exists(f"{temp_dir}/a.ogg"))
+                self.assertEqual(len(tts.voice_cache), 0)
+                await tts.close()
+
+    @unittest.skipIf(shutil.which("ffmpeg") is None, "需要 ffmpeg")
+    async def test_ffmpeg_round_trip(self):
+        encoder = AudioEncoder(codec="opus", workers=1)
+        try:
+            wav_data = make_wav()
+            encoded = await encoder.encode(wav_data)
+            self.assertEqual(encoded[:4], b"OggS")
+            self.assertLess(len(encoded), len(wav_data))
+            self.assertEqual((await encoder.decode_wav(encoded))[:4], b"RIFF")
+        finally:
+            encoder.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import asyncio
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from ling_chat.core.TTS.audio_writer import AudioWriter
+
+
+class TestAudioWriter(unittest.IsolatedAsyncioTestCase):
+    async def test_write_behind_serves_pending_bytes(self):
+        writer = AudioWriter(fsync=True)
+        release = threading.Event()
+        original = writer._write_batch
+
+        def slow_write_batch(batch):
+            release.wait(1)
+            original(batch)
+
+        with tempfile.TemporaryDirectory() as temp_dir, \
+                mock.patch.object(writer, "_write_batch", side_effect=slow_write_batch):
+            path = Path(temp_dir) / "a.wav"
+            written = []
+            future = writer.submit(str(path), b"audio", on_written=lambda: written.append(path.read_bytes()))
+
+            # 写入完成之前可以从内存中读取
+            self.assertEqual(writer.get_pending("a.wav"), b"audio")
+            self.assertFalse(path.exists())
+
+            release.set()
+            self.assertEqual(await asyncio.wrap_future(future), str(path))
+            self.assertEqual(written, [b"audio"])
+            self.assertIsNone(writer.get_pending("a.wav"))
+
+    async def test_flush_waits_for_all_writes(self):
+        writer = AudioWriter()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            paths = [Path(temp_dir) / f"{i}.wav" for i in range(50)]
+            for i, path in enumerate(paths):
+                writer.submit(str(path), bytes([i]))
+            await asyncio.to_thread(writer.flush)
+            self.assertEqual([path.read_bytes() for path in paths], [bytes([i]) for i in range(50)])
+            self.assertEqual(writer.stats()["written"], 50)
+            self.assertFalse(writer.has_pending())
+
+    async def test_failed_write_is_reported(self):
+        writer = AudioWriter()
+        future = writer.submit("/nonexistent-dir/a.wav", b"audio")
+        with self.assertRaises(OSError):
+            await asyncio.wrap_future(future)
+        self.assertIsNone(writer.get_pending("a.wav"))
+
+
+if __name__ == '__main__':
+    unittest.main()
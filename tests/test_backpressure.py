@@ -0,0 +1,32 @@
+import asyncio
+import unittest
+
+from ling_chat.core.messaging.backpressure import BackpressureQueue
+
+
+class TestBackpressureQueue(unittest.IsolatedAsyncioTestCase):
+    async def test_writable_when_not_saturated(self):
+        queue = BackpressureQueue(maxsize=4)
+        await queue.put(1)
+        self.assertFalse(queue.is_saturated())
+        # 未饱和时不应该挂起
+        await asyncio.wait_for(queue.wait_until_writable(), timeout=0.1)
+
+    async def test_waits_until_low_watermark(self):
+        queue = BackpressureQueue(maxsize=4)
+        for i in range(4):
+            await queue.put(i)
+        self.assertTrue(queue.is_saturated())
+
+        waiter = asyncio.create_task(queue.wait_until_writable())
+        await asyncio.sleep(0)
+        queue.get_nowait()          # 剩3个，仍高于低水位线2
+        await asyncio.sleep(0)
+        self.assertFalse(waiter.done())
+
+        queue.get_nowait()          # 剩2个，达到低水位线
+        await asyncio.wait_for(waiter, timeout=0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import asyncio
+import tempfile
+import unittest
+
+from ling_chat.core.TTS.circuit_breaker import BreakerState, CircuitBreaker, get_circuit_breaker
+from tests.fakes import FakeAdapter, make_tts
+
+
+class FlakyAdapter(FakeAdapter):
+    pass
+
+
+class TestCircuitBreaker(unittest.IsolatedAsyncioTestCase):
+    async def test_opens_after_threshold_and_half_opens_after_backoff(self):
+        breaker = CircuitBreaker("test", failure_threshold=2, base_backoff=0.05, max_backoff=1)
+        for _ in range(2):
+            self.assertTrue(breaker.allow())
+            breaker.record_failure()
+        self.assertEqual(breaker.state, BreakerState.OPEN)
+        self.assertFalse(breaker.allow())
+
+        await asyncio.sleep(0.06)
+        # 只放行一个试探请求
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, BreakerState.OPEN)
+        self.assertEqual(breaker.backoff, 0.1)
+
+        await asyncio.sleep(0.11)
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, BreakerState.CLOSED)
+        self.assertEqual(breaker.backoff, 0.05)
+
+    async def test_health_probe_moves_to_half_open(self):
+        breaker = CircuitBreaker("probe", failure_threshold=1, base_backoff=0.02, max_backoff=1)
+        healthy = False
+
+        async def probe():
+            return healthy
+
+        breaker.record_failure(probe=probe)
+        await asyncio.sleep(0.03)
+        # 第一次健康检查失败，退避时间加倍
+        self.assertEqual(breaker.state, BreakerState.OPEN)
+        self.assertEqual(breaker.backoff, 0.04)
+
+        healthy = True
+        await asyncio.sleep(0.06)
+        self.assertEqual(breaker.state, BreakerState.HALF_OPEN)
+        breaker.close()
+
+
+class TestTTSCircuitBreaker(unittest.IsolatedAsyncioTestCase):
+    async def test_voice_recovers_without_restart(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            tts = make_tts(temp_dir)
+            adapter = tts.sbv2_adapter = FlakyAdapter(fail=True)
+            breaker = get_circuit_breaker("FlakyAdapter")
+            breaker.failure_threshold, breaker.base_backoff, breaker.backoff = 2, 0.05, 0.05
+
+            for i in range(5):
+                self.assertIsNone(await tts.generate_voice(f"text{i}", f"{temp_dir}/{i}.wav", tts_type="sbv2"))
+            # 熔断后的请求直接跳过，不再发给后端
+            self.assertEqual(adapter.calls, 2)
+            self.assertTrue(tts.enable)
+
+            adapter.fail = False
+            await asyncio.sleep(0.08)
+            self.assertEqual(breaker.state, BreakerState.HALF_OPEN)
+            self.assertIsNotNone(await tts.generate_voice("ok", f"{temp_dir}/ok.wav", tts_type="sbv2"))
+            self.assertEqual(breaker.state, BreakerState.CLOSED)
+            await asyncio.to_thread(tts.audio_writer.flush)
+            await tts.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
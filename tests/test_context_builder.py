@@ -0,0 +1,94 @@
+import unittest
+from typing import Dict, List
+
+from ling_chat.core.ai_service.message_system.context_builder import ContextBuilder, estimate_tokens
+
+
+def length_tokens(text: str) -> int:
+    return len(text)
+
+
+def conversation(turns: int) -> List[Dict]:
+    memory = [{"role": "system", "content": "系统提示"}]
+    for i in range(turns):
+        memory.append({"role": "user", "content": f"问题{i:02d}"})
+        memory.append({"role": "assistant", "content": f"回答{i:02d}"})
+    return memory
+
+
+class TestContextBuilder(unittest.TestCase):
+    def test_estimate_tokens(self):
+        self.assertEqual(estimate_tokens("你好"), 2)
+        self.assertEqual(estimate_tokens("hello world!"), 3)
+        self.assertEqual(estimate_tokens(""), 0)
+
+    def test_only_new_messages_are_counted(self):
+        builder = ContextBuilder(budget=0, tokenizer=length_tokens)
+        memory = conversation(3)
+        self.assertEqual(builder.build(memory), memory)
+        self.assertEqual(builder.counted, 7)
+
+        memory.append({"role": "user", "content": "新问题"})
+        context = builder.build(memory)
+        self.assertEqual(builder.counted, 8)
+        self.assertEqual(context, memory)
+        self.assertIsNot(context, memory)
+
+        # 读档后记忆整个换掉，从头计算
+        builder.build(conversation(1))
+        self.assertEqual(builder.counted, 11)
+        self.assertEqual(builder.stats()["messages"], 3)
+
+    def test_trim_oldest_turns_and_keep_prefix(self):
+        # 每条消息 4 + 4 个token
+        builder = ContextBuilder(budget=100, tokenizer=length_tokens, trim="drop", discard_trimmed=False)
+        memory = conversation(8)
+        memory.append({"role": "user", "content": "问题08"})
+        context = builder.build(memory)
+
+        # 系统提示和最新一轮始终保留，裁掉的是完整的轮次
+        self.assertLessEqual(builder.last_tokens, 100)
+        self.assertEqual(context[0]["content"], "系统提示")
+        self.assertEqual(context[1]["role"], "user")
+        self.assertEqual(context[-1]["content"], "问题08")
+        first_kept = context[1]
+
+        # 下一轮还在预算内，起点不变
+        memory.append({"role": "assistant", "content": "回答08"})
+        self.assertIs(builder.build(memory)[1], first_kept)
+        self.assertEqual(len(memory), 19)
+
+    def test_latest_turn_is_kept_when_over_budget(self):
+        builder = ContextBuilder(budget=10, tokenizer=length_tokens, trim="drop", discard_trimmed=False)
+        memory = conversation(2)
+        memory.append({"role": "user", "content": "很长的问题" * 10})
+        context = builder.build(memory)
+        self.assertEqual([m["content"] for m in context], ["系统提示", "很长的问题" * 10])
+
+    def test_summary_replaces_trimmed_turns(self):
+        builder = ContextBuilder(budget=100, tokenizer=length_tokens, trim="summary", discard_trimmed=False)
+        memory = conversation(8)
+        memory.append({"role": "user", "content": "问题08"})
+        context = builder.build(memory)
+        self.assertEqual(context[1]["role"], "system")
+        # 摘要也有预算，只保留最近被裁掉的几句用户消息
+        self.assertIn("问题04", context[1]["content"])
+        self.assertNotIn("问题00", context[1]["content"])
+        self.assertNotIn("回答04", context[1]["content"])
+
+    def test_discard_trimmed_bounds_memory(self):
+        builder = ContextBuilder(budget=100, tokenizer=length_tokens, trim="drop", discard_trimmed=True)
+        memory = conversation(1)
+        for i in range(50):
+            memory.append({"role": "user", "content": f"问题{i:02d}"})
+            context = builder.build(memory)
+            self.assertEqual(context, memory)
+            memory.append({"role": "assistant", "content": f"回答{i:02d}"})
+        self.assertLess(len(memory), 20)
+        self.assertEqual(memory[0]["content"], "系统提示")
+        # 最后一条回答还没有组装过
+        self.assertEqual(builder.tokens, sum(len(m["content"]) + 4 for m in memory[:-1]))
+
+
+if __name__ == "__main__":
+    unittest.main()
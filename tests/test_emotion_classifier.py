@@ -0,0 +1,131 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from ling_chat.core.emotion.classifier import EmotionClassifier
+from ling_chat.core.emotion.prediction_cache import PredictionCache
+from ling_chat.utils.runtime_path import third_party_path
+
+LABELS = ["兴奋", "害羞", "生气", "高兴"]
+
+
+class FakeSession:
+    """按输入内容生成确定的logits，并记录每次调用"""
+    def __init__(self):
+        self.calls = []
+
+    def run(self, output_names, inputs):
+        self.calls.append(inputs)
+        ids = inputs["input_ids"] * inputs["attention_mask"]
+        logits = np.zeros((len(ids), len(LABELS)), dtype=np.float32)
+        logits[np.arange(len(ids)), ids.sum(axis=1) % len(LABELS)] = 5.0
+        return [logits]
+
+
+def make_classifier() -> EmotionClassifier:
+    classifier = EmotionClassifier.__new__(EmotionClassifier)
+    classifier.vocab = {"[PAD]": 0, "[UNK]": 1, "[CLS]": 2, "[SEP]": 3}
+    for char in "兴奋害羞生气高兴开心":
+        classifier.vocab.setdefault(char, len(classifier.vocab))
+    classifier.id2label = {str(i): label for i, label in enumerate(LABELS)}
+    classifier.label2id = {label: i for i, label in enumerate(LABELS)}
+    classifier.session = FakeSession()
+    classifier.fixed_seq_length = None
+    classifier._init_tokenizer()
+    classifier.cache = PredictionCache(maxsize=8)
+    return classifier
+
+
+class TestEmotionClassifierBatch(unittest.TestCase):
+    def test_batch_runs_model_once_with_dynamic_padding(self):
+        classifier = make_classifier()
+        texts = ["高兴", "害羞", "开心开心", "生气", "兴奋"]
+        results = classifier.predict_batch(texts)
+
+        self.assertEqual(len(classifier.session.calls), 1)
+        inputs = classifier.session.calls[0]
+        self.assertEqual(inputs["input_ids"].shape, (5, 6))   # 最长4个字 + [CLS] + [SEP]
+        self.assertEqual(inputs["attention_mask"][0].tolist(), [1, 1, 1, 1, 0, 0])
+
+        # 批量结果与逐个预测一致，顺序不变
+        classifier.cache = PredictionCache(maxsize=8)
+        self.assertEqual(results, [classifier.predict(text) for text in texts])
+        self.assertEqual(len(results[0]["top3"]), 3)
+
+    def test_tokenizer_matches_per_char_lookup(self):
+        classifier = make_classifier()
+        texts = ["高兴", "开心😀x", "生气" * 100]
+        inputs = classifier._tokenize_batch(texts, max_length=8)
+        vocab = classifier.vocab
+        for row, text in enumerate(texts):
+            expected = [vocab["[CLS]"]] + [vocab.get(char, vocab["[UNK]"]) for char in text[:6]] + [vocab["[SEP]"]]
+            expected += [vocab["[PAD]"]] * (8 - len(expected))
+            self.assertEqual(inputs["input_ids"][row].tolist(), expected)
+            self.assertEqual(inputs["attention_mask"][row].tolist(), [1] * (len(text[:6]) + 2) + [0] * (6 - len(text[:6])))
+        self.assertEqual(inputs["token_type_ids"].sum(), 0)
+        self.assertTrue(inputs["input_ids"].flags["C_CONTIGUOUS"])
+
+    def test_tokenizer_matches_real_vocab_with_emoji(self):
+        vocab_path = third_party_path / "emotion_model_18emo/vocab.txt"
+        if not vocab_path.exists():
+            self.skipTest("没有情绪模型的词汇表")
+        classifier = make_classifier()
+        classifier.vocab = classifier._load_vocab(vocab_path)
+        classifier._init_tokenizer()
+        vocab = classifier.vocab
+
+        text = "太棒了👍🔥😀好"
+        self.assertIn("👍", vocab)
+        self.assertNotIn("😀", vocab)
+        inputs = classifier._tokenize_batch([text, "嗯"])
+        # 词表中有的表情使用自己的ID，没有的才是 [UNK]
+        expected = [vocab["[CLS]"]] + [vocab.get(char, vocab["[UNK]"]) for char in text] + [vocab["[SEP]"]]
+        self.assertEqual(inputs["input_ids"][0].tolist(), expected)
+        self.assertEqual(expected[4], vocab["👍"])
+
+    def test_low_confidence_and_disabled(self):
+        classifier = make_classifier()
+        result = classifier.predict_batch(["高兴"], confidence_threshold=0.99)[0]
+        self.assertEqual(result["label"], "不确定")
+
+        classifier.session = None
+        self.assertEqual(classifier.predict_batch(["害羞"])[0]["label"], "害羞")
+
+
+class TestEmotionPredictionCache(unittest.TestCase):
+    def test_repeated_tags_skip_the_model(self):
+        classifier = make_classifier()
+        classifier.prewarm()
+        self.assertEqual(len(classifier.session.calls), 1)
+
+        results = classifier.predict_batch(["高兴", "害羞", "高兴"])
+        self.assertEqual(len(classifier.session.calls), 1)
+        self.assertEqual(classifier.cache_stats()["hits"], 3)
+
+        # 阈值不同时是不同的缓存项
+        classifier.predict("高兴", confidence_threshold=0.5)
+        self.assertEqual(len(classifier.session.calls), 2)
+        self.assertEqual(results[0], classifier.predict("高兴"))
+
+    def test_lru_eviction_and_persistence(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "cache.json"
+            cache = PredictionCache(maxsize=2, path=path, model_id="m")
+            for text in ["a", "b", "c"]:
+                cache.put(text, 0.08, {"label": text})
+            self.assertIsNone(cache.get("a", 0.08))
+            cache.save()
+
+            loaded = PredictionCache(maxsize=2, path=path, model_id="m")
+            loaded.load()
+            self.assertEqual(loaded.get("c", 0.08), {"label": "c"})
+
+            other_model = PredictionCache(path=path, model_id="other")
+            other_model.load()
+            self.assertEqual(len(other_model), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
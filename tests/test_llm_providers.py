@@ -0,0 +1,87 @@
+import asyncio
+import time
+import unittest
+from typing import Dict, List
+
+from ling_chat.core.llm_providers.base import BaseLLMProvider
+
+
+class SlowSyncProvider(BaseLLMProvider):
+    """只有同步实现的提供商，用于测试线程兜底逻辑"""
+    def initialize_client(self):
+        pass
+
+    def generate_response(self, messages: List[Dict]) -> str:
+        time.sleep(0.2)
+        return "完整回复"
+
+    def _sync_stream(self, messages: List[Dict]):
+        for chunk in ["【高兴】", "你好", "呀"]:
+            time.sleep(0.05)
+            yield chunk
+
+    async def generate_stream_response(self, messages: List[Dict]):
+        async for chunk in self.stream_in_thread(self._sync_stream, messages):
+            yield chunk
+
+
+class FailingSyncProvider(SlowSyncProvider):
+    def _sync_stream(self, messages: List[Dict]):
+        yield "【生气】"
+        raise RuntimeError("连接中断")
+
+
+class TestBaseLLMProvider(unittest.IsolatedAsyncioTestCase):
+    async def test_stream_in_thread_keeps_order(self):
+        provider = SlowSyncProvider()
+        chunks = [chunk async for chunk in provider.generate_stream_response([])]
+        self.assertEqual(chunks, ["【高兴】", "你好", "呀"])
+
+    async def test_stream_in_thread_does_not_block_loop(self):
+        """同步流式读取期间事件循环仍然可以调度其他任务"""
+        provider = SlowSyncProvider()
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker_task = asyncio.create_task(ticker())
+        try:
+            async for _ in provider.generate_stream_response([]):
+                pass
+        finally:
+            ticker_task.cancel()
+        self.assertGreater(ticks, 5)
+
+    async def test_stream_in_thread_propagates_errors(self):
+        provider = FailingSyncProvider()
+        received = []
+        with self.assertRaises(RuntimeError):
+            async for chunk in provider.generate_stream_response([]):
+                received.append(chunk)
+        self.assertEqual(received, ["【生气】"])
+
+    async def test_generate_response_async_offloads_to_thread(self):
+        """同步接口阻塞的0.2秒内，事件循环上的其他任务照常推进"""
+        provider = SlowSyncProvider()
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker_task = asyncio.create_task(ticker())
+        try:
+            result = await provider.generate_response_async([])
+        finally:
+            ticker_task.cancel()
+        self.assertEqual(result, "完整回复")
+        self.assertGreater(ticks, 5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from ling_chat.core.messaging.broker import MessageBroker, OverflowPolicy
+from ling_chat.core.schemas.responses import ReplyResponse
+
+
+class TestMessageBroker(unittest.IsolatedAsyncioTestCase):
+    async def test_topic_fan_out_serializes_once(self):
+        broker = MessageBroker()
+        first = broker.subscribe("client_a", "user_1")
+        second = broker.subscribe("client_b", "user_1")
+        response = ReplyResponse(emotion="高兴", originalTag="高兴", message="你好", originalMessage="你好")
+
+        delivered = await broker.publish("user_1", response)
+        self.assertEqual(delivered, 2)
+        a, b = await first.get(), await second.get()
+        self.assertIsInstance(a, str)
+        self.assertIs(a, b)     # 所有订阅者共享同一份序列化结果
+
+        # 订阅了多个目标主题的订阅者只会收到一次
+        delivered = await broker.publish_many(["client_a", "user_1", "client_c"], response)
+        self.assertEqual(delivered, 2)
+        self.assertEqual((first.qsize(), second.qsize()), (1, 1))
+
+    async def test_topics_are_removed_after_unsubscribe(self):
+        broker = MessageBroker()
+        for i in range(5000):
+            with broker.subscribe(f"client_{i}", f"ai_input_client_{i}") as subscription:
+                await broker.publish(f"client_{i}", {"n": i})
+                self.assertEqual(await subscription.get(), {"n": i})
+        self.assertEqual(broker.topics, {})
+        # 没有订阅者的主题不会留下任何东西
+        self.assertEqual(await broker.publish("client_0", {"n": 0}), 0)
+        self.assertEqual(broker.topics, {})
+
+    async def test_drop_policies(self):
+        broker = MessageBroker()
+        oldest = broker.subscribe("t", maxsize=2, policy=OverflowPolicy.DROP_OLDEST)
+        newest = broker.subscribe("t", maxsize=2, policy=OverflowPolicy.DROP_NEWEST)
+        for i in range(3):
+            await broker.publish("t", i)
+        self.assertEqual([await oldest.get(), await oldest.get()], [1, 2])
+        self.assertEqual([await newest.get(), await newest.get()], [0, 1])
+        self.assertEqual((oldest.dropped, newest.dropped), (1, 1))
+
+    async def test_coalesce_replaces_pending_message_with_same_key(self):
+        broker = MessageBroker()
+        subscription = broker.subscribe("t", maxsize=2, policy=OverflowPolicy.COALESCE,
+                                        coalesce_key=lambda message: message["type"])
+        await broker.publish("t", {"type": "status", "v": 1})
+        await broker.publish("t", {"type": "reply", "v": 2})
+        await broker.publish("t", {"type": "status", "v": 3})
+        self.assertEqual(await subscription.get(), {"type": "status", "v": 3})
+        self.assertEqual(await subscription.get(), {"type": "reply", "v": 2})
+
+    async def test_block_policy_waits_and_close_releases_publisher(self):
+        broker = MessageBroker()
+        subscription = broker.subscribe("t", maxsize=1)
+        await broker.publish("t", 1)
+        publisher = asyncio.create_task(broker.publish("t", 2))
+        await asyncio.sleep(0)
+        self.assertFalse(publisher.done())
+
+        self.assertEqual(await subscription.get(), 1)
+        await asyncio.wait_for(publisher, timeout=0.1)
+        self.assertEqual(await subscription.get(), 2)
+
+        await broker.publish("t", 3)
+        blocked = asyncio.create_task(broker.publish("t", 4))
+        await asyncio.sleep(0)
+        subscription.close()
+        await asyncio.wait_for(blocked, timeout=0.1)
+        self.assertEqual([message async for message in subscription], [3])
+
+    async def test_input_topics_hold_messages_until_first_subscriber(self):
+        broker = MessageBroker(pending_size=2)
+        with mock.patch("ling_chat.core.messaging.broker.logger") as logger:
+            for i in range(3):
+                self.assertEqual(await broker.publish("ai_script_input_client_a", {"n": i}), 0)
+            # 输出主题没有订阅者时照旧直接丢弃
+            await broker.publish("client_a", {"n": 0})
+        self.assertEqual(list(broker.pending), ["ai_script_input_client_a"])
+        self.assertEqual(logger.warning.call_count, 1)
+
+        with broker.subscribe("ai_script_input_client_a") as subscription:
+            # 超出上限的最早一条被丢弃，其余的交给第一个订阅者
+            self.assertEqual([await subscription.get(), await subscription.get()], [{"n": 1}, {"n": 2}])
+        self.assertEqual(broker.pending, {})
+
+        await broker.publish("ai_input_client_b", {"n": 0})
+        broker.discard_pending("ai_input_client_b")
+        with broker.subscribe("ai_input_client_b") as subscription:
+            self.assertEqual(subscription.qsize(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
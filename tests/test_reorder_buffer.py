@@ -0,0 +1,43 @@
+import asyncio
+import unittest
+
+from ling_chat.core.ai_service.message_system.reorder_buffer import ReorderBuffer
+
+
+class TestReorderBuffer(unittest.IsolatedAsyncioTestCase):
+    async def collect(self, buffer: ReorderBuffer):
+        return [item async for item in buffer]
+
+    async def test_out_of_order_results_are_published_in_order(self):
+        buffer = ReorderBuffer()
+        collector = asyncio.create_task(self.collect(buffer))
+
+        buffer.put(2, "c")
+        buffer.put(1, "b")
+        await asyncio.sleep(0)
+        self.assertFalse(collector.done())
+
+        buffer.put(0, "a")
+        buffer.close(3)
+        result = await asyncio.wait_for(collector, timeout=0.1)
+        self.assertEqual(result, [(0, "a"), (1, "b"), (2, "c")])
+
+    async def test_failed_sentence_does_not_block(self):
+        buffer = ReorderBuffer()
+        buffer.put(1, "b")
+        buffer.put(0, None)         # 第0句处理失败
+        buffer.close(2)
+        result = await asyncio.wait_for(self.collect(buffer), timeout=0.1)
+        self.assertEqual(result, [(0, None), (1, "b")])
+
+    async def test_empty_reply_ends_immediately(self):
+        buffer = ReorderBuffer()
+        collector = asyncio.create_task(self.collect(buffer))
+        await asyncio.sleep(0)
+        buffer.close(0)
+        result = await asyncio.wait_for(collector, timeout=0.1)
+        self.assertEqual(result, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
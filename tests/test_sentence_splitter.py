@@ -0,0 +1,41 @@
+import unittest
+
+from ling_chat.core.ai_service.message_system.sentence_splitter import SentenceSplitter
+
+
+def split(chunks):
+    splitter = SentenceSplitter()
+    sentences = []
+    for chunk in chunks:
+        sentences.extend(splitter.feed(chunk))
+    return sentences, splitter.flush()
+
+
+class TestSentenceSplitter(unittest.TestCase):
+    def test_sentence_ends_when_next_one_starts(self):
+        reply = "【高兴】你好<こんにちは>（摇尾巴）【害羞】嗯<うん>"
+        sentences, rest = split(list(reply))   # 逐字输入
+        self.assertEqual(sentences, ["【高兴】你好<こんにちは>（摇尾巴）"])
+        self.assertEqual(rest, "【害羞】嗯<うん>")
+
+    def test_several_sentences_in_one_chunk(self):
+        sentences, rest = split(["【高兴】一【生气】二【平静】三"])
+        self.assertEqual(sentences, ["【高兴】一", "【生气】二"])
+        self.assertEqual(rest, "【平静】三")
+
+    def test_text_before_first_tag_joins_first_sentence(self):
+        sentences, rest = split(["嗯…", "【高兴】好", "【平静】"])
+        self.assertEqual(sentences, ["嗯…【高兴】好"])
+        self.assertEqual(rest, "【平静】")
+
+    def test_bracket_inside_open_tag_is_kept(self):
+        sentences, rest = split(["【高【兴】好", "【平静】"])
+        self.assertEqual(sentences, ["【高【兴】好"])
+        self.assertEqual(rest, "【平静】")
+
+    def test_reply_without_tags(self):
+        self.assertEqual(split(["你好", "世界"]), ([], "你好世界"))
+
+
+if __name__ == '__main__':
+    unittest.main()
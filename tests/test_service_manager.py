@@ -0,0 +1,98 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from ling_chat.core.ai_service.config import AIServiceConfig
+from ling_chat.core.ai_service.script_engine.utils.script_function import ScriptFunction
+from ling_chat.core.messaging.broker import message_broker
+from ling_chat.core.service_manager import ServiceManager
+
+
+class FakeAIService:
+    def __init__(self, settings, user_id):
+        self.user_id = user_id
+        self.config = AIServiceConfig(clients=set(), user_id=user_id)
+        self.closed = False
+
+    async def add_client(self, client_id):
+        self.config.clients.add(client_id)
+
+    async def remove_client(self, client_id):
+        self.config.clients.discard(client_id)
+
+    async def shutdown(self):
+        self.closed = True
+
+
+class TestServiceManager(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        patchers = [
+            mock.patch("ling_chat.core.service_manager.AIService", FakeAIService),
+            mock.patch.object(ServiceManager, "get_user_settings", lambda self, user_id: {}),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.manager = ServiceManager()
+
+    async def test_each_user_gets_own_session(self):
+        await self.manager.add_client("client_a", 1)
+        await self.manager.add_client("client_b", "2")
+        service_a = self.manager.get_service_by_client("client_a")
+        service_b = self.manager.get_service_by_client("client_b")
+        self.assertIsNot(service_a, service_b)
+        self.assertEqual(service_b.config.clients, {"client_b"})
+
+    async def test_resolve_service_by_request(self):
+        await self.manager.add_client("client_a", "1")
+        await self.manager.add_client("client_b", "2")
+        service_a = self.manager.get_service("1")
+        service_b = self.manager.get_service("2")
+        # 按 client_id 找到的是这个客户端所属用户的会话，不是默认用户的
+        self.assertIs(self.manager.resolve_service(client_id="client_b"), service_b)
+        self.assertIs(self.manager.resolve_service(user_id=2), service_b)
+        self.assertIs(self.manager.resolve_service(user_id=1, client_id="client_a"), service_a)
+        self.assertIsNone(self.manager.resolve_service())
+        self.assertFalse(hasattr(self.manager, "ai_service"))
+
+    async def test_script_events_reach_only_the_owning_session(self):
+        await self.manager.add_client("client_a", "1")
+        await self.manager.add_client("client_b", "2")
+        script_config = AIServiceConfig(clients=set(), user_id="1")
+        with mock.patch("ling_chat.core.ai_service.script_engine.utils.script_function.service_manager",
+                        self.manager), \
+                message_broker.subscribe("client_a") as client_a, message_broker.subscribe("client_b") as client_b:
+            self.assertEqual(await ScriptFunction.publish(script_config, {"type": "input"}), 1)
+            self.assertEqual(await client_a.get(), {"type": "input"})
+            self.assertEqual(client_b.qsize(), 0)
+
+            # 输入在剧本开始等待之前就到了，也不会丢
+            await message_broker.enqueue_ai_script_message("client_b", "不是这个用户的输入")
+            await message_broker.enqueue_ai_script_message("client_a", "你好")
+            self.assertEqual(await ScriptFunction.wait_for_user_input(script_config), "你好")
+        message_broker.discard_pending("ai_script_input_client_b")
+
+    async def test_lru_eviction_skips_connected_sessions(self):
+        self.manager.max_sessions = 2
+        await self.manager.add_client("client_a", "1")
+        idle = self.manager.get_or_create_service("2")
+        self.manager.get_or_create_service("3")
+        await asyncio.sleep(0)
+
+        self.assertEqual(list(self.manager.user_services), ["1", "3"])
+        self.assertTrue(idle.closed)
+
+    async def test_idle_sessions_expire_after_last_client_leaves(self):
+        self.manager.idle_ttl = 0
+        await self.manager.add_client("client_a", "1")
+        service = self.manager.get_service("1")
+        await self.manager.remove_client("client_a")
+        await self.manager.shutdown()
+
+        self.assertEqual(self.manager.user_services, {})
+        self.assertEqual(self.manager.client_mapping, {})
+        self.assertTrue(service.closed)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from ling_chat.core.ai_service.translation_batcher import TranslationBatcher
+from ling_chat.core.ai_service.translator import Translator
+from tests.fakes import FakeTranslatorLLM, RecordingVoiceMaker
+
+
+class TestTranslationBatcher(unittest.IsolatedAsyncioTestCase):
+    def make_translator(self) -> Translator:
+        self.llm = FakeTranslatorLLM()
+        with mock.patch("ling_chat.core.ai_service.translator.get_shared_llm_manager", return_value=self.llm), \
+                mock.patch("ling_chat.core.ai_service.translator.get_translation_memory", return_value=None):
+            translator = Translator(RecordingVoiceMaker())
+        translator.batcher = TranslationBatcher(translator, window=0.02, max_size=3)
+        return translator
+
+    def test_split_translations(self):
+        self.assertEqual(Translator.split_translations("x<a>>y<b><c"), (["a", "b"], "<c"))
+        self.assertEqual(Translator.split_translations("no brackets"), ([], ""))
+
+    async def test_sentences_from_consumers_share_one_request(self):
+        translator = self.make_translator()
+        sentences = [[{"following_text": f"句子{i}", "japanese_text": ""}] for i in range(5)]
+        await asyncio.gather(*(translator.translate_ai_response(segments, script=False) for segments in sentences))
+
+        # 前三个句子攒满一批立即发出，剩下两个在时间窗口结束后一起发出
+        self.assertEqual(self.llm.requests, ["<句子0><句子1><句子2>", "<句子3><句子4>"])
+        self.assertEqual([s[0]["japanese_text"] for s in sentences], [f"ja:句子{i}" for i in range(5)])
+        self.assertEqual(sorted(translator.voice_maker.started), [f"ja:句子{i}" for i in range(5)])
+        self.assertEqual(translator.batcher.stats()["requests"], 2)
+
+    async def test_voice_starts_before_batch_finishes(self):
+        translator = self.make_translator()
+        first = [{"following_text": "一", "japanese_text": ""}]
+        second = [{"following_text": "二", "japanese_text": ""}]
+        first_task = asyncio.create_task(translator.translate_ai_response(first, script=False))
+        second_task = asyncio.create_task(translator.translate_ai_response(second, script=False))
+        await first_task
+        # 第一段已经翻译完并合成语音，第二段的译文还在传输
+        self.assertEqual(translator.voice_maker.started, ["ja:一"])
+        self.assertFalse(second_task.done())
+        await second_task
+        self.assertEqual(translator.voice_maker.started, ["ja:一", "ja:二"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import asyncio
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from ling_chat.core.ai_service.translation_memory import TranslationMemory, collect_script_texts
+from ling_chat.core.ai_service.translator import Translator
+from ling_chat.utils.runtime_path import static_path
+
+
+class TestTranslationMemory(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.temp_dir.name) / "tm.db"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_exact_lookup_is_persistent_and_per_model(self):
+        memory = TranslationMemory(self.db_path)
+        memory.put("你好，今天天气真不错呢。", "qwen:a", "こんにちは、いい天気ですね。")
+        memory.close()
+
+        memory = TranslationMemory(self.db_path)
+        # 全角半角、空白不同也算同一句
+        self.assertEqual(memory.get(" 你好,今天天气真不错呢。", "qwen:a"), "こんにちは、いい天気ですね。")
+        self.assertIsNone(memory.get("你好，今天天气真不错呢。", "qwen:b"))
+        self.assertEqual(memory.stats(), {"entries": 1, "hits": 1, "fuzzy_hits": 0, "misses": 1})
+        memory.close()
+
+    def test_fuzzy_lookup(self):
+        memory = TranslationMemory(self.db_path, fuzzy_threshold=0.85)
+        memory.put("要不要一起去公园散步呀？", "m", "一緒に公園を散歩しない？")
+        self.assertEqual(memory.get("要不要一起去公园散步啊？", "m"), "一緒に公園を散歩しない？")
+        self.assertIsNone(memory.get("今天晚上吃什么？", "m"))
+        self.assertEqual(memory.fuzzy_hits, 1)
+        memory.close()
+
+    async def test_translator_skips_llm_on_hit(self):
+        memory = TranslationMemory(self.db_path)
+        memory.put("你好", "p:m", "こんにちは")
+        llm = mock.Mock(llm_provider_type="p", model_type="m")
+        with mock.patch("ling_chat.core.ai_service.translator.get_shared_llm_manager", return_value=llm), \
+                mock.patch("ling_chat.core.ai_service.translator.get_translation_memory", return_value=memory):
+            translator = Translator(voice_maker=None)
+        hits, misses = await translator.recall([{"following_text": "你好", "japanese_text": ""},
+                                          {"following_text": "再见", "japanese_text": ""}])
+        self.assertEqual([seg["japanese_text"] for seg in hits], ["こんにちは"])
+        self.assertEqual([seg["following_text"] for seg in misses], ["再见"])
+
+        misses[0]["japanese_text"] = "さようなら"
+        await translator.remember(misses[0])
+        self.assertEqual(memory.get("再见", "p:m"), "さようなら")
+        memory.close()
+
+    def test_hits_and_puts_are_committed_in_batches(self):
+        memory = TranslationMemory(self.db_path)
+        memory.COMMIT_INTERVAL = 3600
+        memory.put("你好", "m", "こんにちは")
+        for _ in range(3):
+            memory.get("你好", "m")
+        # 查询不会每次都写盘，另一个连接还看不到没提交的改动
+        other = sqlite3.connect(self.db_path)
+        self.assertEqual(other.execute("SELECT COUNT(*) FROM translations").fetchone()[0], 0)
+
+        memory.flush()
+        self.assertEqual(other.execute("SELECT hits FROM translations").fetchone()[0], 3)
+        other.close()
+        memory.close()
+
+    async def test_async_lookup_runs_off_the_loop(self):
+        memory = TranslationMemory(self.db_path)
+        await memory.put_many([("你好", "こんにちは")], "m")
+        with mock.patch("asyncio.to_thread", wraps=asyncio.to_thread) as to_thread:
+            self.assertEqual(await memory.get_many(["你好", "再见"], "m"), ["こんにちは", None])
+        to_thread.assert_called_once()
+        memory.close()
+
+    def test_collect_script_texts(self):
+        texts = collect_script_texts(static_path / "game_data" / "scripts")
+        self.assertIn("你好，今天天气真不错呢。", texts)
+        self.assertEqual(len(texts), len(set(texts)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import asyncio
+import os
+import unittest
+from unittest import mock
+
+from ling_chat.core.ai_service.translation_batcher import TranslationBatcher
+from ling_chat.core.ai_service.translator import Translator
+from tests.fakes import (BlockedVoiceMaker, ChunkedTranslatorLLM, RecordingVoiceMaker, SlowTranslatorLLM,
+                         StreamingTranslatorLLM)
+
+
+class TestTranslator(unittest.IsolatedAsyncioTestCase):
+    def make_translator(self, delay: float, stream: bool = False) -> Translator:
+        self.llm = SlowTranslatorLLM(delay)
+        env = {"TRANSLATE_BATCH": "false", "TRANSLATE_TIMEOUT": "0.05", "TRANSLATE_STREAM": str(stream).lower()}
+        patcher = mock.patch.dict(os.environ, env)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        with mock.patch("ling_chat.core.ai_service.translator.get_shared_llm_manager", return_value=self.llm), \
+                mock.patch("ling_chat.core.ai_service.translator.get_translation_memory", return_value=None):
+            return Translator(RecordingVoiceMaker())
+
+    async def test_non_stream_translation_is_async(self):
+        translator = self.make_translator(delay=0.01)
+        segments = [{"following_text": "你好", "japanese_text": ""}]
+        await translator.translate_ai_response(segments, script=False)
+        self.assertEqual(segments[0]["japanese_text"], "ja:你好")
+        self.assertEqual(translator.voice_maker.started, ["ja:你好"])
+
+    async def test_timeout_skips_voice(self):
+        for stream in (False, True):
+            with self.subTest(stream=stream):
+                translator = self.make_translator(delay=1, stream=stream)
+                segments = [{"following_text": "你好", "japanese_text": ""}]
+                await translator.translate_ai_response(segments, script=False)
+                # 超时不抛出异常，请求被取消，这句话没有语音
+                self.assertEqual(segments[0]["japanese_text"], "")
+                self.assertEqual(translator.voice_maker.started, [])
+                self.assertEqual(self.llm.cancelled, 1)
+
+    async def test_timeout_excludes_time_spent_by_caller(self):
+        translator = self.make_translator(delay=0, stream=True)
+        translator.timeout = 0.1
+        translator.translator_llm = ChunkedTranslatorLLM(["<a><b>", "<c>"])
+        received = []
+        async for sentence in translator.iter_translations([{"following_text": "x"}], stream=True):
+            received.append(sentence)
+            # 调用方处理每条译文的时间比超时还长，但翻译模型早就返回了
+            await asyncio.sleep(0.06)
+        self.assertEqual(received, ["a", "b", "c"])
+
+    async def test_cancel_propagates_to_request(self):
+        translator = self.make_translator(delay=1)
+        translator.timeout = 10
+        task = asyncio.create_task(translator.translate_ai_response(
+            [{"following_text": "你好", "japanese_text": ""}], script=False))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertEqual(self.llm.cancelled, 1)
+
+    async def test_stream_keeps_draining_while_voice_is_generated(self):
+        translator = self.make_translator(delay=0, stream=True)
+        translator.translator_llm = StreamingTranslatorLLM()
+        translator.voice_maker = BlockedVoiceMaker()
+        translator.pipeline_depth = 2
+        segments = [{"following_text": f"句子{i}", "japanese_text": ""} for i in range(5)]
+        task = asyncio.create_task(translator.translate_ai_response(segments, script=False))
+        for _ in range(20):
+            await asyncio.sleep(0)
+
+        # 第一段的语音还没合成完，翻译流已经读完；同时合成的段数不超过 depth
+        self.assertEqual([seg["japanese_text"] for seg in segments], [f"ja:句子{i}" for i in range(5)])
+        self.assertEqual(translator.voice_maker.started, ["ja:句子0", "ja:句子1"])
+        self.assertFalse(task.done())
+
+        translator.voice_maker.release.set()
+        await task
+        self.assertEqual(translator.voice_maker.finished, [f"ja:句子{i}" for i in range(5)])
+
+    async def test_cancel_stops_pending_voice(self):
+        translator = self.make_translator(delay=0, stream=True)
+        translator.translator_llm = StreamingTranslatorLLM()
+        translator.voice_maker = BlockedVoiceMaker()
+        segments = [{"following_text": f"句子{i}", "japanese_text": ""} for i in range(3)]
+        task = asyncio.create_task(translator.translate_ai_response(segments, script=False))
+        for _ in range(20):
+            await asyncio.sleep(0)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        translator.voice_maker.release.set()
+        await asyncio.sleep(0)
+        self.assertEqual(translator.voice_maker.finished, [])
+
+    async def test_batch_cancelled_when_all_waiters_cancelled(self):
+        translator = self.make_translator(delay=1)
+        translator.timeout = 10
+        translator.batcher = TranslationBatcher(translator, window=0.01, max_size=5)
+        tasks = [asyncio.create_task(translator.translate_ai_response(
+            [{"following_text": f"句子{i}", "japanese_text": ""}], script=False)) for i in range(2)]
+        await asyncio.sleep(0.03)
+        self.assertEqual(self.llm.started, 1)
+
+        # 只取消一个等待方时，这一批继续
+        tasks[0].cancel()
+        await asyncio.sleep(0)
+        self.assertEqual(self.llm.cancelled, 0)
+
+        tasks[1].cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.sleep(0)
+        self.assertEqual(self.llm.cancelled, 1)
+        self.assertFalse(translator.batcher._tasks)
+
+    async def test_collecting_batch_dropped_when_cancelled(self):
+        translator = self.make_translator(delay=0)
+        translator.batcher = TranslationBatcher(translator, window=1, max_size=5)
+        task = asyncio.create_task(translator.translate_ai_response(
+            [{"following_text": "你好", "japanese_text": ""}], script=False))
+        await asyncio.sleep(0)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        # 还没发出的批次直接丢弃，不再请求翻译模型
+        self.assertFalse(translator.batcher._batches)
+        self.assertEqual(self.llm.started, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
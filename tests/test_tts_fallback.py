@@ -0,0 +1,60 @@
+import asyncio
+import tempfile
+import unittest
+
+from tests.fakes import FakeAdapter, make_tts
+
+
+class PrimaryAdapter(FakeAdapter):
+    pass
+
+
+class BackupAdapter(FakeAdapter):
+    pass
+
+
+class TestTTSFallback(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.tts = make_tts(self.temp_dir.name)
+        self.tts.fallback_types = ["gsv"]
+
+    async def asyncTearDown(self):
+        await asyncio.to_thread(self.tts.audio_writer.flush)
+        await self.tts.close()
+        self.temp_dir.cleanup()
+
+    async def test_failed_primary_falls_back(self):
+        self.tts.sbv2_adapter = PrimaryAdapter(fail=True)
+        self.tts.gsv_adapter = backup = BackupAdapter(audio=b"backup")
+        output_file = f"{self.temp_dir.name}/a.wav"
+        self.assertEqual(await self.tts.generate_voice("fallback", output_file, tts_type="sbv2"), output_file)
+        self.assertEqual(backup.calls, 1)
+        self.assertEqual(self.tts.fallbacks_used, 1)
+        await asyncio.to_thread(self.tts.audio_writer.flush)
+        with open(output_file, "rb") as f:
+            self.assertEqual(f.read(), b"backup")
+
+    async def test_hedged_request_cancels_loser(self):
+        self.tts.hedge, self.tts.hedge_delay = True, 0.02
+        self.tts.sbv2_adapter = primary = PrimaryAdapter(delay=1)
+        self.tts.gsv_adapter = backup = BackupAdapter()
+        output_file = f"{self.temp_dir.name}/b.wav"
+        self.assertEqual(await self.tts.generate_voice("hedge", output_file, tts_type="sbv2"), output_file)
+        # 备用适配器先返回，主适配器的请求被取消
+        self.assertEqual(self.tts.hedged_requests, 1)
+        self.assertEqual(backup.calls, 1)
+        self.assertEqual(primary.cancelled, 1)
+        self.assertEqual(self.tts.scheduler.stats()["inflight"], 0)
+
+    async def test_fast_primary_is_not_hedged(self):
+        self.tts.hedge, self.tts.hedge_delay = True, 0.5
+        self.tts.sbv2_adapter = PrimaryAdapter()
+        self.tts.gsv_adapter = backup = BackupAdapter()
+        self.assertIsNotNone(await self.tts.generate_voice("fast", f"{self.temp_dir.name}/c.wav", tts_type="sbv2"))
+        self.assertEqual(backup.calls, 0)
+        self.assertEqual(self.tts.hedged_requests, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
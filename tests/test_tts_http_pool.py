@@ -0,0 +1,70 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from aiohttp import web
+
+from ling_chat.core.TTS.http_pool import LatencyHistogram
+from tests.fakes import make_tts
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_buckets_and_percentiles(self):
+        histogram = LatencyHistogram(buckets=(10, 100))
+        for seconds in (0.005, 0.005, 0.05, 0.5):
+            histogram.observe(seconds)
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot["count"], 4)
+        self.assertEqual(snapshot["buckets"], {"<=10ms": 2, "<=100ms": 1, ">100ms": 1})
+        self.assertEqual(histogram.percentile(0.5), 10.0)
+        self.assertEqual(histogram.percentile(0.95), 500.0)
+
+
+class TestTTSHttpPool(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        async def voice(request):
+            return web.Response(body=request.query["text"].encode())
+
+        app = web.Application()
+        app.router.add_get("/voice/vits", voice)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = self.runner.addresses[0][1]
+
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.tts = make_tts(self.temp_dir.name)
+        with mock.patch.dict(os.environ, {"SIMPLE_VITS_API_URL": f"http://127.0.0.1:{port}"}):
+            self.tts.init_sva_adapter(speaker_id=0)
+
+    async def asyncTearDown(self):
+        await self.tts.close()
+        await self.runner.cleanup()
+        self.temp_dir.cleanup()
+
+    async def test_adapters_reuse_pooled_connections(self):
+        for i in range(5):
+            file_name = Path(self.temp_dir.name) / f"{i}.wav"
+            result = await self.tts.generate_voice(f"text{i}", str(file_name), tts_type="sva-vits")
+            self.assertEqual(result, str(file_name))
+            await asyncio.to_thread(self.tts.audio_writer.flush)
+            self.assertEqual(file_name.read_bytes(), f"text{i}".encode())
+
+        stats = self.tts.latency_stats()
+        # 只建立了一次连接，后面的请求都复用它
+        self.assertEqual(stats["http_pool"], {"connections_created": 1, "connections_reused": 4})
+        self.assertEqual(stats["VitsAdapter"]["count"], 5)
+
+    async def test_close_releases_session(self):
+        await self.tts.generate_voice("text", str(Path(self.temp_dir.name) / "a.wav"), tts_type="sva-vits")
+        self.assertFalse(self.tts.http_pool.closed)
+        await self.tts.close()
+        self.assertTrue(self.tts.http_pool.closed)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import asyncio
+import unittest
+
+from ling_chat.core.TTS.scheduler import TTSScheduler
+
+
+class TestTTSScheduler(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrency_limit_and_queue_metrics(self):
+        scheduler = TTSScheduler(default_limit=2)
+        running = 0
+        peak = 0
+
+        async def request():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return b"audio"
+
+        results = await asyncio.gather(*(scheduler.run("gsv", "a", f"key{i}", request) for i in range(10)))
+        self.assertEqual(results, [b"audio"] * 10)
+        self.assertEqual(peak, 2)
+
+        stats = scheduler.stats()["gsv"]
+        self.assertEqual(stats["active"], 0)
+        self.assertEqual(stats["queued"], 0)
+        self.assertEqual(stats["max_queued"], 8)
+        self.assertEqual(stats["wait"]["count"], 10)
+
+    async def test_clients_take_turns(self):
+        scheduler = TTSScheduler(default_limit=1)
+        order = []
+
+        def make_request(name):
+            async def request():
+                order.append(name)
+                await asyncio.sleep(0)
+                return name.encode()
+            return request
+
+        tasks = [asyncio.create_task(scheduler.run("sbv2", "a", f"a{i}", make_request(f"a{i}"))) for i in range(4)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(scheduler.run("sbv2", "b", "b0", make_request("b0"))))
+        await asyncio.gather(*tasks)
+        # b 的请求不需要等 a 的所有请求都完成
+        self.assertLess(order.index("b0"), order.index("a3"))
+
+    async def test_identical_requests_are_coalesced(self):
+        scheduler = TTSScheduler(default_limit=2)
+        calls = 0
+        release = asyncio.Event()
+
+        async def request():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return b"audio"
+
+        first = asyncio.create_task(scheduler.run("gsv", "a", "same", request))
+        second = asyncio.create_task(scheduler.run("gsv", "b", "same", request))
+        third = asyncio.create_task(scheduler.run("gsv", "c", "same", request))
+        await asyncio.sleep(0)
+
+        # 其中一个等待方被取消不影响共享的请求
+        first.cancel()
+        release.set()
+        self.assertEqual(await second, b"audio")
+        self.assertEqual(await third, b"audio")
+        self.assertEqual(calls, 1)
+        self.assertEqual(scheduler.stats()["coalesced"], 2)
+        self.assertEqual(scheduler.stats()["inflight"], 0)
+
+    async def test_cancelled_waiter_leaves_queue(self):
+        scheduler = TTSScheduler(default_limit=1)
+        limiter = scheduler.limiter("gsv")
+        await limiter.acquire("a")
+        waiter = asyncio.create_task(limiter.acquire("b"))
+        await asyncio.sleep(0)
+        self.assertEqual(limiter.depth, 1)
+        waiter.cancel()
+        await asyncio.sleep(0)
+        self.assertEqual(limiter.depth, 0)
+        limiter.release()
+        self.assertEqual(limiter.active, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
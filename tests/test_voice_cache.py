@@ -0,0 +1,137 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from ling_chat.core.TTS.voice_cache import VoiceCache
+from tests.fakes import FakeAdapter, make_tts
+
+
+class CountingAdapter(FakeAdapter):
+    pass
+
+
+class CachedPrimaryAdapter(FakeAdapter):
+    pass
+
+
+class CachedBackupAdapter(FakeAdapter):
+    pass
+
+
+class TestVoiceCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def make_file(self, name: str, size: int) -> str:
+        path = self.root / name
+        path.write_bytes(b"x" * size)
+        return str(path)
+
+    def test_key_ignores_stale_text_param(self):
+        key1 = VoiceCache.make_key("sbv2", {"speaker_id": 0, "text": "old"}, "ja", "こんにちは")
+        key2 = VoiceCache.make_key("sbv2", {"speaker_id": 0, "text": "other"}, "ja", "こんにちは")
+        self.assertEqual(key1, key2)
+        self.assertNotEqual(key1, VoiceCache.make_key("sbv2", {"speaker_id": 1}, "ja", "こんにちは"))
+        self.assertNotEqual(key1, VoiceCache.make_key("sbv2", {"speaker_id": 0}, "ja", "こんにちは", "开心"))
+
+    def test_size_limit_evicts_least_recently_used(self):
+        cache = VoiceCache(cache_dir=self.root / "cache", max_bytes=250, max_age=3600)
+        cache.put("a", self.make_file("a.wav", 100))
+        cache.put("b", self.make_file("b.wav", 100))
+        self.assertTrue(cache.get("a", str(self.root / "out_a.wav")))
+
+        cache.put("c", self.make_file("c.wav", 100))
+        self.assertFalse(cache.get("b", str(self.root / "out_b.wav")))
+        self.assertTrue(cache.get("a", str(self.root / "out_a.wav")))
+        self.assertEqual(cache.stats()["bytes"], 200)
+        self.assertFalse((self.root / "cache" / "b.wav").exists())
+
+    def test_expired_entries_are_dropped_and_index_survives_restart(self):
+        cache = VoiceCache(cache_dir=self.root / "cache", max_bytes=1000, max_age=3600)
+        cache.put("old", self.make_file("old.wav", 10))
+        cache.put("new", self.make_file("new.wav", 10))
+        past = time.time() - 7200
+        os.utime(self.root / "cache" / "old.wav", (past, past))
+
+        reloaded = VoiceCache(cache_dir=self.root / "cache", max_bytes=1000, max_age=3600)
+        self.assertEqual(len(reloaded), 1)
+        self.assertTrue(reloaded.get("new", str(self.root / "out.wav")))
+        self.assertEqual((self.root / "out.wav").read_bytes(), b"x" * 10)
+
+
+class TestTTSVoiceCache(unittest.IsolatedAsyncioTestCase):
+    async def test_replay_costs_no_tts_calls(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            tts = make_tts(root, cache_bytes=1024 * 1024)
+            voice_cache = tts.voice_cache
+            adapter = tts.sbv2_adapter = CountingAdapter()
+
+            lines = ["おはよう", "今日もいい天気", "おはよう"]
+            for round_ in range(2):
+                for i, line in enumerate(lines):
+                    output = root / f"{round_}_{i}.wav"
+                    self.assertEqual(await tts.generate_voice(line, str(output), tts_type="sbv2"), str(output))
+                    await asyncio.to_thread(tts.audio_writer.flush)
+                    self.assertEqual(output.read_bytes(), line.encode())
+
+            # 只有第一次出现的两句话真正调用了TTS
+            self.assertEqual(adapter.calls, 2)
+            self.assertEqual(voice_cache.stats()["hits"], 4)
+            await tts.close()
+
+    async def test_fallback_audio_is_read_back_from_cache(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            tts = make_tts(root, cache_bytes=1024 * 1024)
+            tts.fallback_types = ["gsv"]
+            primary = tts.sbv2_adapter = CachedPrimaryAdapter(fail=True)
+            backup = tts.gsv_adapter = CachedBackupAdapter(audio=b"backup")
+
+            for i in range(2):
+                output = root / f"{i}.wav"
+                self.assertEqual(await tts.generate_voice("おはよう", str(output), tts_type="sbv2"), str(output))
+                await asyncio.to_thread(tts.audio_writer.flush)
+                self.assertEqual(output.read_bytes(), b"backup")
+            # 主适配器还是不可用，第二次直接读到备用适配器合成的缓存
+            self.assertEqual((primary.calls, backup.calls), (1, 1))
+            self.assertEqual(tts.voice_cache.stats()["hits"], 1)
+
+            stream = [chunk async for chunk in tts.generate_voice_stream("おはよう", str(root / "s.wav"), tts_type="sbv2")]
+            self.assertEqual(b"".join(stream), b"backup")
+            self.assertEqual(backup.calls, 1)
+            await tts.close()
+
+    async def test_async_get_places_file_off_the_loop(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            cache = VoiceCache(cache_dir=root / "cache", max_bytes=1000, max_age=3600)
+            (root / "a.wav").write_bytes(b"x" * 10)
+            cache.put("a", str(root / "a.wav"))
+
+            loop_thread = threading.get_ident()
+            place = VoiceCache._place
+            threads = []
+
+            def recording_place(source, target):
+                threads.append(threading.get_ident())
+                place(source, target)
+
+            with mock.patch.object(VoiceCache, "_place", side_effect=recording_place):
+                self.assertTrue(await cache.aget("a", str(root / "out.wav")))
+                self.assertFalse(await cache.aget("b", str(root / "out_b.wav")))
+            self.assertEqual((root / "out.wav").read_bytes(), b"x" * 10)
+            self.assertNotIn(loop_thread, threads)
+
+
+if __name__ == '__main__':
+    unittest.main()
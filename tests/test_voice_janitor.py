@@ -0,0 +1,67 @@
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from ling_chat.core.TTS.audio_writer import AudioWriter
+from ling_chat.core.TTS.voice_janitor import VoiceJanitor
+
+
+class TestVoiceJanitor(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.voice_dir = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def make_file(self, name: str, size: int, age: float = 0) -> Path:
+        path = self.voice_dir / name
+        path.write_bytes(b"\0" * size)
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def test_age_and_ack(self):
+        janitor = VoiceJanitor(self.voice_dir, max_bytes=0, max_age=60, ack_ttl=0)
+        old = self.make_file("old.wav", 10, age=120)
+        played = self.make_file("played.wav", 10)
+        fresh = self.make_file("fresh.wav", 10)
+        self.assertTrue(janitor.acknowledge("played.wav"))
+        self.assertFalse(janitor.acknowledge("missing.wav"))
+        time.sleep(0.01)
+
+        self.assertEqual(janitor.collect(), 2)
+        self.assertFalse(old.exists())
+        self.assertFalse(played.exists())
+        self.assertTrue(fresh.exists())
+        stats = janitor.stats()
+        self.assertEqual((stats["files"], stats["bytes"], stats["deleted"], stats["acked"]), (1, 10, 2, 0))
+
+    def test_size_cap_prefers_played_then_oldest(self):
+        janitor = VoiceJanitor(self.voice_dir, max_bytes=250, max_age=3600, ack_ttl=3600)
+        a = self.make_file("a.wav", 100, age=30)
+        b = self.make_file("b.wav", 100, age=20)
+        c = self.make_file("c.wav", 100, age=10)
+        d = self.make_file("d.wav", 100)
+        janitor.acknowledge("c.wav")
+
+        self.assertEqual(janitor.collect(), 2)
+        self.assertEqual([p.exists() for p in (a, b, c, d)], [False, True, False, True])
+        self.assertEqual(janitor.total_bytes, 200)
+
+    def test_pending_write_is_kept(self):
+        janitor = VoiceJanitor(self.voice_dir, max_bytes=0, max_age=60, ack_ttl=0)
+        path = self.make_file("busy.wav", 10, age=120)
+        writer = AudioWriter()
+        writer._pending["busy.wav"] = b"audio"
+        # 还在写入的语音不删除
+        with mock.patch("ling_chat.core.TTS.voice_janitor.audio_writer", writer):
+            self.assertEqual(janitor.collect(), 0)
+        self.assertTrue(path.exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
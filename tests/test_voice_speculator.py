@@ -0,0 +1,76 @@
+import asyncio
+import tempfile
+import unittest
+
+from ling_chat.core.ai_service.message_system.reorder_buffer import ReorderBuffer
+from ling_chat.core.ai_service.message_system.stream_producer import StreamProducer
+from ling_chat.core.ai_service.message_system.voice_speculator import VoiceSpeculator
+from ling_chat.core.ai_service.voice_maker import VoiceMaker
+from tests.fakes import FakeAdapter, make_tts
+
+
+class SlowAdapter(FakeAdapter):
+    def __init__(self):
+        super().__init__(gated=True)
+
+
+async def stream(chunks):
+    for chunk in chunks:
+        await asyncio.sleep(0)
+        yield chunk
+
+
+class TestVoiceSpeculator(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.voice_maker = VoiceMaker(make_tts(self.temp_dir.name))
+        self.voice_maker.tts_type = "sbv2"
+        self.adapter = self.voice_maker.tts_provider.sbv2_adapter = SlowAdapter()
+        self.speculator = VoiceSpeculator(self.voice_maker)
+
+    async def asyncTearDown(self):
+        self.adapter.release.set()
+        self.speculator.cancel_all()
+        await asyncio.to_thread(self.voice_maker.tts_provider.audio_writer.flush)
+        await self.voice_maker.close()
+        self.temp_dir.cleanup()
+
+    async def test_starts_when_japanese_span_closes(self):
+        queue = asyncio.Queue()
+        producer = StreamProducer(stream(["【高兴】你好", "<こんにち", "は>（挥手", "）【平静】嗯<うん>"]),
+                                  queue, ReorderBuffer(), self.speculator)
+        task = asyncio.create_task(producer.run())
+        while self.speculator.started == 0:
+            await asyncio.sleep(0)
+        # 句子还没结束就已经开始合成
+        self.assertTrue(queue.empty())
+        await task
+
+        self.assertEqual(self.speculator.started, 2)
+        speculation = self.speculator.take(0)
+        self.assertEqual(speculation.text, "こんにちは")
+
+        segment = {"index": 1, "japanese_text": "こんにちは", "following_text": "你好",
+                   "voice_file": f"{self.temp_dir.name}/other.wav"}
+        self.assertTrue(self.speculator.resolve(speculation, segment["japanese_text"]))
+        self.adapter.release.set()
+        await self.voice_maker.generate_voice_files([segment], speculation)
+        # 直接使用提前合成的语音，不会再合成一次
+        self.assertEqual(segment["voice_file"], speculation.voice_file)
+        self.assertTrue(segment["has_voice"])
+        self.assertEqual(self.adapter.texts.count("こんにちは"), 1)
+
+    async def test_rewritten_sentence_cancels_speculation(self):
+        self.speculator.observe("【高兴】你好<你好>", 0)
+        speculation = self.speculator.take(0)
+        await asyncio.sleep(0.01)
+        # 中日文本被交换，最终的日语文本和提前合成的不一样
+        self.assertFalse(self.speculator.resolve(speculation, "こんにちは"))
+        await asyncio.gather(speculation.task, return_exceptions=True)
+        self.assertTrue(speculation.task.cancelled())
+        self.assertEqual(self.adapter.cancelled, 1)
+        self.assertEqual(self.speculator.cancelled, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
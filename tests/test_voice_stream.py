@@ -0,0 +1,144 @@
+import asyncio
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from fastapi import HTTPException
+
+from ling_chat.api.chat_sound import get_specific_sound
+from ling_chat.core.TTS.circuit_breaker import get_circuit_breaker
+from ling_chat.core.TTS.voice_stream import VoiceStream, VoiceStreamError, voice_streams
+from tests.fakes import FakeAdapter, make_tts
+
+
+class StreamingAdapter(FakeAdapter):
+    supports_streaming = True
+
+    def __init__(self):
+        super().__init__(gated=True)
+
+    async def generate_voice_stream(self, text: str):
+        yield b"RIFF"
+        # 第二块要等测试放行，模拟后端还在合成
+        await self.release.wait()
+        yield text.encode()
+
+
+class BrokenStreamAdapter(FakeAdapter):
+    supports_streaming = True
+
+    async def generate_voice_stream(self, text: str):
+        raise ConnectionError("backend down")
+        yield b""
+
+
+class TrippedStreamAdapter(StreamingAdapter):
+    pass
+
+
+class TestVoiceStream(unittest.IsolatedAsyncioTestCase):
+    async def test_late_readers_replay_from_start(self):
+        stream = VoiceStream("a.wav")
+        stream.feed(b"1")
+        first = asyncio.create_task(self.collect(stream))
+        await asyncio.sleep(0)
+        stream.feed(b"2")
+        second = asyncio.create_task(self.collect(stream))
+        stream.finish()
+        self.assertEqual(await first, [b"1", b"2"])
+        self.assertEqual(await second, [b"1", b"2"])
+        self.assertEqual(stream.media_type, "audio/wav")
+
+    @staticmethod
+    async def collect(stream):
+        return [chunk async for chunk in stream.iter_chunks()]
+
+    async def test_first_chunk_is_readable_before_synthesis_ends(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            tts = make_tts(root)
+            adapter = tts.sbv2_adapter = StreamingAdapter()
+            output = root / "voice.wav"
+
+            task = tts.start_voice_stream("こんにちは", str(output), tts_type="sbv2")
+            stream = voice_streams.get("voice.wav")
+            self.assertIsNotNone(stream)
+            chunks = stream.iter_chunks()
+            self.assertEqual(await asyncio.wait_for(chunks.__anext__(), 1), b"RIFF")
+            self.assertFalse(output.exists())
+
+            adapter.release.set()
+            self.assertEqual(await chunks.__anext__(), "こんにちは".encode())
+            await task
+            await asyncio.to_thread(tts.audio_writer.flush)
+            # 合成结束后文件已经写好，登记也被移除
+            self.assertEqual(output.read_bytes(), b"RIFF" + "こんにちは".encode())
+            self.assertIsNone(voice_streams.get("voice.wav"))
+            self.assertEqual(tts.latency_stats()["StreamingAdapter.first_chunk"]["count"], 1)
+            await tts.close()
+
+    async def test_cached_stream_is_read_off_the_loop(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            tts = make_tts(root, cache_bytes=1024 * 1024)
+            voice_cache = tts.voice_cache
+            adapter = tts.sbv2_adapter = StreamingAdapter()
+            adapter.release.set()
+            first = [chunk async for chunk in tts.generate_voice_stream("こんにちは", str(root / "1.wav"), tts_type="sbv2")]
+            await asyncio.to_thread(tts.audio_writer.flush)
+
+            loop_thread = threading.get_ident()
+            read_bytes = Path.read_bytes
+            threads = []
+
+            def recording_read(path):
+                threads.append(threading.get_ident())
+                return read_bytes(path)
+
+            with mock.patch.object(Path, "read_bytes", autospec=True, side_effect=recording_read):
+                second = [chunk async for chunk in tts.generate_voice_stream("こんにちは", str(root / "2.wav"), tts_type="sbv2")]
+            # 命中缓存时整段音频一次返回，文件在线程池中读取
+            self.assertEqual(b"".join(second), b"".join(first))
+            self.assertEqual(voice_cache.stats()["hits"], 1)
+            self.assertTrue(threads)
+            self.assertNotIn(loop_thread, threads)
+            await tts.close()
+
+    async def test_failed_stream_reports_error(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            tts = make_tts(temp_dir)
+            tts.sbv2_adapter = BrokenStreamAdapter()
+            task = tts.start_voice_stream("こんにちは", f"{temp_dir}/broken.wav", tts_type="sbv2")
+            self.assertIsNotNone(task)
+            self.assertFalse(await task)
+
+            # 合成失败的语音保留错误，前端请求时返回5xx而不是空的音频
+            stream = voice_streams.get("broken.wav")
+            self.assertIsNotNone(stream.error)
+            with self.assertRaises(VoiceStreamError):
+                [chunk async for chunk in stream.iter_chunks()]
+            with self.assertRaises(HTTPException) as context:
+                await get_specific_sound("broken.wav")
+            self.assertEqual(context.exception.status_code, 502)
+            await tts.close()
+
+    async def test_no_stream_when_every_breaker_is_open(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            tts = make_tts(temp_dir)
+            adapter = tts.sbv2_adapter = TrippedStreamAdapter()
+            breaker = get_circuit_breaker("TrippedStreamAdapter")
+            breaker.failure_threshold = 1
+            breaker.record_failure()
+            try:
+                self.assertIsNone(tts.start_voice_stream("こんにちは", f"{temp_dir}/a.wav", tts_type="sbv2"))
+                self.assertIsNone(voice_streams.get("a.wav"))
+                self.assertEqual(adapter.calls, 0)
+            finally:
+                breaker.record_success()
+            await tts.close()
+
+
+if __name__ == '__main__':
+    unittest.main()